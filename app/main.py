@@ -1,31 +1,10 @@
 import streamlit as st
+import contextlib
 import time
 import sys
 import os
 import glob
-import re # Diperlukan untuk helper snippet
-import streamlit as st
-import nltk
-
-# Fungsi ini akan di-cache, hanya jalan sekali saat deploy
-@st.cache_resource
-def download_nltk_data():
-    """Unduh resource NLTK yang diperlukan."""
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        nltk.download('punkt')
-    try:
-        nltk.data.find('corpora/stopwords')
-    except LookupError:
-        nltk.download('stopwords')
-    try:
-        nltk.data.find('tokenizers/punkt_tab')
-    except LookupError:
-        nltk.download('punkt_tab')
-    print("Data NLTK sudah siap.")
-
-download_nltk_data()
+import numpy as np
 
 
 try:
@@ -41,23 +20,21 @@ if parent_root not in sys.path:
 
 # --- 2. Import dari Modul 'src' ---
 try:
-    from src.preprocess import preprocess_text
-    from src.boolean_ir import build_inverted_index, parse_boolean_query
-    from src.vsm_ir import build_vsm_model, search_vsm
+    from src.preprocess import preprocess_text, print_progress, load_stem_cache, save_stem_cache
+    from src.boolean_ir import BooleanQueryError, compile_boolean_query, normalize_boolean_query, parse_boolean_query, plan_terms
+    from src.vsm_ir import search_vsm, DEFAULT_PROXIMITY_WEIGHT
+    from src.bm25 import DEFAULT_K1, DEFAULT_B, DEFAULT_FIELD_WEIGHTS, load_or_build_bm25, search_bm25
+    from src.index_store import RAW_INDEX_DIR, get_source_stats
+    from src.incremental_index import IncrementalIndexer
+    from src.instrument import span, trace
+    from src.snippets import compile_highlighter, make_snippet
+    from src.result_cache import ResultCache, query_key, result_cache
+    from src.corpus_reader import iter_corpus
 except ImportError as e:
     st.error(f"Gagal mengimpor modul 'src'. Pastikan folder 'src' ada di sebelah folder 'app'. Error: {e}")
     st.stop()
 
 
-# --- 3. Import NLTK untuk Kalimat ---
-import nltk
-from nltk.tokenize import sent_tokenize
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-
-
 st.set_page_config(
     page_title="🚀 Mesin Pencari STKI",
     page_icon="🤖",
@@ -68,128 +45,120 @@ st.set_page_config(
 # --- FUNGSI HELPER ---
 def load_documents_from_folder(data_folder):
     """
-    Membaca semua file .txt dari folder data.
+    Membaca semua file .txt dari folder data lewat pembaca korpus streaming
+    (src/corpus_reader.py): setiap file dibaca sekali, encoding dideteksi di memori.
     """
-    data_path = os.path.join(parent_root, data_folder, "*.txt")
-    doc_files = glob.glob(data_path)
+    data_dir = os.path.join(parent_root, data_folder)
     
     docs_raw_map = {}
     doc_names = []
     
-    if not doc_files:
+    for _, doc_name, text in iter_corpus(data_dir, "*.txt"):
+        docs_raw_map[doc_name] = text
+        doc_names.append(doc_name)
+
+    if not doc_names:
+        data_path = os.path.join(data_dir, "*.txt")
         st.error(f"Tidak ada file .txt yang ditemukan di path: {data_path}. Pastikan folder 'data' ada di sebelah folder 'app' dan 'src'.")
         raise FileNotFoundError(f"Tidak ada file .txt yang ditemukan di path: {data_path}")
-        
-    for file_path in doc_files:
-        doc_name = os.path.basename(file_path)
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                docs_raw_map[doc_name] = f.read()
-                doc_names.append(doc_name)
-        except Exception as e:
-            print(f"Gagal membaca {file_path} dengan utf-8: {e}. Mencoba 'latin-1'...")
-            try:
-                with open(file_path, 'r', encoding='latin-1') as f:
-                    docs_raw_map[doc_name] = f.read()
-                    doc_names.append(doc_name)
-            except Exception as e2:
-                print(f"Gagal membaca {file_path} dengan encoding apapun: {e2}")
             
     print(f"Berhasil memuat {len(doc_names)} dokumen.")
     return docs_raw_map, doc_names
 
-def create_snippet(text, query_terms):
-    
-    try:
-        sentences = sent_tokenize(text)
-    except Exception as e:
-        print(f"NLTK sent_tokenize gagal: {e}. Menggunakan fallback.")
-        sentences = text.split('.') 
-        
-    best_sentence = sentences[0] if sentences else text[:150] # Fallback kalimat pertama
-    max_hits = 0
-
-    query_terms_lower = {term.lower() for term in query_terms}
-
-    # Loop untuk menemukan kalimat terbaik
-    for sentence in sentences:
-        hits = 0
-        sentence_lower = sentence.lower()
-        for term in query_terms_lower:
-            if term in sentence_lower:
-                hits += 1
-        if hits > max_hits:
-            max_hits = hits
-            best_sentence = sentence 
-    
-    # Jika tidak ada kalimat yang cocok, ambil kalimat pertama
-    if max_hits == 0:
-        best_sentence = sentences[0] if sentences else text[:150]
+def render_trace_panel(query_trace):
+    """Panel rincian waktu per tahap (span dari src/instrument.py) untuk satu kueri."""
+    summary = query_trace.summary()
+    with st.expander(f"📊 Rincian Waktu per Tahap (total {query_trace.duration * 1000:.2f} ms)", expanded=True):
+        if not summary:
+            st.caption("Tidak ada tahap yang tercatat.")
+            return
+        rows = [
+            {
+                "Tahap": stage['stage'],
+                "Panggilan": stage['calls'],
+                "Total (ms)": round(stage['total_ms'], 3),
+                "Hitungan": ", ".join(f"{key}={value:g}" for key, value in stage['counts'].items()),
+            }
+            for stage in summary
+        ]
+        st.bar_chart(rows, x="Tahap", y="Total (ms)", horizontal=True)
+        st.dataframe(rows, hide_index=True)
+        st.download_button(
+            "⬇️ Unduh trace (JSON)", data=query_trace.to_json(indent=2),
+            file_name="trace.json", mime="application/json"
+        )
 
 
-    for term in query_terms:
-        try:
-            best_sentence = re.sub(f"({re.escape(term)})", r"**\1**", best_sentence, flags=re.IGNORECASE)
-        except re.error:
-            pass 
-    
-    
-    if len(best_sentence) > 250:
-        best_sentence = "..." + best_sentence[:250] + "..."
-        
-    return best_sentence
+# --- FUNGSI LOAD MODEL ---
+@st.cache_resource
+def get_incremental_indexer(data_folder='data'):
+    """
+    Indexer inkremental dibuat sekali dan dipakai bersama semua sesi.
+    Ia mengingat dokumen yang sudah diindeks, jadi saat isi folder data berubah
+    hanya dokumen baru/berubah yang di-preprocess ulang.
+    """
+    return IncrementalIndexer(os.path.join(parent_root, data_folder), RAW_INDEX_DIR)
 
+def get_corpus_signature(data_folder='data'):
+    """Tanda tangan murah (nama, ukuran, mtime) isi folder data, dicek di setiap rerun."""
+    file_paths = glob.glob(os.path.join(parent_root, data_folder, "*.txt"))
+    return str(get_source_stats(file_paths))
 
-# --- FUNGSI LOAD MODEL ---
-@st.cache_resource(show_spinner="🧙‍♂️ Merapal mantra TF-IDF... Harap sabar, ya!")
-def load_all_models_from_src(data_folder='data'):
+@st.cache_resource(show_spinner="🧙‍♂️ Merapal mantra TF-IDF... Harap sabar, ya!", max_entries=1)
+def load_all_models_from_src(data_folder='data', corpus_signature=None):
     """
-    Wrapper untuk memuat data dan membangun model dari 'src'.
+    Wrapper untuk memuat data dan model dari 'src'.
+    Di-cache per `corpus_signature`: jika isi folder data berubah, fungsi ini
+    dijalankan lagi, tetapi indexer inkremental hanya memproses dokumen yang berubah.
     """
     try:
         docs_raw_map, doc_names = load_documents_from_folder(data_folder)
-        
-        docs_preprocessed_map = {} 
-        docs_preprocessed_list = [] 
-        
-        print("Memulai preprocessing...")
-        for name in doc_names:
-            raw_text = docs_raw_map[name]
-            tokens = preprocess_text(raw_text) # Menggunakan fungsi dari src
-            
-            docs_preprocessed_map[name] = tokens
-            docs_preprocessed_list.append(" ".join(tokens))
-            
-            if not tokens:
-                print(f"PERINGATAN: Dokumen '{name}' menjadi kosong setelah preprocessing.")
 
-        print("Preprocessing selesai.")
+        load_stem_cache() # Kata yang sudah pernah di-stem tidak diproses ulang
+        indexer = get_incremental_indexer(data_folder)
+        index = indexer.refresh(progress=print_progress)
+        save_stem_cache()
+
+        terms_per_doc = np.diff(index['vsm_model'][1].indptr)
+        for name, n_terms in zip(index['doc_names'], terms_per_doc):
+            if n_terms == 0:
+                print(f"PERINGATAN: Dokumen '{name}' menjadi kosong setelah preprocessing.")
 
-        if not any(docs_preprocessed_list):
+        if not index['vocabulary']:
             print("KESALAHAN FATAL: Semua dokumen kosong setelah preprocessing.")
-            raise ValueError(
-                
-            )
+            raise ValueError("Semua dokumen kosong setelah preprocessing.")
 
-        print("Membangun model VSM...")
-        vsm_model = build_vsm_model(docs_preprocessed_list)
-        print("Model VSM berhasil dibangun.")
-        
-        print("Membangun Indeks Boolean...")
-        boolean_index = build_inverted_index(docs_preprocessed_map, doc_names)
-        print("Indeks Boolean berhasil dibangun.")
-        
-        return docs_raw_map, doc_names, vsm_model, boolean_index, docs_preprocessed_list, None
+        print(f"Indeks siap ({len(index['doc_names'])} dokumen).")
+        sentence_index = indexer.sentence_index() # Batas kalimat + term per kalimat untuk snippet
+        return docs_raw_map, index['doc_names'], index['vsm_model'], index['inverted_index'], index['vsm_postings'], index['term_upper_bounds'], sentence_index, index['meta']['checksum'], None
     
     except Exception as e:
         print(f"Error di load_all_models_from_src: {e}")
         import traceback
         traceback.print_exc() # Cetak traceback lengkap ke konsol
-        return None, None, None, None, None, str(e) 
+        return None, None, None, None, None, None, None, None, str(e) 
+
+@st.cache_resource(show_spinner="🏆 Menyiapkan indeks BM25...", max_entries=1)
+def load_bm25_index(data_folder='data', corpus_signature=None):
+    """Indeks BM25/BM25F (dari dokumen mentah), di-cache per `corpus_signature`."""
+    load_stem_cache()
+    bm25_index = load_or_build_bm25(os.path.join(parent_root, data_folder), progress=print_progress)
+    save_stem_cache()
+    return bm25_index
+
+def get_result_cache():
+    """
+    Cache hasil kueri (ranking + snippet) yang dipakai bersama semua sesi: instance
+    `result_cache` milik proses (src/result_cache.py). Kunci memuat versi indeks,
+    jadi entri lama otomatis dibuang saat indeks dibangun ulang.
+    """
+    return result_cache
 
 # --- INISIALISASI APLIKASI ---
 with st.spinner('✨ Menyulap data menjadi informasi... Hampir siap! ✨'):
-    docs_map, names, vsm_model, boolean_index, docs_vsm_list, error_msg = load_all_models_from_src(data_folder='data')
+    docs_map, names, vsm_model, boolean_index, vsm_postings, term_upper_bounds, sentence_index, index_version, error_msg = load_all_models_from_src(
+        data_folder='data', corpus_signature=get_corpus_signature('data')
+    )
 
 if error_msg:
     st.error(f"💥 OH TIDAK! Terjadi kesalahan fatal saat memuat model:\n\n{error_msg}")
@@ -288,7 +257,7 @@ with st.sidebar:
     st.markdown("### 1. Pilih Model Pencarian")
     search_mode = st.radio(
         "Pilih Model",
-        ("✨ VSM (Ranking & Relevansi)", "🎯 Boolean (Pencarian Tepat)"),
+        ("✨ VSM (Ranking & Relevansi)", "🏆 BM25 (Ranking per Field)", "🎯 Boolean (Pencarian Tepat)"),
         index=0
     )
     
@@ -301,6 +270,23 @@ with st.sidebar:
             min_value=1, max_value=20, value=5, 
             help="Pilih jumlah dokumen teratas"
         )
+        use_proximity = st.checkbox(
+            "Kedekatan term kueri (proximity)", value=False,
+            help="Dokumen yang memuat term kueri berdekatan diberi skor lebih tinggi (indeks posisional)."
+        )
+    elif search_mode.startswith("🏆 BM25"):
+        st.markdown("### 2. Atur Parameter BM25")
+        top_k = st.slider(
+            "Atur Top-K : ",
+            min_value=1, max_value=20, value=5,
+            help="Pilih jumlah dokumen teratas"
+        )
+        bm25_k1 = st.slider("k1 (saturasi tf)", min_value=0.0, max_value=3.0, value=DEFAULT_K1, step=0.1)
+        bm25_b = st.slider("b (normalisasi panjang)", min_value=0.0, max_value=1.0, value=DEFAULT_B, step=0.05)
+        use_bm25f = st.checkbox(
+            "Bobot field (BM25F)", value=True,
+            help="Term di Posisi, Lokasi, dan Kualifikasi diberi bobot lebih besar."
+        )
     else:
         st.markdown("### 2. Petunjuk Model Boolean")
         st.info(
@@ -308,11 +294,20 @@ with st.sidebar:
             Gunakan operator:
             - `AND`: `admin AND semarang`
             - `OR`: `magang OR internship`
-            - `NOT`: `designer NOT freelance`
+            - `NOT`: `designer NOT freelance` atau `NOT kendal`
+            - Kurung: `magang AND (semarang OR ungaran)`
+            - Frasa: `"web developer"` (kata berurutan)
+            - Kedekatan: `admin NEAR/3 ungaran` (jarak maksimal 3 kata)
+
+            Prioritas: `NEAR/k` > `NOT` > `AND` > `OR`.
             """
         )
     
     st.markdown("---")
+    show_trace = st.checkbox(
+        "📊 Rincian waktu per tahap", value=False,
+        help="Catat durasi tokenisasi, stemming, transform, skoring, top-k, dan snippet untuk kueri ini."
+    )
     st.caption(f"📚 Total Dokumen Terindeks: **{len(docs_map)}**")
 
 
@@ -358,38 +353,71 @@ if submit_button:
         st.header(f"✨ Hasil Pencarian untuk: '{query}'")
         
         start_time = time.time() 
+        query_trace = None
         
-        # --- MODE 1: VSM ---
-        if search_mode.startswith("✨ VSM"):
-            with st.spinner(f"🚀 Menganalisis matriks TF-IDF untuk '{query}'..."):
+        # --- MODE 1: VSM / BM25 (ranking) ---
+        if not search_mode.startswith("🎯 Boolean"):
+            with st.spinner(f"🚀 Menghitung ranking untuk '{query}'..."), \
+                    (trace() if show_trace else contextlib.nullcontext()) as query_trace:
                 
+                query_tokens = preprocess_text(query)
+                query_terms = set(query_tokens)
+
+                def rank_with_snippets(run_search):
+                    ranked = []
+                    highlighter = compile_highlighter(query_terms) # Satu regex untuk semua hasil
+                    for doc_name, score in run_search():
+                        full_text = docs_map[doc_name]
+                        # Buat snippet dari indeks kalimat (dihitung saat indexing)
+                        with span('app.snippet'):
+                            snippet = make_snippet(full_text, sentence_index.get(doc_name), query_terms, highlighter)
+                        ranked.append((doc_name, score, snippet))
+                    return ranked
+
                 try:
-                    # Panggil search_vsm dari src/vsm_ir.py
-                    results_scores = search_vsm(
-                        query_text=query,
-                        vsm_model=vsm_model,
-                        doc_names=names,
-                        preprocessed_docs=docs_vsm_list, 
-                        k=top_k
-                    )
+                    # Hasil (ranking + snippet) diambil dari cache bersama jika kueri yang sama sudah pernah dijalankan
+                    if search_mode.startswith("🏆 BM25"):
+                        # Panggil search_bm25 dari src/bm25.py
+                        score_label = "SKOR BM25F" if use_bm25f else "SKOR BM25"
+                        bm25_index = load_bm25_index('data', corpus_signature=get_corpus_signature('data'))
+                        cache_key = ResultCache.make_key(
+                            'bm25', query_key(query_tokens), top_k, bm25_index.checksum,
+                            k1=bm25_k1, b=bm25_b, bm25f=use_bm25f
+                        )
+                        results = get_result_cache().get_or_compute(cache_key, lambda: rank_with_snippets(lambda: search_bm25(
+                            query,
+                            bm25_index,
+                            k=top_k,
+                            k1=bm25_k1,
+                            b=bm25_b,
+                            field_weights=DEFAULT_FIELD_WEIGHTS if use_bm25f else None
+                        )))
+                    else:
+                        # Panggil search_vsm dari src/vsm_ir.py
+                        score_label = "SKOR COSINE + PROXIMITY" if use_proximity else "SKOR COSINE (Soal 04)"
+                        proximity_weight = DEFAULT_PROXIMITY_WEIGHT if use_proximity else 0.0
+                        # Proximity bergantung pada urutan term, jadi kuncinya token berurutan (bukan bag-of-words)
+                        vsm_query = tuple(query_tokens) if use_proximity else query_key(query_tokens)
+                        cache_key = ResultCache.make_key('vsm', vsm_query, top_k, index_version, proximity=proximity_weight)
+                        results = get_result_cache().get_or_compute(cache_key, lambda: rank_with_snippets(lambda: search_vsm(
+                            query_text=query,
+                            vsm_model=vsm_model,
+                            doc_names=names,
+                            preprocessed_docs=None, 
+                            k=top_k,
+                            postings=vsm_postings,
+                            upper_bounds=term_upper_bounds,
+                            inverted_index=boolean_index,
+                            proximity_weight=proximity_weight
+                        )))
                 except Exception as e:
-                    st.error(f"💥 Terjadi error saat menjalankan `search_vsm`: {e}")
-                    results_scores = []
-                
-                # Buat 'results' dengan snippet
-                results = []
-                query_terms = list(set(preprocess_text(query)))
-                
-                for doc_name, score in results_scores:
-                    full_text = docs_map[doc_name]
-                    # Buat snippet 
-                    snippet = create_snippet(full_text, query_terms) 
-                    results.append((doc_name, score, snippet))
+                    st.error(f"💥 Terjadi error saat menjalankan pencarian: {e}")
+                    results = []
             
             duration = time.time() - start_time
             
             if not results:
-                 st.error("😔 Aduh! Tidak ada dokumen VSM yang relevan. Coba kueri lain.")
+                 st.error("😔 Aduh! Tidak ada dokumen yang relevan. Coba kueri lain.")
                  st.snow()
             else:
                 st.success(f"✅ Misi Selesai! Ditemukan **{len(results)}** dokumen relevan dalam **{duration:.4f} detik**.")
@@ -406,7 +434,7 @@ if submit_button:
                             <div class="result-url">🔗 {doc_name}</div>
                             <div class="result-snippet">{snippet}</div>
                             <div class="result-footer">
-                                <b>SKOR COSINE (Soal 04): {score:.4f}</b>
+                                <b>{score_label}: {score:.4f}</b>
                             </div>
                         </div>
                         """,
@@ -414,14 +442,37 @@ if submit_button:
                     )
                     st.write("") 
 
+            if query_trace is not None:
+                render_trace_panel(query_trace)
+
         # --- MODE 2: BOOLEAN ---
         else: # Mode Boolean
             st.subheader(f"🎯 Hasil Boolean untuk: '{query}'")
             
             try:
-                with st.spinner(f"🕵️‍♀️ Memeriksa Inverted Index untuk '{query}'..."):
-                    results_set = parse_boolean_query(query, boolean_index)
-                    results = sorted(list(results_set)) # Urutkan A-Z
+                with st.spinner(f"🕵️‍♀️ Memeriksa Inverted Index untuk '{query}'..."), \
+                        (trace() if show_trace else contextlib.nullcontext()) as query_trace:
+                    def match_with_snippets():
+                        results = sorted(list(parse_boolean_query(query, boolean_index))) # Urutkan A-Z
+
+                        try:
+                            query_terms = plan_terms(compile_boolean_query(query)) # Term, frasa, dan operand NEAR
+                        except BooleanQueryError:
+                            query_terms = set()
+                        highlighter = compile_highlighter(query_terms)
+                        snippets = {}
+                        for doc_name in results:
+                            with span('app.snippet'):
+                                snippets[doc_name] = make_snippet(docs_map[doc_name], sentence_index.get(doc_name), query_terms, highlighter) # snippet untuk Boolean
+                        return results, snippets
+
+                    # Kunci cache = plan Boolean (term sudah di-stem); kueri tidak valid pakai bentuk kanoniknya
+                    try:
+                        boolean_key = compile_boolean_query(query)
+                    except BooleanQueryError:
+                        boolean_key = normalize_boolean_query(query)
+                    cache_key = ResultCache.make_key('boolean', boolean_key, None, index_version)
+                    results, snippets = get_result_cache().get_or_compute(cache_key, match_with_snippets)
                 
                 duration = time.time() - start_time
                 
@@ -432,12 +483,9 @@ if submit_button:
                     st.success(f"🎉 Ditemukan **{len(results)}** dokumen yang cocok dalam **{duration:.4f} detik**.")
                     st.balloons()
                     
-                    query_terms = list(set(preprocess_text(query.replace("AND", " ").replace("OR", " ").replace("NOT", " "))))
-
                     for i, doc_name in enumerate(results):
-                        full_text = docs_map[doc_name]
                         judul_bersih = doc_name.replace(".txt", "").replace("doc", "").replace("_", " ").strip().title()
-                        snippet = create_snippet(full_text, query_terms) # snippet untuk Boolean
+                        snippet = snippets[doc_name]
 
                         # --- TAMPILAN CARD (BOOLEAN) ---
                         st.markdown(
@@ -454,9 +502,18 @@ if submit_button:
                             unsafe_allow_html=True
                         )
                         st.write("") 
+
+                if query_trace is not None:
+                    render_trace_panel(query_trace)
                         
             except Exception as e:
                  st.error(f"💥 Ups, ada yang salah dengan mantra Booleanmu. Pastikan sintaks (AND, OR, NOT) sudah benar.\nError: {e}")
 else:
    
     st.info("Selamat datang! Silakan pilih model dan masukkan kueri di atas untuk memulai pencarian. 🚀")
+
+cache_info = get_result_cache().info()
+st.sidebar.caption(
+    f"⚡ Cache hasil: **{cache_info['hits']}** hit / **{cache_info['misses']}** miss "
+    f"({cache_info['hit_ratio']:.0%}), hemat **{cache_info['saved_ms']:.1f} ms**"
+)
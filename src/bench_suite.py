@@ -0,0 +1,447 @@
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+import numpy as np
+
+# Pastikan folder root proyek ada di sys.path agar 'src' bisa diimpor
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.preprocess import preprocess_text, stem_cache, get_stemmer, clean, fast_tokenize, nltk_tokenize
+from src.boolean_ir import build_inverted_index, build_incidence_matrix, parse_boolean_query
+from src.vsm_ir import build_vsm_model, build_term_postings, compute_term_upper_bounds, search_vsm, DEFAULT_PROXIMITY_WEIGHT
+from src.benchmark import generate_synthetic_corpus
+
+# ---
+# SUITE BENCHMARK (INDEXING & LATENSI KUERI)
+# ---
+# Untuk setiap ukuran korpus sintetis diukur:
+#   - throughput tokenizer (fast_tokenize vs clean()+split() vs NLTK word_tokenize)
+#   - throughput preprocess_text (stem cache dingin vs hangat)
+#   - waktu & puncak memori build_inverted_index (biasa & posisional), build_incidence_matrix, build_vsm_model
+#   - ukuran indeks: buffer postings vs daftar posisi (overhead indeks posisional)
+#   - latensi kueri Boolean, frasa, NEAR/k, VSM, dan VSM + proximity (p50/p95/p99)
+#   - (opsional, --startup) waktu cold start CLI search.py + impor terberat (python -X importtime)
+# Hasil ditulis ke JSON; dengan --compare, hasil dibandingkan dengan run
+# sebelumnya dan metrik yang memburuk melebihi --threshold ditandai regresi.
+
+SUITE_FORMAT_VERSION = 1
+
+FIELD_LABELS = ['Posisi', 'Lokasi', 'Kualifikasi', 'Tugas Utama']
+
+# Metrik yang "lebih tinggi lebih baik"; metrik lain (waktu, memori, latensi) lebih rendah lebih baik
+HIGHER_IS_BETTER = ('docs_per_sec', 'mb_per_sec')
+
+
+def load_raw_word_frequencies(root_dir=PROJECT_ROOT):
+    """Frekuensi kata mentah (belum diproses) dari data/*.txt, tanpa label field."""
+    counts = Counter()
+    for path in glob.glob(os.path.join(root_dir, 'data', '*.txt')):
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        for label in FIELD_LABELS:
+            text = text.replace(f"{label}:", ' ')
+        counts.update(re.findall(r"[A-Za-z][A-Za-z\-]*", text))
+    return counts
+
+def generate_raw_postings(n_docs, seed=42, root_dir=PROJECT_ROOT):
+    """
+    Membuat teks lowongan mentah sintetis (dengan label field seperti data/*.txt).
+    Kata diambil dari kosakata data/*.txt dengan distribusi sesuai frekuensinya.
+    """
+    rng = np.random.default_rng(seed)
+    counts = load_raw_word_frequencies(root_dir)
+    words = np.array(list(counts.keys()))
+    weights = np.array(list(counts.values()), dtype=np.float64)
+    weights /= weights.sum()
+
+    texts = []
+    for _ in range(n_docs):
+        parts = []
+        for label in FIELD_LABELS:
+            field_words = words[rng.choice(len(words), size=int(rng.integers(3, 15)), p=weights)]
+            parts.append(f"{label}: {' '.join(field_words)}.")
+        texts.append('\n\n'.join(parts))
+    return texts
+
+def percentiles(latencies_ms):
+    """p50/p95/p99 dan rata-rata latensi (milidetik)."""
+    latencies_ms = np.asarray(latencies_ms, dtype=np.float64)
+    if len(latencies_ms) == 0:
+        return {}
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99), 'mean_ms': float(latencies_ms.mean())}
+
+def measure_build(func, *args):
+    """
+    Waktu (tanpa tracemalloc) dan puncak memori (run kedua dengan tracemalloc)
+    untuk satu fungsi build. Pesan cetak dari fungsi build disembunyikan.
+
+    Returns:
+        tuple: (hasil, {'seconds', 'peak_mb'})
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = func(*args)
+        seconds = time.perf_counter() - start
+
+        tracemalloc.start()
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, {'seconds': seconds, 'peak_mb': peak / (1 << 20)}
+
+
+def clear_stem_caches():
+    """Kosongkan stem cache proyek dan cache internal Sastrawi (CachedStemmer) agar run 'cold' benar-benar dingin."""
+    stem_cache.clear()
+    sastrawi_cache = getattr(get_stemmer(), 'cache', None)
+    if sastrawi_cache is not None and isinstance(getattr(sastrawi_cache, 'data', None), dict):
+        sastrawi_cache.data.clear()
+
+def bench_preprocess(n_docs, seed=42, sample=500):
+    """Throughput preprocess_text pada teks mentah sintetis, stem cache dingin lalu hangat."""
+    texts = generate_raw_postings(min(n_docs, sample), seed=seed)
+    saved_cache = stem_cache.items()
+
+    results = {}
+    clear_stem_caches()
+    for label in ('cold', 'warm'):
+        start = time.perf_counter()
+        for text in texts:
+            preprocess_text(text)
+        seconds = time.perf_counter() - start
+        results[label] = {'docs': len(texts), 'seconds': seconds, 'docs_per_sec': len(texts) / seconds}
+
+    stem_cache.clear()
+    stem_cache.update(saved_cache)
+    return results
+
+def bench_tokenizers(n_docs, seed=42, sample=100000):
+    """
+    Throughput tokenizer pada teks mentah sintetis: fast_tokenize (jalur default),
+    clean() + split() (jalur lama CLI), dan clean() + word_tokenize (jalur NLTK,
+    dilewati jika data punkt tidak tersedia). Hasil fast_tokenize diperiksa sama
+    dengan clean() + split().
+    """
+    texts = generate_raw_postings(min(n_docs, sample), seed=seed)
+    n_bytes = sum(len(text) for text in texts)
+    tokenizers = {
+        'fast': fast_tokenize,
+        'clean_split': lambda text: clean(text).split(),
+        'nltk': nltk_tokenize,
+    }
+
+    results = {}
+    for name, func in tokenizers.items():
+        try:
+            start = time.perf_counter()
+            outputs = [func(text) for text in texts]
+            seconds = time.perf_counter() - start
+        except (LookupError, ImportError):
+            results[name] = {'skipped': 'data punkt NLTK tidak tersedia'}
+            continue
+        results[name] = {
+            'docs': len(texts), 'seconds': seconds,
+            'docs_per_sec': len(texts) / seconds, 'mb_per_sec': n_bytes / seconds / (1 << 20),
+        }
+        if name == 'fast':
+            fast_outputs = outputs
+        elif fast_outputs != outputs:
+            mismatched = sum(a != b for a, b in zip(fast_outputs, outputs))
+            results[name]['mismatched_docs'] = mismatched
+    return results
+
+def bench_builds(doc_names, docs_map, incidence_max_docs=100000):
+    """
+    Waktu & memori build_inverted_index (biasa & posisional), build_incidence_matrix,
+    build_vsm_model. Returns: (inverted_index, positional_index, vsm_model, results).
+    """
+    corpus_text = [' '.join(docs_map[name]) for name in doc_names]
+    results = {}
+    inverted_index, results['build_inverted_index'] = measure_build(build_inverted_index, docs_map, doc_names)
+    positional_index, results['build_positional_index'] = measure_build(
+        build_inverted_index, docs_map, doc_names, False, True
+    )
+    if len(doc_names) <= incidence_max_docs:
+        _, results['build_incidence_matrix'] = measure_build(build_incidence_matrix, docs_map, doc_names)
+    vsm_model, results['build_vsm_model'] = measure_build(build_vsm_model, corpus_text)
+    return inverted_index, positional_index, vsm_model, results
+
+def index_sizes(positional_index):
+    """Ukuran buffer postings vs daftar posisi (MB) dan rasio overhead posisi."""
+    postings_bytes = positional_index.memory_bytes()
+    positions_bytes = positional_index.positions_memory_bytes()
+    return {
+        'postings_mb': postings_bytes / (1 << 20),
+        'positions_mb': positions_bytes / (1 << 20),
+        'positions_overhead': positions_bytes / postings_bytes if postings_bytes else 0.0,
+    }
+
+def generate_queries(inverted_index, n_queries, seed=42):
+    """
+    Kueri Boolean dan VSM unik dari vocabulary korpus (campuran term sering dan jarang),
+    agar cache kompilasi kueri Boolean tidak membuat latensi terlihat lebih baik.
+    """
+    rng = np.random.default_rng(seed)
+    by_df = sorted(inverted_index.vocabulary, key=inverted_index.doc_frequency, reverse=True)
+    frequent, rare = by_df[:200], by_df[200:] or by_df
+
+    boolean_queries, vsm_queries = [], []
+    templates = ['{a} AND {b}', '{a} OR {b}', '{a} AND NOT {b}', '({a} OR {b}) AND {c}']
+    for i in range(n_queries):
+        a, c = rng.choice(frequent, 2)
+        b = rng.choice(rare)
+        boolean_queries.append(templates[i % len(templates)].format(a=a, b=b, c=c))
+        n_terms = int(rng.integers(2, 5))
+        vsm_queries.append(' '.join(list(rng.choice(frequent, n_terms - 1)) + [rng.choice(rare)]))
+    return list(dict.fromkeys(boolean_queries)), list(dict.fromkeys(vsm_queries))
+
+def generate_positional_queries(doc_names, docs_map, n_queries, seed=42):
+    """
+    Kueri frasa ("a b") dan NEAR/k dari pasangan token yang benar-benar muncul
+    di dokumen korpus, jadi setiap kueri punya hasil dan posisi ikut di-decode.
+    Hanya token alfabet (lolos normalisasi kueri apa adanya) yang dipakai.
+    """
+    rng = np.random.default_rng(seed)
+    phrase_queries, near_queries = [], []
+    for _ in range(n_queries * 4):
+        if len(phrase_queries) >= n_queries and len(near_queries) >= n_queries:
+            break
+        tokens = docs_map[doc_names[int(rng.integers(len(doc_names)))]]
+        if len(tokens) < 5:
+            continue
+        i = int(rng.integers(len(tokens) - 4))
+        gap = int(rng.integers(2, 5))
+        if tokens[i].isalpha() and tokens[i + 1].isalpha() and tokens[i] != tokens[i + 1]:
+            phrase_queries.append(f'"{tokens[i]} {tokens[i + 1]}"')
+        if tokens[i].isalpha() and tokens[i + gap].isalpha() and tokens[i] != tokens[i + gap]:
+            near_queries.append(f"{tokens[i]} NEAR/{gap} {tokens[i + gap]}")
+    return list(dict.fromkeys(phrase_queries))[:n_queries], list(dict.fromkeys(near_queries))[:n_queries]
+
+def bench_queries(doc_names, docs_map, inverted_index, positional_index, vsm_model, n_queries=200, k=10, seed=42):
+    """
+    Latensi kueri Boolean (parse_boolean_query), frasa & NEAR/k (indeks posisional),
+    VSM (search_vsm) dan VSM + proximity end-to-end.
+    """
+    boolean_queries, vsm_queries = generate_queries(inverted_index, n_queries, seed=seed)
+    phrase_queries, near_queries = generate_positional_queries(doc_names, docs_map, n_queries, seed=seed)
+    postings = build_term_postings(vsm_model[1])
+    upper_bounds = compute_term_upper_bounds(postings)
+
+    runs = {
+        'boolean': (boolean_queries, lambda query: parse_boolean_query(query, inverted_index)),
+        'phrase': (phrase_queries, lambda query: parse_boolean_query(query, positional_index)),
+        'near': (near_queries, lambda query: parse_boolean_query(query, positional_index)),
+        'vsm': (vsm_queries, lambda query: search_vsm(
+            query, vsm_model, doc_names, None, k=k, postings=postings, upper_bounds=upper_bounds
+        )),
+        'vsm_proximity': (vsm_queries, lambda query: search_vsm(
+            query, vsm_model, doc_names, None, k=k, postings=postings, upper_bounds=upper_bounds,
+            inverted_index=positional_index, proximity_weight=DEFAULT_PROXIMITY_WEIGHT
+        )),
+    }
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for model, (queries, run) in runs.items():
+            latencies = []
+            for query in queries:
+                start = time.perf_counter()
+                run(query)
+                latencies.append((time.perf_counter() - start) * 1000)
+            results[model] = dict(queries=len(queries), **percentiles(latencies))
+    return results
+
+
+def parse_importtime(stderr):
+    """
+    Baca keluaran `python -X importtime`. Returns: {modul tingkat atas: detik kumulatif}.
+    Modul tingkat atas = baris yang namanya tidak diindentasi (diimpor langsung oleh skrip).
+    """
+    top_level = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):
+            top_level[name.strip()] = int(cumulative) / 1e6
+    return top_level
+
+def bench_startup(models=('boolean', 'vsm'), repeat=3, query='magang semarang'):
+    """
+    Cold start CLI: search.py dijalankan sebagai proses baru (artefak indeks sudah ada),
+    dicatat waktu total per kueri dan total waktu impor beserta 5 impor terberat.
+    """
+    script = os.path.join(PROJECT_ROOT, 'src', 'search.py')
+    results = {}
+    for model in models:
+        command = [sys.executable, script, '--model', model, '--query', query]
+        subprocess.run(command, cwd=PROJECT_ROOT, capture_output=True) # Pastikan artefak indeks sudah dibangun
+
+        wall = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(command, cwd=PROJECT_ROOT, capture_output=True, check=True)
+            wall.append(time.perf_counter() - start)
+
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime'] + command[1:], cwd=PROJECT_ROOT, capture_output=True, text=True
+        )
+        imports = parse_importtime(proc.stderr)
+        heaviest = sorted(imports.items(), key=lambda item: -item[1])[:5]
+        results[model] = {
+            'wall_seconds': float(np.median(wall)),
+            'import_seconds': sum(imports.values()),
+            'heaviest_imports': [{'module': name, 'seconds': seconds} for name, seconds in heaviest],
+        }
+    return results
+
+def run_suite(sizes, seed=42, n_queries=200, preprocess_sample=500, incidence_max_docs=100000, tokenize_sample=100000,
+              startup=False):
+    """Jalankan seluruh suite untuk setiap ukuran korpus. Returns: dict siap ditulis ke JSON."""
+    report = {
+        'format_version': SUITE_FORMAT_VERSION,
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'params': {
+            'seed': seed, 'queries': n_queries,
+            'preprocess_sample': preprocess_sample, 'incidence_max_docs': incidence_max_docs,
+            'tokenize_sample': tokenize_sample,
+        },
+        'results': {},
+    }
+
+    for n_docs in sizes:
+        print(f"--- Korpus sintetis: {n_docs} dokumen ---")
+        doc_names, docs_map = generate_synthetic_corpus(n_docs, seed=seed)
+        result = {
+            'tokenize': bench_tokenizers(n_docs, seed=seed, sample=tokenize_sample),
+            'preprocess': bench_preprocess(n_docs, seed=seed, sample=preprocess_sample),
+        }
+        inverted_index, positional_index, vsm_model, result['build'] = bench_builds(doc_names, docs_map, incidence_max_docs)
+        result['index_size'] = index_sizes(positional_index)
+        result['query'] = bench_queries(
+            doc_names, docs_map, inverted_index, positional_index, vsm_model, n_queries=n_queries, seed=seed
+        )
+        report['results'][str(n_docs)] = result
+        print_size_result(n_docs, result)
+
+    if startup:
+        print("--- Cold start CLI (search.py) ---")
+        report['results']['startup'] = bench_startup()
+        for model, res in report['results']['startup'].items():
+            heaviest = ', '.join(f"{imp['module']} {imp['seconds']:.2f}s" for imp in res['heaviest_imports'][:3])
+            print(f"  {model}: {res['wall_seconds']:.2f} detik total, impor {res['import_seconds']:.2f} detik ({heaviest})")
+    return report
+
+def print_size_result(n_docs, result):
+    """Ringkasan satu ukuran korpus di konsol."""
+    for name, res in result['tokenize'].items():
+        if 'skipped' in res:
+            print(f"  tokenizer {name}: dilewati ({res['skipped']})")
+            continue
+        mismatch = f", {res['mismatched_docs']} dokumen berbeda dari fast" if res.get('mismatched_docs') else ''
+        print(f"  tokenizer {name}: {res['docs_per_sec']:.0f} dokumen/detik, {res['mb_per_sec']:.1f} MB/detik{mismatch}")
+    for label, res in result['preprocess'].items():
+        print(f"  preprocess_text ({label}): {res['docs_per_sec']:.0f} dokumen/detik")
+    for name, res in result['build'].items():
+        print(f"  {name}: {res['seconds']:.3f} detik, puncak {res['peak_mb']:.1f} MB")
+    size = result['index_size']
+    print(f"  ukuran indeks: postings {size['postings_mb']:.2f} MB, posisi {size['positions_mb']:.2f} MB "
+          f"(overhead {size['positions_overhead']:.2f}x)")
+    for model, res in result['query'].items():
+        if not res.get('queries'):
+            print(f"  kueri {model}: tidak ada kueri")
+            continue
+        print(f"  kueri {model}: p50 {res['p50_ms']:.3f} ms, p95 {res['p95_ms']:.3f} ms, p99 {res['p99_ms']:.3f} ms")
+
+
+def flatten_metrics(results, prefix=''):
+    """{'1000': {'build': {...}}} -> {'1000.build.build_vsm_model.seconds': nilai}"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten_metrics(value, name))
+        elif isinstance(value, (int, float)) and key not in ('docs', 'queries', 'mismatched_docs'):
+            flat[name] = value
+    return flat
+
+def compare_reports(baseline, current, threshold=0.2):
+    """
+    Bandingkan dua hasil suite. Metrik yang memburuk lebih dari `threshold`
+    (relatif) dianggap regresi.
+
+    Returns:
+        list of dict: {'metric', 'baseline', 'current', 'change'} untuk setiap regresi.
+    """
+    old = flatten_metrics(baseline.get('results', {}))
+    new = flatten_metrics(current.get('results', {}))
+    regressions = []
+    for name in sorted(set(old) & set(new)):
+        if old[name] <= 0:
+            continue
+        change = (new[name] - old[name]) / old[name]
+        worse = -change if name.endswith(HIGHER_IS_BETTER) else change
+        if worse > threshold:
+            regressions.append({'metric': name, 'baseline': old[name], 'current': new[name], 'change': change})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite benchmark indexing & latensi kueri STKI")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="Ukuran korpus sintetis (misal: 1000 10000 100000 1000000).")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--queries', type=int, default=200, help="Jumlah kueri per model untuk persentil latensi.")
+    parser.add_argument('--preprocess-sample', type=int, default=500, help="Maksimum dokumen untuk throughput preprocess_text.")
+    parser.add_argument('--tokenize-sample', type=int, default=100000, help="Maksimum dokumen untuk throughput tokenizer.")
+    parser.add_argument('--incidence-max-docs', type=int, default=100000, help="Lewati build_incidence_matrix di atas ukuran ini.")
+    parser.add_argument('--startup', action='store_true', help="Ukur juga cold start CLI search.py (python -X importtime).")
+    parser.add_argument('--output', default=None, help="File JSON hasil (default: data/cache/bench/suite_<waktu>.json).")
+    parser.add_argument('--compare', default=None, help="File JSON hasil sebelumnya sebagai baseline.")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Batas perubahan relatif untuk regresi (0.2 = 20%%).")
+    args = parser.parse_args()
+
+    report = run_suite(
+        args.sizes, seed=args.seed, n_queries=args.queries,
+        preprocess_sample=args.preprocess_sample, incidence_max_docs=args.incidence_max_docs,
+        tokenize_sample=args.tokenize_sample, startup=args.startup
+    )
+
+    output = args.output or os.path.join(PROJECT_ROOT, 'data', 'cache', 'bench', f"suite_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nHasil disimpan di '{output}'.")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_reports(baseline, report, threshold=args.threshold)
+        if not regressions:
+            print(f"Tidak ada regresi dibanding '{args.compare}' (batas {args.threshold:.0%}).")
+            return
+        print(f"\nREGRESI dibanding '{args.compare}' (batas {args.threshold:.0%}):")
+        for reg in regressions:
+            print(f"  {reg['metric']}: {reg['baseline']:.4f} -> {reg['current']:.4f} ({reg['change']:+.0%})")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from collections import Counter
+import numpy as np
+
+# Pastikan folder root proyek ada di sys.path agar 'src' bisa diimpor
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.boolean_ir import build_inverted_index, intersect_postings
+from src.vsm_ir import (
+    build_vsm_model, build_term_postings, compute_term_upper_bounds,
+    rank_vsm, rank_vsm_maxscore, score_term_at_a_time, top_k_indices
+)
+
+# ---
+# KORPUS SINTETIS
+# ---
+
+def load_term_frequencies(root_dir=PROJECT_ROOT):
+    """Frekuensi term dari data/processed/ (dipakai sebagai sumber vocabulary sintetis)."""
+    counts = Counter()
+    for path in glob.glob(os.path.join(root_dir, 'data', 'processed', 'processed_doc*.txt')):
+        with open(path, 'r', encoding='utf-8') as f:
+            counts.update(f.read().split())
+    return counts
+
+def generate_synthetic_corpus(n_docs, doc_length=25, seed=42, root_dir=PROJECT_ROOT):
+    """
+    Membuat korpus lowongan sintetis yang sudah diproses (token).
+    Term asli diurutkan dari yang paling sering, lalu ditambah varian term langka
+    agar vocabulary tumbuh mengikuti ukuran korpus (kurang lebih hukum Heaps).
+    Term diambil dengan distribusi Zipf.
+
+    Returns:
+        tuple: (doc_names, docs_preprocessed_map)
+    """
+    rng = np.random.default_rng(seed)
+    real_terms = [term for term, _ in load_term_frequencies(root_dir).most_common()]
+
+    vocab_size = max(len(real_terms), int(30 * np.sqrt(n_docs)))
+    synthetic_terms = [
+        f"{real_terms[i % len(real_terms)]}{i // len(real_terms)}"
+        for i in range(vocab_size - len(real_terms))
+    ]
+    vocabulary = np.array(real_terms + synthetic_terms)
+
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    weights /= weights.sum()
+
+    lengths = rng.poisson(doc_length, size=n_docs).clip(min=1)
+    term_ids = rng.choice(len(vocabulary), size=int(lengths.sum()), p=weights)
+
+    doc_names = [f"doc{i:07d}_sintetis.txt" for i in range(n_docs)]
+    docs_preprocessed_map = {}
+    start = 0
+    for doc_name, length in zip(doc_names, lengths):
+        docs_preprocessed_map[doc_name] = vocabulary[term_ids[start:start + length]].tolist()
+        start += length
+    return doc_names, docs_preprocessed_map
+
+# ---
+# BENCHMARK MEMORI POSTINGS
+# ---
+
+def measure_set_postings_bytes(docs_preprocessed_map):
+    """
+    Ukuran inverted index versi lama (dict: term -> set of doc_names).
+    Hanya set-nya yang dihitung; string nama dokumen dipakai bersama.
+    """
+    inverted_index = {}
+    for doc_name, tokens in docs_preprocessed_map.items():
+        for term in tokens:
+            if term not in inverted_index:
+                inverted_index[term] = set()
+            inverted_index[term].add(doc_name)
+
+    n_postings = sum(len(docs) for docs in inverted_index.values())
+    total_bytes = sys.getsizeof(inverted_index) + sum(sys.getsizeof(docs) for docs in inverted_index.values())
+    return total_bytes, n_postings
+
+def bench_postings_memory(n_docs, seed=42):
+    """Bandingkan byte per posting: set nama dokumen vs array uint32 vs delta + variable-byte."""
+    doc_names, docs_map = generate_synthetic_corpus(n_docs, seed=seed)
+
+    set_bytes, n_postings = measure_set_postings_bytes(docs_map)
+    plain = build_inverted_index(docs_map, doc_names)
+    packed = build_inverted_index(docs_map, doc_names, compress=True)
+
+    return {
+        'n_docs': n_docs,
+        'n_terms': len(plain),
+        'n_postings': n_postings,
+        'bytes_per_posting': {
+            'set_of_names': set_bytes / n_postings,
+            'array_uint32': plain.memory_bytes() / n_postings,
+            'vbyte_delta': packed.memory_bytes() / n_postings,
+        },
+    }
+
+# ---
+# BENCHMARK BOOLEAN AND
+# ---
+
+def time_call(func, repeat=50):
+    """Median waktu eksekusi func() dalam mikrodetik."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return float(np.median(durations) * 1e6)
+
+def bench_boolean_and(n_docs, seed=42, pairs=None):
+    """
+    Bandingkan AND dua term: set.intersection (versi lama), np.intersect1d
+    (merge penuh), dan intersect_postings (pencarian daftar pendek di daftar panjang).
+    Default pasangan: 'magang AND semarang' dan term paling sering AND term langka.
+    """
+    doc_names, docs_map = generate_synthetic_corpus(n_docs, seed=seed)
+    inverted_index = build_inverted_index(docs_map, doc_names)
+    set_index = {term: set(inverted_index.names(inverted_index.get(term))) for term in inverted_index.vocabulary}
+
+    if pairs is None:
+        by_df = sorted(inverted_index.vocabulary, key=inverted_index.doc_frequency)
+        pairs = [('magang', 'semarang'), (by_df[-1], by_df[len(by_df) // 2])]
+
+    results = []
+    for left, right in pairs:
+        a, b = inverted_index.get(left), inverted_index.get(right)
+        results.append({
+            'query': f"{left} AND {right}",
+            'df': [len(a), len(b)],
+            'us_set_intersection': time_call(lambda: set_index.get(left, set()) & set_index.get(right, set())),
+            'us_np_intersect1d': time_call(lambda: np.intersect1d(a, b, assume_unique=True)),
+            'us_intersect_postings': time_call(lambda: intersect_postings(a, b)),
+        })
+    return results
+
+# ---
+# BENCHMARK SELEKSI TOP-K
+# ---
+
+def bench_top_k(n_docs, k_values=(3, 10, 20), nonzero_ratio=0.2, seed=42):
+    """
+    Bandingkan argsort penuh (versi lama) dengan top_k_indices (argpartition).
+    Skor cosine dibuat acak; hanya sebagian dokumen yang skornya > 0,
+    seperti kueri pendek pada korpus nyata.
+    """
+    rng = np.random.default_rng(seed)
+    scores = np.zeros(n_docs)
+    nonzero = rng.random(n_docs) < nonzero_ratio
+    scores[nonzero] = rng.random(int(nonzero.sum()))
+
+    def old_top_k(k):
+        return [i for i in scores.argsort()[-k:][::-1] if scores[i] > 0.0]
+
+    results = []
+    for k in k_values:
+        results.append({
+            'n_docs': n_docs,
+            'k': k,
+            'us_argsort': time_call(lambda: old_top_k(k), repeat=10),
+            'us_top_k': time_call(lambda: top_k_indices(scores, k, min_score=0.0), repeat=10),
+        })
+    return results
+
+# ---
+# BENCHMARK SKORING VSM
+# ---
+
+def bench_vsm_scoring(n_docs, k=10, seed=42, queries=None):
+    """
+    Bandingkan cosine_similarity ke seluruh matriks (versi lama) dengan
+    skoring term-at-a-time yang hanya menyentuh postings term kueri.
+    """
+    from sklearn.metrics.pairwise import cosine_similarity # Hanya baseline bagian ini yang butuh scikit-learn
+    doc_names, docs_map = generate_synthetic_corpus(n_docs, seed=seed)
+    vectorizer, tfidf_matrix_docs = build_vsm_model([' '.join(docs_map[name]) for name in doc_names])
+    postings = build_term_postings(tfidf_matrix_docs)
+
+    if queries is None:
+        queries = ['magang semarang', 'admin gudang kendal', 'barista kopi ungaran shift']
+
+    results = []
+    for query in queries:
+        query_vector = vectorizer.transform([query])
+        touched = sum(postings[0][t + 1] - postings[0][t] for t in query_vector.indices)
+
+        def full_cosine():
+            scores = cosine_similarity(query_vector, tfidf_matrix_docs).flatten()
+            return top_k_indices(scores, k, min_score=0.0)
+
+        results.append({
+            'n_docs': n_docs,
+            'query': query,
+            'touched_postings': int(touched),
+            'us_full_cosine': time_call(full_cosine, repeat=10),
+            'us_term_at_a_time': time_call(lambda: rank_vsm(query_vector, postings, k), repeat=10),
+        })
+    return results
+
+def bench_maxscore(n_docs, k=10, seed=42, queries=None):
+    """
+    Bandingkan skoring term-at-a-time lengkap dengan pruning MaxScore:
+    berapa dokumen yang cocok, yang jadi kandidat (dari term esensial),
+    yang diskor penuh, dan yang dilewati.
+    """
+    doc_names, docs_map = generate_synthetic_corpus(n_docs, seed=seed)
+    vectorizer, tfidf_matrix_docs = build_vsm_model([' '.join(docs_map[name]) for name in doc_names])
+    postings = build_term_postings(tfidf_matrix_docs)
+    upper_bounds = compute_term_upper_bounds(postings)
+
+    if queries is None:
+        queries = ['magang admin semarang', 'magang semarang', 'barista kopi ungaran shift']
+
+    results = []
+    for query in queries:
+        query_vector = vectorizer.transform([query])
+        stats = {}
+        rank_vsm_maxscore(query_vector, postings, upper_bounds, k, stats=stats)
+        results.append({
+            'n_docs': n_docs,
+            'query': query,
+            'matching_docs': len(score_term_at_a_time(query_vector, postings)[0]),
+            'candidate_docs': stats.get('candidates', 0),
+            'scored_docs': stats.get('scored', 0),
+            'us_exhaustive': time_call(lambda: rank_vsm(query_vector, postings, k), repeat=10),
+            'us_maxscore': time_call(
+                lambda: rank_vsm_maxscore(query_vector, postings, upper_bounds, k), repeat=10
+            ),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark STKI")
+    parser.add_argument('--docs', type=int, nargs='+', default=[1000, 10000, 100000], help="Ukuran korpus sintetis.")
+    parser.add_argument('--topk-docs', type=int, nargs='+', default=[100000, 1000000], help="Jumlah dokumen untuk benchmark top-k.")
+    parser.add_argument('--vsm-docs', type=int, nargs='+', default=[10000, 100000], help="Jumlah dokumen untuk benchmark skoring VSM.")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print("--- BENCHMARK MEMORI POSTINGS (byte per posting) ---")
+    print(f"{'dokumen':>10} {'postings':>12} {'set nama':>10} {'uint32':>10} {'vbyte':>10}")
+    for n_docs in args.docs:
+        res = bench_postings_memory(n_docs, seed=args.seed)
+        bpp = res['bytes_per_posting']
+        print(f"{res['n_docs']:>10} {res['n_postings']:>12} "
+              f"{bpp['set_of_names']:>10.2f} {bpp['array_uint32']:>10.2f} {bpp['vbyte_delta']:>10.2f}")
+
+    print("\n--- BENCHMARK BOOLEAN AND (mikrodetik, median) ---")
+    print(f"{'dokumen':>10} {'kueri':<28} {'df':>16} {'set':>10} {'intersect1d':>12} {'engine':>10}")
+    for n_docs in args.docs:
+        for res in bench_boolean_and(n_docs, seed=args.seed):
+            df = f"{res['df'][0]}/{res['df'][1]}"
+            print(f"{n_docs:>10} {res['query']:<28} {df:>16} {res['us_set_intersection']:>10.1f} "
+                  f"{res['us_np_intersect1d']:>12.1f} {res['us_intersect_postings']:>10.1f}")
+
+    print("\n--- BENCHMARK SELEKSI TOP-K (mikrodetik, median) ---")
+    print(f"{'dokumen':>10} {'k':>4} {'argsort':>12} {'top_k':>12} {'speedup':>8}")
+    for n_docs in args.topk_docs:
+        for res in bench_top_k(n_docs, seed=args.seed):
+            print(f"{res['n_docs']:>10} {res['k']:>4} {res['us_argsort']:>12.1f} "
+                  f"{res['us_top_k']:>12.1f} {res['us_argsort'] / res['us_top_k']:>7.1f}x")
+
+    print("\n--- BENCHMARK SKORING VSM (mikrodetik, median) ---")
+    print(f"{'dokumen':>10} {'kueri':<28} {'postings':>10} {'cosine':>12} {'term-at-a-time':>15}")
+    for n_docs in args.vsm_docs:
+        for res in bench_vsm_scoring(n_docs, seed=args.seed):
+            print(f"{res['n_docs']:>10} {res['query']:<28} {res['touched_postings']:>10} "
+                  f"{res['us_full_cosine']:>12.1f} {res['us_term_at_a_time']:>15.1f}")
+
+    print("\n--- BENCHMARK PRUNING MAXSCORE (k=10, mikrodetik, median) ---")
+    print(f"{'dokumen':>10} {'kueri':<28} {'cocok':>8} {'kandidat':>9} {'diskor':>8} {'dilewati':>9} {'lengkap':>10} {'maxscore':>10}")
+    for n_docs in args.vsm_docs:
+        for res in bench_maxscore(n_docs, seed=args.seed):
+            skipped = res['matching_docs'] - res['scored_docs']
+            print(f"{res['n_docs']:>10} {res['query']:<28} {res['matching_docs']:>8} {res['candidate_docs']:>9} {res['scored_docs']:>8} "
+                  f"{skipped:>9} {res['us_exhaustive']:>10.1f} {res['us_maxscore']:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+import os
+import re
+import json
+import glob
+import time
+from collections import Counter
+import numpy as np
+
+from src.preprocess import preprocess_text, iter_preprocess_corpus, get_preprocessor
+from src.corpus_reader import iter_files, list_corpus_files
+from src.vsm_ir import top_k_indices
+from src.instrument import span
+from src.index_store import (INDEX_ROOT, get_source_stats, compute_checksum, is_index_fresh, read_index_meta,
+                             save_artifact_arrays, load_artifact_arrays)
+
+# ---
+# MODEL BM25 / BM25F
+# ---
+# Indeks BM25 menyimpan semua statistik yang dibutuhkan skoring dalam array ringkas:
+#   idf            -> IDF BM25 per term
+#   postings_indptr, postings_docs -> postings per term (CSC, ID dokumen terurut)
+#   field_tfs      -> frekuensi term per field untuk setiap posting (n_field x n_posting)
+#   field_lengths  -> panjang tiap field per dokumen (n_field x n_dokumen)
+# BM25 biasa memakai jumlah tf dan panjang semua field; BM25F memberi bobot
+# per field (misal term di 'Posisi' lebih penting dari term di 'Tugas Utama').
+
+BM25_FORMAT_VERSION = 2
+BM25_INDEX_DIR = os.path.join(INDEX_ROOT, 'index_bm25')
+
+DEFAULT_K1 = 1.2
+DEFAULT_B = 0.75
+
+FIELDS = ('posisi', 'lokasi', 'kualifikasi', 'lainnya')
+DEFAULT_FIELD_WEIGHTS = {'posisi': 3.0, 'lokasi': 2.0, 'kualifikasi': 1.5, 'lainnya': 1.0}
+
+# Label di dokumen lowongan -> field BM25F. Label lain masuk 'lainnya'.
+FIELD_LABELS = {
+    'posisi': 'posisi',
+    'lokasi': 'lokasi',
+    'keterangan lokasi': 'lokasi',
+    'kualifikasi': 'kualifikasi',
+    'skill wajib': 'kualifikasi',
+    'kebutuhan': 'kualifikasi',
+}
+
+_LABEL_RE = re.compile(r'^\s*([A-Za-z][A-Za-z ]{0,30}):\s*(.*)$')
+
+_ARRAY_NAMES = ['idf', 'postings_indptr', 'postings_docs', 'field_tfs', 'field_lengths']
+
+
+def split_fields(text):
+    """
+    Memecah dokumen lowongan mentah menjadi field berdasarkan label di awal baris
+    ('Posisi: ...', 'Lokasi: ...'). Baris tanpa label ikut field sebelumnya.
+
+    Returns:
+        dict: field -> teks (semua field di FIELDS selalu ada).
+    """
+    parts = {field: [] for field in FIELDS}
+    current = 'lainnya'
+    for line in text.splitlines():
+        match = _LABEL_RE.match(line)
+        if match:
+            current = FIELD_LABELS.get(match.group(1).strip().lower(), 'lainnya')
+            line = match.group(2)
+        parts[current].append(line)
+    return {field: '\n'.join(lines) for field, lines in parts.items()}
+
+
+class BM25Index:
+    """
+    Indeks BM25/BM25F di atas array numpy.
+    Parameter k1, b, dan bobot field dipilih saat kueri, bukan saat indexing.
+    """
+
+    def __init__(self, vocabulary, doc_names, idf, postings_indptr, postings_docs, field_tfs, field_lengths, checksum=None):
+        self.vocabulary = list(vocabulary)
+        self.checksum = checksum # Versi artefak (checksum korpus); None jika belum disimpan
+        self.doc_names = list(doc_names)
+        self.term_to_id = {term: i for i, term in enumerate(self.vocabulary)}
+        self.idf = idf
+        self.postings_indptr = postings_indptr
+        self.postings_docs = postings_docs
+        self.field_tfs = field_tfs
+        self.field_lengths = field_lengths
+
+        lengths = np.asarray(field_lengths, dtype=np.float64)
+        self.avg_field_lengths = lengths.mean(axis=1) if lengths.shape[1] else np.zeros(len(FIELDS))
+        self.doc_lengths = lengths.sum(axis=0)
+        self.avg_doc_length = self.doc_lengths.mean() if len(self.doc_lengths) else 0.0
+
+    @classmethod
+    def from_field_tokens(cls, doc_names, docs_field_tokens):
+        """
+        Membangun indeks dari token per field. Hitungan term per field dibangun
+        sekali sebagai matriks sparse (term x dokumen, duplikat dijumlahkan);
+        postings = gabungan struktur semua field, lalu tf tiap field disejajarkan
+        dengan postings itu lewat searchsorted.
+
+        Args:
+            doc_names (list): Nama dokumen (urutan = ID dokumen).
+            docs_field_tokens (list): Per dokumen, dict field -> list token.
+        """
+        from scipy.sparse import csr_matrix
+
+        n_docs = len(doc_names)
+        field_tokens = [[fields.get(field, []) for fields in docs_field_tokens] for field in FIELDS]
+        field_lengths = np.array(
+            [[len(tokens) for tokens in token_lists] for token_lists in field_tokens], dtype=np.uint32
+        ).reshape(len(FIELDS), n_docs)
+
+        vocabulary = sorted({token for token_lists in field_tokens for tokens in token_lists for token in tokens})
+        term_to_id = {term: i for i, term in enumerate(vocabulary)}
+
+        counts = []
+        for f, token_lists in enumerate(field_tokens):
+            lengths = field_lengths[f].astype(np.int64)
+            term_ids = np.fromiter(
+                (term_to_id[token] for tokens in token_lists for token in tokens), dtype=np.int64, count=int(lengths.sum())
+            )
+            doc_ids = np.repeat(np.arange(n_docs, dtype=np.int64), lengths)
+            field_counts = csr_matrix(
+                (np.ones(term_ids.size, dtype=np.int64), (term_ids, doc_ids)), shape=(len(vocabulary), n_docs)
+            )
+            field_counts.sort_indices()
+            counts.append(field_counts)
+
+        # Semua pasangan (term, dokumen) yang muncul di field mana pun, urut term lalu dokumen
+        postings = sum(counts[1:], counts[0]).tocsr()
+        postings.sort_indices()
+        postings_indptr = postings.indptr.astype(np.int64)
+        postings_docs = postings.indices.astype(np.uint32)
+
+        def pair_keys(matrix):
+            return np.repeat(np.arange(len(vocabulary), dtype=np.int64), np.diff(matrix.indptr)) * n_docs + matrix.indices
+
+        keys = pair_keys(postings)
+        field_tfs = np.zeros((len(FIELDS), len(postings_docs)), dtype=np.uint16)
+        for f, field_counts in enumerate(counts):
+            field_tfs[f, np.searchsorted(keys, pair_keys(field_counts))] = np.minimum(
+                field_counts.data, np.iinfo(np.uint16).max
+            )
+
+        df = np.diff(postings_indptr)
+        idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+
+        print(f"Indeks BM25 berhasil dibangun ({n_docs} dokumen, {len(vocabulary)} term).")
+        return cls(vocabulary, doc_names, idf, postings_indptr, postings_docs, field_tfs, field_lengths)
+
+    def query_terms(self, query_tokens):
+        """(term_ids, frekuensi di kueri) untuk token kueri yang ada di vocabulary."""
+        counts = Counter(token for token in query_tokens if token in self.term_to_id)
+        term_ids = np.array([self.term_to_id[token] for token in counts], dtype=np.int64)
+        return term_ids, np.array(list(counts.values()), dtype=np.float64)
+
+    def score(self, query_tokens, k1=DEFAULT_K1, b=DEFAULT_B, field_weights=None):
+        """
+        Skor BM25 (atau BM25F jika field_weights diberikan) untuk dokumen yang
+        memuat minimal satu token kueri. Hanya postings term kueri yang disentuh.
+
+        BM25F memakai pseudo-tf: jumlah tf per field x bobot field, masing-masing
+        dinormalisasi panjang field-nya; lalu saturasi k1 seperti BM25 biasa.
+
+        Returns:
+            tuple: (doc_ids, scores) -- doc_ids terurut naik.
+        """
+        term_ids, query_tf = self.query_terms(query_tokens)
+        if len(term_ids) == 0:
+            return np.zeros(0, dtype=np.intp), np.zeros(0)
+
+        starts, ends = self.postings_indptr[term_ids], self.postings_indptr[term_ids + 1]
+        lengths = ends - starts
+        # Indeks posting semua term kueri sekaligus (gabungan rentang [start, end) tanpa loop)
+        positions = np.arange(lengths.sum()) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        docs = np.asarray(self.postings_docs[positions], dtype=np.intp)
+        # Bobot term kueri (idf x frekuensi di kueri) untuk setiap posting yang disentuh
+        term_weight = np.repeat(self.idf[term_ids] * query_tf, ends - starts)
+
+        tfs = np.asarray(self.field_tfs[:, positions], dtype=np.float64)
+        if field_weights is None:
+            tf = tfs.sum(axis=0)
+            tf = tf / (1.0 - b + b * self.doc_lengths[docs] / max(self.avg_doc_length, 1e-9))
+        else:
+            weights = np.array([field_weights.get(field, 0.0) for field in FIELDS])[:, None]
+            lengths = np.asarray(self.field_lengths[:, docs], dtype=np.float64)
+            norms = 1.0 - b + b * lengths / np.maximum(self.avg_field_lengths, 1e-9)[:, None]
+            tf = (weights * tfs / norms).sum(axis=0)
+
+        contributions = term_weight * tf * (k1 + 1.0) / (tf + k1)
+
+        doc_ids, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=contributions, minlength=len(doc_ids))
+        return doc_ids, scores
+
+    def rank(self, query_tokens, k=5, k1=DEFAULT_K1, b=DEFAULT_B, field_weights=None, min_score=0.0):
+        """Top-k (doc_ids, scores) berurutan dari skor tertinggi."""
+        doc_ids, scores = self.score(query_tokens, k1=k1, b=b, field_weights=field_weights)
+        top = top_k_indices(scores, k, min_score=min_score)
+        return doc_ids[top], scores[top]
+
+    # --- Persistensi ---
+
+    def save(self, index_dir, checksum, source_stats=None):
+        """
+        Simpan indeks sebagai artefak .npy + meta.json: array ditulis ke folder
+        generasi baru lalu meta.json ditukar secara atomik (lihat
+        index_store.save_artifact_arrays), jadi pembaca tidak pernah melihat
+        campuran array lama dan baru.
+        """
+        arrays = {name: getattr(self, name) for name in _ARRAY_NAMES}
+        save_artifact_arrays(index_dir, arrays, {
+            'format_version': BM25_FORMAT_VERSION,
+            'checksum': checksum,
+            'pipeline': get_preprocessor().config(),
+            'source_stats': source_stats or [],
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'fields': list(FIELDS),
+            'doc_names': self.doc_names,
+            'vocabulary': self.vocabulary,
+        })
+        print(f"Artefak BM25 disimpan di '{index_dir}'.")
+
+    @classmethod
+    def load(cls, index_dir, mmap=True):
+        """Muat artefak BM25 (memory-map). None jika tidak ada, rusak, atau beda versi."""
+        meta = read_index_meta(index_dir)
+        if meta is None or meta.get('format_version') != BM25_FORMAT_VERSION or meta.get('fields') != list(FIELDS):
+            return None
+        arrays = load_artifact_arrays(index_dir, meta, _ARRAY_NAMES, mmap=mmap)
+        if arrays is None:
+            return None
+        return cls(meta['vocabulary'], meta['doc_names'], checksum=meta.get('checksum'), **arrays)
+
+
+def build_bm25_index(docs, workers=None, total=None, progress=None):
+    """
+    Membangun indeks BM25F dari dokumen mentah (doc_id, name, text), misal dari
+    iter_corpus: setiap dokumen dipecah per field, lalu semua field di-preprocess
+    secara streaming (paralel). Teks mentah tidak ditahan seluruhnya di memori.
+
+    Args:
+        total (int): Jumlah dokumen jika diketahui (hanya untuk progress).
+    """
+    doc_names = []
+    def field_texts():
+        for _, name, text in docs:
+            doc_names.append(name)
+            fields = split_fields(text)
+            for field in FIELDS:
+                yield fields[field]
+
+    flat_tokens = iter_preprocess_corpus(
+        field_texts(), workers=workers, progress=progress,
+        total=total * len(FIELDS) if total is not None else None
+    )
+    docs_field_tokens = []
+    for tokens in zip(*[flat_tokens] * len(FIELDS)): # Kelompokkan per dokumen (urutan FIELDS)
+        docs_field_tokens.append(dict(zip(FIELDS, tokens)))
+    return BM25Index.from_field_tokens(doc_names, docs_field_tokens)
+
+def load_or_build_bm25(data_dir, index_dir=BM25_INDEX_DIR, pattern='*.txt', workers=None, progress=None):
+    """
+    Memuat artefak BM25 jika masih sesuai dengan isi data_dir (cek yang sama
+    dengan artefak VSM), jika tidak dibangun ulang dari dokumen mentah.
+    """
+    file_paths = list_corpus_files(data_dir, pattern)
+    if is_index_fresh(index_dir, file_paths, format_version=BM25_FORMAT_VERSION):
+        index = BM25Index.load(index_dir)
+        if index is not None:
+            return index
+
+    print(f"Artefak BM25 di '{index_dir}' tidak ada atau basi. Membangun ulang...")
+    index = build_bm25_index(iter_files(file_paths), workers=workers, total=len(file_paths), progress=progress)
+    index.save(index_dir, compute_checksum(file_paths), get_source_stats(file_paths))
+    return BM25Index.load(index_dir)
+
+
+def search_bm25(query_text, bm25_index, k=5, k1=DEFAULT_K1, b=DEFAULT_B, field_weights=None):
+    """
+    Mencari kueri dengan BM25/BM25F. Format hasil sama dengan search_vsm:
+    list of (doc_name, score).
+    """
+    query_tokens = preprocess_text(query_text)
+    if not query_tokens:
+        print("Kueri BM25 kosong setelah preprocessing.")
+        return []
+
+    with span('bm25.rank') as s:
+        doc_ids, scores = bm25_index.rank(query_tokens, k=k, k1=k1, b=b, field_weights=field_weights)
+        s.count('results', len(doc_ids))
+    return [(bm25_index.doc_names[doc_id], score) for doc_id, score in zip(doc_ids, scores)]
+
+
+if __name__ == '__main__':
+    # Uji cepat: BM25 biasa dibandingkan dengan rumus BM25 yang dihitung langsung
+    PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    data_dir = os.path.join(PROJECT_ROOT, 'data')
+    file_paths = sorted(glob.glob(os.path.join(data_dir, '*.txt')))
+    doc_names = [os.path.basename(path) for path in file_paths]
+    raw_texts = [text for _, _, text in iter_files(file_paths)]
+
+    index = build_bm25_index(iter_files(file_paths), workers=1)
+    docs_tokens = [
+        [token for field in FIELDS for token in preprocess_text(split_fields(text)[field])]
+        for text in raw_texts
+    ]
+    avgdl = np.mean([len(tokens) for tokens in docs_tokens])
+
+    def bm25_manual(query_tokens, k1=DEFAULT_K1, b=DEFAULT_B):
+        scores = np.zeros(len(docs_tokens))
+        for term, qtf in Counter(query_tokens).items():
+            df = sum(term in tokens for tokens in docs_tokens)
+            if df == 0:
+                continue
+            idf = np.log(1.0 + (len(docs_tokens) - df + 0.5) / (df + 0.5))
+            for d, tokens in enumerate(docs_tokens):
+                tf = tokens.count(term)
+                scores[d] += qtf * idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(tokens) / avgdl))
+        return scores
+
+    for query in ['magang semarang', 'admin gudang', 'barista kopi ungaran', 'web developer react']:
+        tokens = preprocess_text(query)
+        doc_ids, scores = index.score(tokens)
+        expected = bm25_manual(tokens)
+        assert np.allclose(scores, expected[doc_ids]), query
+        assert np.allclose(np.delete(expected, doc_ids), 0.0), query
+        print(f"OK: '{query}' -> {search_bm25(query, index, k=3, field_weights=DEFAULT_FIELD_WEIGHTS)}")
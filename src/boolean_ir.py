@@ -1,21 +1,446 @@
 # --- src/boolean_ir.py (VERSI KETAT) ---
 
-from src.preprocess import preprocess_text
-from scipy.sparse import csr_matrix
-import pandas as pd
+from src.preprocess import clean_tokenize, remove_stopwords, stem, get_preprocessor
+from src.instrument import span
+from functools import lru_cache
+import re
 import numpy as np
 
-def build_inverted_index(docs_preprocessed_map, doc_names):
+# ---
+# POSTINGS KOMPAK (ID INTEGER + VARIABLE-BYTE)
+# ---
+
+def vbyte_lengths(values):
+    """Jumlah byte variable-byte untuk setiap nilai (array int64)."""
+    values = np.asarray(values, dtype=np.uint64)
+    n_bytes = np.ones(values.size, dtype=np.int64)
+    for bits in (7, 14, 21, 28, 35):
+        n_bytes += values >= (1 << bits)
+    return n_bytes
+
+def vbyte_encode(values):
+    """
+    Variable-byte encoding (vektorisasi NumPy) untuk array integer >= 0.
+    Setiap nilai ditulis dalam kelompok 7-bit (big-endian); bit tertinggi
+    menandai byte terakhir dari satu nilai.
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    if values.size == 0:
+        return np.zeros(0, dtype=np.uint8)
+
+    n_bytes = vbyte_lengths(values)
+    ends = np.cumsum(n_bytes) - 1 # Posisi byte terakhir (berisi 7 bit terendah)
+    out = np.zeros(int(ends[-1]) + 1, dtype=np.uint8)
+    for k in range(int(n_bytes.max())):
+        mask = n_bytes > k
+        out[ends[mask] - k] = (values[mask] >> np.uint64(7 * k)) & np.uint64(0x7F)
+    out[ends] |= 0x80
+    return out
+
+def vbyte_decode(buffer):
+    """Kebalikan dari vbyte_encode (vektorisasi NumPy). Mengembalikan array uint64."""
+    buffer = np.asarray(buffer, dtype=np.uint8)
+    if buffer.size == 0:
+        return np.zeros(0, dtype=np.uint64)
+
+    ends = np.flatnonzero(buffer & 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    # Jarak setiap byte ke byte terakhir dalam kelompoknya menentukan besar shift
+    group_end = np.repeat(ends, ends - starts + 1)
+    shifts = (group_end - np.arange(buffer.size)).astype(np.uint64) * np.uint64(7)
+    parts = (buffer & 0x7F).astype(np.uint64) << shifts
+    return np.add.reduceat(parts, starts)
+
+def iter_vbyte(buffer):
+    """Decode variable-byte satu per satu (on-demand), tanpa membuat array penuh."""
+    value = 0
+    for byte in buffer:
+        byte = int(byte)
+        value = (value << 7) | (byte & 0x7F)
+        if byte & 0x80:
+            yield value
+            value = 0
+
+
+# ---
+# POSISI TERM (INDEKS POSISIONAL)
+# ---
+# Untuk setiap posting (term, dokumen) disimpan daftar posisi token term itu
+# di dokumen (urutan token hasil preprocessing, jadi stopword tidak dihitung):
+#   positions_data[positions_indptr[j]:positions_indptr[j+1]]
+# berisi selisih posisi (posisi pertama = nilai absolut) yang di-encode
+# variable-byte, dengan j = indeks posting dalam urutan CSR postings dokumen
+# (term ke-i, dokumen terurut). Panjang positions_indptr = jumlah posting + 1.
+#
+# Saat kueri, posisi beberapa dokumen sekaligus di-decode dengan satu
+# vbyte_decode, lalu dijadikan kunci (doc_id << POSITION_BITS) | posisi yang
+# terurut global. Pencocokan frasa dan NEAR/k cukup berupa irisan/searchsorted
+# pada array kunci, tanpa loop Python per dokumen.
+
+POSITION_BITS = 32
+POSITION_MASK = (1 << POSITION_BITS) - 1
+
+def build_positional_postings(token_lists, vocabulary):
+    """
+    Postings + daftar posisi dari token setiap dokumen (doc_id = urutan token_lists).
+    Token yang tidak ada di vocabulary dilewati, tetapi tetap dihitung posisinya.
+
+    Returns:
+        tuple: (postings_indptr, postings_docs, positions_indptr, positions_data)
+    """
+    term_to_id = {term: i for i, term in enumerate(vocabulary)}
+    lengths = np.fromiter((len(tokens) for tokens in token_lists), dtype=np.int64, count=len(token_lists))
+    term_ids = np.fromiter(
+        (term_to_id.get(token, -1) for tokens in token_lists for token in tokens),
+        dtype=np.int64, count=int(lengths.sum())
+    )
+    return positional_postings_from_ids(term_ids, lengths, len(vocabulary))
+
+def positional_postings_from_ids(term_ids, doc_lengths, n_terms):
+    """
+    Seperti build_positional_postings, tetapi dari ID term (indeks vocabulary, -1 =
+    dilewati) semua dokumen yang disambung berurutan + jumlah token per dokumen.
+
+    Returns:
+        tuple: (postings_indptr, postings_docs, positions_indptr, positions_data)
+    """
+    term_ids = np.asarray(term_ids, dtype=np.int64)
+    lengths = np.asarray(doc_lengths, dtype=np.int64)
+    doc_ids = np.repeat(np.arange(len(lengths), dtype=np.int64), lengths)
+    positions = np.arange(term_ids.size, dtype=np.int64) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+    known = term_ids >= 0
+    term_ids, doc_ids, positions = term_ids[known], doc_ids[known], positions[known]
+    order = np.lexsort((positions, doc_ids, term_ids)) # Urut term, lalu dokumen, lalu posisi
+    term_ids, doc_ids, positions = term_ids[order], doc_ids[order], positions[order]
+
+    # Posting baru dimulai setiap kali pasangan (term, dokumen) berganti
+    new_posting = np.ones(term_ids.size, dtype=bool)
+    new_posting[1:] = (term_ids[1:] != term_ids[:-1]) | (doc_ids[1:] != doc_ids[:-1])
+    posting_starts = np.flatnonzero(new_posting)
+
+    postings_docs = doc_ids[posting_starts].astype(np.uint32)
+    postings_indptr = np.searchsorted(term_ids[posting_starts], np.arange(n_terms + 1)).astype(np.int64)
+
+    gaps = positions.copy()
+    gaps[1:] -= positions[:-1]
+    gaps[new_posting] = positions[new_posting]
+    byte_offsets = np.zeros(gaps.size + 1, dtype=np.int64)
+    np.cumsum(vbyte_lengths(gaps), out=byte_offsets[1:])
+    positions_indptr = byte_offsets[np.append(posting_starts, gaps.size)]
+    return postings_indptr, postings_docs, positions_indptr, vbyte_encode(gaps)
+
+def _decode_position_ranges(data, starts, ends):
+    """
+    Decode banyak daftar posisi sekaligus (satu vbyte_decode untuk semua rentang byte).
+
+    Returns:
+        tuple: (posisi absolut berurutan per rentang, jumlah posisi per rentang)
+    """
+    lengths = np.asarray(ends - starts, dtype=np.int64)
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(len(lengths), dtype=np.int64)
+
+    range_starts = np.cumsum(lengths) - lengths
+    byte_index = np.arange(total, dtype=np.int64) + np.repeat(np.asarray(starts, dtype=np.int64) - range_starts, lengths)
+    buffer = np.asarray(data[byte_index])
+    gaps = vbyte_decode(buffer).astype(np.int64)
+
+    # Jumlah nilai per rentang = jumlah byte penutup (bit tertinggi = 1) di rentang itu
+    range_of_byte = np.repeat(np.arange(len(lengths)), lengths)
+    counts = np.bincount(range_of_byte[(buffer & 0x80) != 0], minlength=len(lengths))
+
+    # Prefix sum per rentang: kurangi jumlah gap semua rentang sebelumnya
+    cumulative = np.cumsum(gaps)
+    first = np.cumsum(counts) - counts
+    return cumulative - np.repeat(cumulative[first] - gaps[first], counts), counts
+
+def position_keys_to_docs(keys):
+    """ID dokumen unik (terurut) dari array kunci posisi."""
+    return np.unique(keys >> POSITION_BITS).astype(np.uint32)
+
+def nearest_distances(keys_a, keys_b):
+    """
+    Untuk setiap kunci di keys_a: jarak ke posisi terdekat di keys_b pada dokumen
+    yang sama (arah mana pun). -1 jika dokumen itu tidak memuat keys_b sama sekali.
+    """
+    distances = np.full(len(keys_a), -1, dtype=np.int64)
+    if len(keys_a) == 0 or len(keys_b) == 0:
+        return distances
+    docs_a = keys_a >> POSITION_BITS
+    idx = np.searchsorted(keys_b, keys_a)
+    for neighbor in (np.minimum(idx, len(keys_b) - 1), np.maximum(idx - 1, 0)):
+        other = keys_b[neighbor]
+        same_doc = (other >> POSITION_BITS) == docs_a
+        gap = np.abs(other - keys_a)
+        better = same_doc & ((distances < 0) | (gap < distances))
+        distances[better] = gap[better]
+    return distances
+
+
+class InvertedIndex:
+    """
+    Inverted index kompak: dokumen diberi ID integer, postings setiap term
+    adalah ID yang terurut, disimpan berurutan dalam satu buffer (layout CSR):
+    postings term ke-i = data[offsets[i]:offsets[i+1]].
+
+    Jika compressed=True, data berisi selisih ID (delta/gap) yang di-encode
+    dengan variable-byte, dan offsets menunjuk posisi byte.
+
+    Jika positions=(positions_indptr, positions_data) diberikan, indeks juga
+    posisional: posisi term per posting tersedia untuk frasa dan NEAR/k.
+    """
+
+    def __init__(self, vocabulary, doc_names, offsets, data, compressed=False, positions=None):
+        self.vocabulary = list(vocabulary)
+        self.doc_names = list(doc_names)
+        self.term_to_id = {term: i for i, term in enumerate(self.vocabulary)}
+        self.offsets = offsets
+        self.data = data
+        self.compressed = compressed
+        self.positions_indptr, self.positions_data = positions if positions is not None else (None, None)
+        self._doc_freq = None
+        self._posting_starts = None
+
+    @classmethod
+    def from_postings_lists(cls, postings_lists, doc_names, compress=False):
+        """Bangun dari dict {term: iterable of doc_id}."""
+        vocabulary = sorted(postings_lists)
+        arrays = [np.unique(np.asarray(list(postings_lists[t]), dtype=np.uint32)) for t in vocabulary]
+        lengths = np.array([a.size for a in arrays], dtype=np.int64)
+
+        if not compress:
+            offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=offsets[1:])
+            data = np.concatenate(arrays) if arrays else np.zeros(0, dtype=np.uint32)
+            return cls(vocabulary, doc_names, offsets, data.astype(np.uint32), compressed=False)
+
+        encoded = [vbyte_encode(np.diff(a, prepend=0)) for a in arrays]
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum([e.size for e in encoded], out=offsets[1:])
+        data = np.concatenate(encoded) if encoded else np.zeros(0, dtype=np.uint8)
+        index = cls(vocabulary, doc_names, offsets, data, compressed=True)
+        index._doc_freq = lengths
+        return index
+
+    @classmethod
+    def from_token_lists(cls, token_lists, doc_names, compress=False):
+        """Bangun indeks posisional dari token setiap dokumen (urutan token = posisi)."""
+        vocabulary = sorted({token for tokens in token_lists for token in tokens})
+        indptr, docs, positions_indptr, positions_data = build_positional_postings(token_lists, vocabulary)
+        positions = (positions_indptr, positions_data)
+        if not compress:
+            return cls(vocabulary, doc_names, indptr, docs, compressed=False, positions=positions)
+
+        index = cls.from_postings_lists(
+            {term: docs[indptr[i]:indptr[i + 1]] for i, term in enumerate(vocabulary)}, doc_names, compress=True
+        )
+        index.positions_indptr, index.positions_data = positions
+        return index
+
+    @classmethod
+    def from_arrays(cls, vocabulary, doc_names, indptr, docs, positions=None):
+        """Bungkus array postings CSR yang sudah ada (misal memmap dari index_store) tanpa menyalin."""
+        return cls(vocabulary, doc_names, indptr, docs, compressed=False, positions=positions)
+
+    @property
+    def has_positions(self):
+        return self.positions_indptr is not None
+
+    def __contains__(self, term):
+        return term in self.term_to_id
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    def get(self, term):
+        """Postings sebuah term sebagai array ID dokumen terurut (kosong jika tidak ada)."""
+        term_id = self.term_to_id.get(term)
+        if term_id is None:
+            return np.zeros(0, dtype=np.uint32)
+        chunk = self.data[self.offsets[term_id]:self.offsets[term_id + 1]]
+        if self.compressed:
+            return np.cumsum(vbyte_decode(chunk)).astype(np.uint32)
+        return chunk
+
+    def iter_postings(self, term):
+        """Iterator ID dokumen untuk satu term, di-decode sambil jalan."""
+        term_id = self.term_to_id.get(term)
+        if term_id is None:
+            return
+        chunk = self.data[self.offsets[term_id]:self.offsets[term_id + 1]]
+        if not self.compressed:
+            yield from (int(d) for d in chunk)
+            return
+        doc_id = 0
+        for gap in iter_vbyte(chunk):
+            doc_id += gap
+            yield doc_id
+
+    def doc_frequency(self, term):
+        """Jumlah dokumen yang memuat term (tanpa perlu decode postings)."""
+        term_id = self.term_to_id.get(term)
+        if term_id is None:
+            return 0
+        if self._doc_freq is not None:
+            return int(self._doc_freq[term_id])
+        return int(self.offsets[term_id + 1] - self.offsets[term_id])
+
+    def names(self, doc_ids):
+        """Ubah ID dokumen menjadi nama file."""
+        return [self.doc_names[d] for d in doc_ids]
+
+    def num_postings(self):
+        if self._doc_freq is not None:
+            return int(self._doc_freq.sum())
+        return int(self.offsets[-1])
+
+    def memory_bytes(self):
+        """Ukuran buffer postings (offsets + data) dalam byte."""
+        return int(self.offsets.nbytes + self.data.nbytes)
+
+    def positions_memory_bytes(self):
+        """Ukuran daftar posisi (positions_indptr + positions_data) dalam byte."""
+        if not self.has_positions:
+            return 0
+        return int(self.positions_indptr.nbytes + self.positions_data.nbytes)
+
+    def to_dict(self):
+        """Bentuk lama (dict: term -> set of doc_names), untuk perbandingan/debug."""
+        return {term: set(self.names(self.get(term))) for term in self.vocabulary}
+
+    # --- Posisi ---
+
+    def _posting_base(self, term_id):
+        """Indeks posting pertama term (urutan CSR), untuk mencari daftar posisinya."""
+        if not self.compressed:
+            return int(self.offsets[term_id])
+        if self._posting_starts is None:
+            self._posting_starts = np.concatenate(([0], np.cumsum(self._doc_freq)))
+        return int(self._posting_starts[term_id])
+
+    def position_keys(self, term, doc_ids):
+        """
+        Posisi `term` di dokumen-dokumen doc_ids (terurut naik) sebagai kunci
+        (doc_id << POSITION_BITS) | posisi, terurut. Dokumen yang tidak memuat
+        term dilewati. Semua daftar posisi di-decode dalam satu batch.
+        """
+        if not self.has_positions:
+            raise ValueError("Indeks ini tidak menyimpan posisi term.")
+        term_id = self.term_to_id.get(term)
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        if term_id is None or len(doc_ids) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        postings = self.get(term)
+        local = np.searchsorted(postings, doc_ids)
+        found = local < len(postings)
+        found[found] = postings[local[found]] == doc_ids[found]
+        local, doc_ids = local[found], doc_ids[found]
+
+        postings_index = self._posting_base(term_id) + local
+        positions, counts = _decode_position_ranges(
+            self.positions_data, self.positions_indptr[postings_index], self.positions_indptr[postings_index + 1]
+        )
+        return (np.repeat(doc_ids, counts) << POSITION_BITS) | positions
+
+    def positions(self, term, doc_id):
+        """Posisi term di satu dokumen (array terurut, kosong jika tidak ada)."""
+        return self.position_keys(term, [doc_id]) & POSITION_MASK
+
+
+# ---
+# OPERASI POSTINGS (INTERSECTION/UNION/DIFFERENCE)
+# ---
+
+def _prefer_search(n_needles, n_haystack, upper):
+    """
+    Model biaya sederhana: binary search (n_needles * log n_haystack) vs bitmap
+    sepanjang rentang ID dokumen (upper). Binary search menang saat panjang timpang.
+    """
+    return n_needles * np.log2(n_haystack + 1) < upper
+
+def _bitmap(ids, upper):
+    mask = np.zeros(upper, dtype=bool)
+    mask[ids] = True
+    return mask
+
+def intersect_postings(a, b):
+    """
+    Irisan dua postings terurut. Jika panjangnya timpang, daftar yang pendek
+    dicari di daftar yang panjang (binary search tervektorisasi via np.searchsorted,
+    O(m log n)); jika seimbang, dipakai bitmap ID dokumen (O(m + n)).
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    if len(a) == 0:
+        return a
+    upper = int(max(a[-1], b[-1])) + 1
+    if _prefer_search(len(a), len(b), upper):
+        positions = np.minimum(np.searchsorted(b, a), len(b) - 1)
+        return a[b[positions] == a]
+    return a[_bitmap(b, upper)[a]]
+
+def intersect_many(postings_lists):
+    """AND banyak postings: mulai dari term paling jarang, berhenti jika hasil sudah kosong."""
+    ordered = sorted(postings_lists, key=len)
+    result = ordered[0]
+    for postings in ordered[1:]:
+        if len(result) == 0:
+            break
+        result = intersect_postings(result, postings)
+    return result
+
+def union_postings(a, b):
+    """Gabungan dua postings terurut."""
+    if len(a) == 0:
+        return b
+    if len(b) == 0:
+        return a
+    return np.union1d(a, b)
+
+def difference_postings(a, b):
+    """a NOT b: buang dari a semua ID yang ada di b."""
+    if len(a) == 0 or len(b) == 0:
+        return a
+    upper = int(max(a[-1], b[-1])) + 1
+    if not _prefer_search(len(b), len(a), upper):
+        return a[~_bitmap(b, upper)[a]]
+
+    # b jauh lebih pendek: cari posisi setiap ID b di a, lalu buang posisi itu
+    positions = np.searchsorted(a, b)
+    valid = positions < len(a)
+    hits = positions[valid][a[positions[valid]] == b[valid]]
+    if len(hits) == 0:
+        return a
+    keep = np.ones(len(a), dtype=bool)
+    keep[hits] = False
+    return a[keep]
+
+
+def build_inverted_index(docs_preprocessed_map, doc_names, compress=False, positional=False):
     """
-    Membangun Inverted Index (dict: term -> set of doc_names).
+    Membangun Inverted Index kompak (term -> postings ID dokumen terurut).
+    ID dokumen = posisi dokumen di doc_names. Jika positional=True, posisi
+    setiap term di dokumen juga disimpan (untuk frasa dan NEAR/k).
     """
-    inverted_index = {}
+    if positional:
+        inverted_index = InvertedIndex.from_token_lists(
+            [docs_preprocessed_map.get(doc_name, []) for doc_name in doc_names], doc_names, compress=compress
+        )
+        print("Indeks Boolean posisional berhasil dibangun.")
+        return inverted_index
+
+    postings_lists = {}
     
-    for doc_name, tokens in docs_preprocessed_map.items():
-        for term in tokens:
-            if term not in inverted_index:
-                inverted_index[term] = set()
-            inverted_index[term].add(doc_name)
+    for doc_id, doc_name in enumerate(doc_names):
+        for term in set(docs_preprocessed_map.get(doc_name, [])):
+            if term not in postings_lists:
+                postings_lists[term] = []
+            postings_lists[term].append(doc_id)
+
+    inverted_index = InvertedIndex.from_postings_lists(postings_lists, doc_names, compress=compress)
             
     print("Indeks Boolean (Inverted Index) berhasil dibangun.")
     return inverted_index
@@ -24,6 +449,7 @@ def build_incidence_matrix(docs_preprocessed_map, doc_names):
     """
     Membangun Incidence Matrix (Sparse Matrix) untuk Soal 03.2.a.
     """
+    from scipy.sparse import csr_matrix
     vocabulary = sorted(list(set(term for tokens in docs_preprocessed_map.values() for term in tokens)))
     term_to_index = {term: i for i, term in enumerate(vocabulary)}
     
@@ -54,64 +480,393 @@ def build_incidence_matrix(docs_preprocessed_map, doc_names):
     return incidence_matrix, metadata
 
 
+def normalize_query_terms(terms):
+    """
+    Normalisasi banyak term kueri sekaligus (clean, tokenize, stopword, stem).
+    Semua token dari semua term di-stem dalam SATU batch lewat stem cache.
+
+    Returns:
+        dict: term asli -> list token ternormalisasi. Bisa kosong (term terbuang)
+        atau lebih dari satu token (misal 'part-time' -> ['part', 'time']).
+    """
+    terms = list(dict.fromkeys(terms))
+    token_lists = [remove_stopwords(clean_tokenize(term)) for term in terms]
+    stemmed = stem([token for tokens in token_lists for token in tokens])
+
+    normalized = {}
+    start = 0
+    for term, tokens in zip(terms, token_lists):
+        roots = [root for root in stemmed[start:start + len(tokens)] if root]
+        normalized[term] = list(dict.fromkeys(roots))
+        start += len(tokens)
+    return normalized
+
 def get_postings(term, inverted_index):
     """
-    Helper function untuk mengambil postings, menggunakan preprocess_text.
+    Helper function untuk mengambil postings (array ID dokumen) satu term kueri.
+    Term yang menjadi beberapa token (misal 'part-time') diperlakukan sebagai AND.
     """
-    clean_tokens = preprocess_text(term)
+    clean_terms = normalize_query_terms([term])[term]
     
-    if not clean_tokens:
-        return set() 
-        
-    clean_term = clean_tokens[0]
+    if not clean_terms:
+        return np.zeros(0, dtype=np.uint32)
     
-    return inverted_index.get(clean_term, set())
+    return intersect_many([inverted_index.get(t) for t in clean_terms])
+
+def normalize_query_phrases(phrases):
+    """
+    Normalisasi frasa kueri (tanpa tanda kutip). Berbeda dengan
+    normalize_query_terms, urutan dan token kembar dipertahankan.
+
+    Returns:
+        dict: frasa asli -> list token ternormalisasi (berurutan).
+    """
+    phrases = list(dict.fromkeys(phrases))
+    token_lists = [remove_stopwords(clean_tokenize(phrase)) for phrase in phrases]
+    stemmed = stem([token for tokens in token_lists for token in tokens])
+
+    normalized = {}
+    start = 0
+    for phrase, tokens in zip(phrases, token_lists):
+        normalized[phrase] = [root for root in stemmed[start:start + len(tokens)] if root]
+        start += len(tokens)
+    return normalized
+
+
+# ---
+# FRASA & NEAR/k (POSITIONAL MERGE)
+# ---
+
+def match_phrase(terms, inverted_index, doc_ids=None):
+    """
+    Kunci posisi awal setiap kemunculan frasa `terms` (token berurutan).
+    Positional merge: posisi term ke-i digeser -i lalu diiris dengan kunci
+    term lain, mulai dari term paling jarang; kandidat dokumen menyusut di
+    setiap langkah sehingga posisi term yang sering hanya di-decode seperlunya.
+    """
+    if doc_ids is None:
+        doc_ids = intersect_many([inverted_index.get(term) for term in set(terms)])
+    keys = None
+    for i in sorted(range(len(terms)), key=lambda i: inverted_index.doc_frequency(terms[i])):
+        if keys is not None:
+            if len(keys) == 0:
+                break
+            doc_ids = position_keys_to_docs(keys)
+        term_keys = inverted_index.position_keys(terms[i], doc_ids)
+        term_keys = term_keys[(term_keys & POSITION_MASK) >= i] - i
+        keys = term_keys if keys is None else intersect_postings(keys, term_keys)
+    return keys
+
+def _operand_terms(node):
+    return [node[1]] if node[0] == 'TERM' else list(node[1])
+
+def _operand_keys(node, inverted_index, doc_ids):
+    """Kunci posisi operand NEAR: posisi term, atau awal & akhir setiap kemunculan frasa."""
+    if node[0] == 'PHRASE':
+        starts = match_phrase(node[1], inverted_index, doc_ids)
+        return np.union1d(starts, starts + len(node[1]) - 1)
+    return inverted_index.position_keys(node[1], doc_ids)
+
+def match_near(left, right, distance, inverted_index):
+    """
+    ID dokumen (terurut) tempat operand kiri dan kanan (term atau frasa)
+    muncul dengan jarak paling banyak `distance` posisi, arah mana pun.
+    """
+    terms = _operand_terms(left) + _operand_terms(right)
+    if None in terms:
+        return np.zeros(0, dtype=np.uint32)
+    doc_ids = intersect_many([inverted_index.get(term) for term in set(terms)])
+    if len(doc_ids) == 0:
+        return np.zeros(0, dtype=np.uint32)
+    left_keys = _operand_keys(left, inverted_index, doc_ids)
+    distances = nearest_distances(left_keys, _operand_keys(right, inverted_index, doc_ids))
+    return position_keys_to_docs(left_keys[(distances >= 0) & (distances <= distance)])
+
+# ---
+# COMPILER KUERI BOOLEAN
+# ---
+# Grammar (prioritas: NEAR/k > NOT > AND > OR, kurung untuk mengelompokkan):
+#   or_expr   := and_expr (OR and_expr)*
+#   and_expr  := not_expr ((AND | NOT) not_expr)*     ; "a NOT b" == "a AND NOT b"
+#   not_expr  := NOT not_expr | near_expr
+#   near_expr := primary (NEAR/k primary)*            ; operand NEAR harus term/frasa
+#   primary   := TERM | "FRASA" | '(' or_expr ')'
+#
+# AST berupa tuple: ('TERM', term), ('PHRASE', (term, ...)), ('NEAR', k, kiri, kanan),
+# ('NOT', node), ('AND', (node, ...)), ('OR', (node, ...)).
+# ('TERM', None) berarti term yang habis saat preprocessing (postings kosong).
+# Term kueri yang menjadi beberapa token (misal 'part-time') menjadi grup AND,
+# atau frasa jika dipakai sebagai operand NEAR. "a NEAR/2 b NEAR/3 c" dibaca
+# sebagai (a NEAR/2 b) AND (b NEAR/3 c). Frasa dan NEAR/k butuh indeks posisional.
+
+OPERATORS = ('AND', 'OR', 'NOT')
+NEAR_PREFIX = 'NEAR/'
+_QUERY_TOKEN_RE = re.compile(r'"[^"]*"?|\(|\)|[^\s()"]+')
+_NEAR_RE = re.compile(r'NEAR/(\d+)', re.IGNORECASE)
+
+class BooleanQueryError(ValueError):
+    """Sintaks kueri Boolean tidak valid."""
+
+
+def tokenize_boolean_query(query):
+    """
+    Pecah kueri menjadi token: kurung, operator (huruf besar, termasuk NEAR/k),
+    frasa bertanda kutip (spasi di dalamnya dirapikan), dan term.
+    """
+    tokens = []
+    for token in _QUERY_TOKEN_RE.findall(query):
+        if token.startswith('"'):
+            closed = len(token) > 1 and token.endswith('"')
+            inner = ' '.join(token[1:-1 if closed else None].split())
+            tokens.append(f'"{inner}"' if closed else f'"{inner}')
+        elif token.upper() in OPERATORS:
+            tokens.append(token.upper())
+        elif _near_distance(token) is not None:
+            tokens.append(f"{NEAR_PREFIX}{_near_distance(token)}")
+        else:
+            tokens.append(token)
+    return tokens
+
+def _near_distance(token):
+    """Jarak k dari token NEAR/k, atau None jika token bukan operator NEAR."""
+    match = _NEAR_RE.fullmatch(token)
+    return int(match.group(1)) if match else None
+
+def _is_operand(token):
+    return token not in OPERATORS and token not in ('(', ')') and _near_distance(token) is None
+
+def normalize_boolean_query(query):
+    """Bentuk kanonik string kueri, dipakai sebagai kunci cache plan."""
+    return ' '.join(tokenize_boolean_query(query))
+
+def _parse_tokens(tokens, term_map):
+    pos = 0
+
+    def peek():
+        return tokens[pos] if pos < len(tokens) else None
+
+    def take():
+        nonlocal pos
+        token = peek()
+        pos += 1
+        return token
+
+    def parse_or():
+        children = [parse_and()]
+        while peek() == 'OR':
+            take()
+            children.append(parse_and())
+        return children[0] if len(children) == 1 else ('OR', tuple(children))
+
+    def parse_and():
+        children = [parse_not()]
+        while peek() in ('AND', 'NOT'):
+            if take() == 'NOT':
+                children.append(('NOT', parse_not()))
+            else:
+                children.append(parse_not())
+        return children[0] if len(children) == 1 else ('AND', tuple(children))
+
+    def parse_not():
+        if peek() == 'NOT':
+            take()
+            return ('NOT', parse_not())
+        return parse_near()
+
+    def parse_near():
+        node, operand = parse_primary()
+        if _near_distance(peek() or '') is None:
+            return node
+        pairs = []
+        while _near_distance(peek() or '') is not None:
+            distance = _near_distance(take())
+            _, right = parse_primary()
+            if operand is None or right is None:
+                raise BooleanQueryError("Operand NEAR/k harus berupa term atau frasa.")
+            pairs.append(('NEAR', distance, operand, right))
+            operand = right
+        return pairs[0] if len(pairs) == 1 else ('AND', tuple(pairs))
+
+    def parse_primary():
+        """Returns: (node, operand posisional untuk NEAR atau None)."""
+        token = take()
+        if token is None:
+            raise BooleanQueryError("Kueri berakhir dengan operator.")
+        if token == '(':
+            node = parse_or()
+            if take() != ')':
+                raise BooleanQueryError("Kurung buka tidak ditutup.")
+            return node, None
+        if not _is_operand(token):
+            raise BooleanQueryError(f"Token '{token}' tidak diharapkan di sini.")
+        if token.startswith('"'):
+            if len(token) == 1 or not token.endswith('"'):
+                raise BooleanQueryError("Tanda kutip frasa tidak ditutup.")
+            node = _phrase_node(term_map[token])
+            return node, node
+        clean_terms = term_map[token]
+        if len(clean_terms) <= 1:
+            node = ('TERM', clean_terms[0] if clean_terms else None)
+            return node, node
+        return ('AND', tuple(('TERM', t) for t in clean_terms)), ('PHRASE', tuple(clean_terms))
+
+    if not tokens:
+        raise BooleanQueryError("Kueri kosong.")
+    node = parse_or()
+    if pos != len(tokens):
+        raise BooleanQueryError(f"Token '{tokens[pos]}' tidak diharapkan (operator hilang?).")
+    return node
+
+def _phrase_node(terms):
+    """Frasa ternormalisasi -> node: kosong/satu token menjadi TERM biasa."""
+    if len(terms) <= 1:
+        return ('TERM', terms[0] if terms else None)
+    return ('PHRASE', tuple(terms))
+
+def optimize_boolean_ast(node):
+    """
+    Optimasi struktural: ratakan AND/OR bertingkat, buang operand kembar,
+    dan hilangkan NOT ganda. Urutan operand (berdasarkan df) diatur saat eksekusi.
+    """
+    op = node[0]
+    if op in ('TERM', 'PHRASE', 'NEAR'):
+        return node
+    if op == 'NOT':
+        child = optimize_boolean_ast(node[1])
+        return child[1] if child[0] == 'NOT' else ('NOT', child)
+
+    children = []
+    for child in node[1]:
+        child = optimize_boolean_ast(child)
+        for item in (child[1] if child[0] == op else (child,)):
+            if item not in children:
+                children.append(item)
+    return children[0] if len(children) == 1 else (op, tuple(children))
+
+@lru_cache(maxsize=1024)
+def _compile_normalized(normalized_query, pipeline_fingerprint):
+    # pipeline_fingerprint hanya bagian dari kunci cache: plan berisi term hasil
+    # stemming pipeline tertentu, jadi setelah set_preprocessor() plan lama tidak dipakai lagi
+    tokens = tokenize_boolean_query(normalized_query)
+    # Semua term & frasa dinormalisasi sekali di sini; eksekusi plan hanya akses dictionary
+    operands = [t for t in tokens if _is_operand(t)]
+    term_map = normalize_query_terms(t for t in operands if not t.startswith('"'))
+    phrases = normalize_query_phrases(t.strip('"') for t in operands if t.startswith('"'))
+    term_map.update({t: phrases[t.strip('"')] for t in operands if t.startswith('"')})
+    return optimize_boolean_ast(_parse_tokens(tokens, term_map))
+
+def compile_boolean_query(query):
+    """
+    Compile kueri Boolean menjadi plan (AST teroptimasi). Plan di-cache berdasarkan
+    string kueri yang sudah dinormalisasi dan fingerprint pipeline preprocessing,
+    jadi kueri yang sering muncul tidak perlu di-parse dan di-stem ulang.
+    Melempar BooleanQueryError jika sintaks salah.
+    """
+    return _compile_normalized(normalize_boolean_query(query), get_preprocessor().fingerprint)
+
+
+def plan_terms(plan):
+    """Semua term (sudah di-stem) di dalam plan, misal untuk highlight snippet."""
+    op = plan[0]
+    if op == 'TERM':
+        return {plan[1]} if plan[1] is not None else set()
+    if op == 'PHRASE':
+        return set(plan[1])
+    if op == 'NEAR':
+        return plan_terms(plan[2]) | plan_terms(plan[3])
+    if op == 'NOT':
+        return plan_terms(plan[1])
+    return set().union(*(plan_terms(child) for child in plan[1]))
+
+def _estimate_df(node, inverted_index, n_docs):
+    op = node[0]
+    if op == 'TERM':
+        return inverted_index.doc_frequency(node[1]) if node[1] is not None else 0
+    if op in ('PHRASE', 'NEAR'):
+        terms = plan_terms(node)
+        return min(inverted_index.doc_frequency(term) for term in terms) if terms else 0
+    if op == 'NOT':
+        return n_docs - _estimate_df(node[1], inverted_index, n_docs)
+    estimates = [_estimate_df(child, inverted_index, n_docs) for child in node[1]]
+    return min(estimates) if op == 'AND' else min(n_docs, sum(estimates))
+
+def _plan_postings(plan, inverted_index):
+    """Jumlah postings term yang dibaca plan (untuk instrumentasi)."""
+    if plan[0] == 'TERM':
+        return inverted_index.doc_frequency(plan[1]) if plan[1] is not None else 0
+    if plan[0] in ('PHRASE', 'NEAR'):
+        return sum(inverted_index.doc_frequency(term) for term in plan_terms(plan))
+    if plan[0] == 'NOT':
+        return _plan_postings(plan[1], inverted_index)
+    return sum(_plan_postings(child, inverted_index) for child in plan[1])
+
+def execute_boolean_plan(plan, inverted_index):
+    """Evaluasi plan pada inverted index kompak. Mengembalikan array ID dokumen terurut."""
+    n_docs = len(inverted_index.doc_names)
+    op = plan[0]
+
+    if op == 'TERM':
+        if plan[1] is None:
+            return np.zeros(0, dtype=np.uint32)
+        return inverted_index.get(plan[1])
+
+    if op in ('PHRASE', 'NEAR'):
+        if not inverted_index.has_positions:
+            raise BooleanQueryError("Frasa dan NEAR/k butuh indeks posisional (indeks ini tanpa posisi term).")
+        if op == 'PHRASE':
+            return position_keys_to_docs(match_phrase(plan[1], inverted_index))
+        return match_near(plan[2], plan[3], plan[1], inverted_index)
+
+    if op == 'NOT':
+        universe = np.arange(n_docs, dtype=np.uint32)
+        return difference_postings(universe, execute_boolean_plan(plan[1], inverted_index))
+
+    if op == 'OR':
+        parts = [execute_boolean_plan(child, inverted_index) for child in plan[1]]
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return np.zeros(0, dtype=np.uint32)
+        return parts[0] if len(parts) == 1 else np.unique(np.concatenate(parts))
+
+    # AND: operand positif diiris mulai dari df terkecil; "A AND NOT B" menjadi
+    # satu difference langsung pada hasil irisan, tanpa membentuk komplemen B.
+    positives = [child for child in plan[1] if child[0] != 'NOT']
+    negatives = [child[1] for child in plan[1] if child[0] == 'NOT']
+    positives.sort(key=lambda child: _estimate_df(child, inverted_index, n_docs))
+    negatives.sort(key=lambda child: -_estimate_df(child, inverted_index, n_docs))
+
+    if positives:
+        result = execute_boolean_plan(positives[0], inverted_index)
+        for child in positives[1:]:
+            if len(result) == 0:
+                return result
+            result = intersect_postings(result, execute_boolean_plan(child, inverted_index))
+    else:
+        result = np.arange(n_docs, dtype=np.uint32)
+
+    for child in negatives:
+        if len(result) == 0:
+            break
+        result = difference_postings(result, execute_boolean_plan(child, inverted_index))
+    return result
 
 def parse_boolean_query(query, inverted_index):
     """
-    Parser Boolean Ketat: Hanya memproses Term [OPERATOR Term]...
-    Jika operator tidak ada atau tidak dikenal, akan mengembalikan set kosong.
+    Menjalankan kueri Boolean lengkap: AND, OR, NOT (termasuk NOT di awal),
+    frasa "..." dan NEAR/k, dengan prioritas NEAR/k > NOT > AND > OR dan tanda kurung.
+    Contoh: 'magang AND (semarang OR ungaran) NOT kendal',
+    '"web developer" AND semarang', 'admin NEAR/3 ungaran'.
+    Jika sintaks tidak valid, akan mengembalikan set kosong.
     """
-    query_tokens = query.split()
-    num_tokens = len(query_tokens)
-    
-    if num_tokens == 0:
+    try:
+        with span('boolean.compile'):
+            plan = compile_boolean_query(query)
+        with span('boolean.execute') as s:
+            doc_ids = execute_boolean_plan(plan, inverted_index)
+            if s.active:
+                s.count('postings', _plan_postings(plan, inverted_index))
+                s.count('results', len(doc_ids))
+    except BooleanQueryError as e: # Sintaks salah, atau frasa/NEAR pada indeks tanpa posisi
+        print(f"Kueri Boolean tidak valid: {e}")
         return set()
-    
-    # Kasus kueri tunggal (misal: "magang")
-    if num_tokens == 1:
-        return get_postings(query_tokens[0], inverted_index)
-    
-    # --- Perbaikan Logika Strictness ---
-    # Jika jumlah token GENAP (misal 2, 4, 6) DAN operator di tengah tidak ada, harus gagal.
-    # Kita mulai dengan term pertama
-    current_result_set = get_postings(query_tokens[0], inverted_index)
-    
-    i = 1
-    while i < num_tokens:
-        
-        operator = query_tokens[i].upper()
-        
-        # 1. Cek Operator yang Tidak Dikenal
-        if operator not in ['AND', 'OR', 'NOT']:
-            # GAGAL: Token di posisi 'i' seharusnya adalah operator, tapi malah 'website'
-            return set() 
-            
-        # 2. Cek Jika Kueri Berakhir dengan Operator
-        if i + 1 >= num_tokens:
-            return set() # Gagal: Kueri berakhir dengan operator (misal: "magang AND")
-            
-        next_term = query_tokens[i+1]
-        next_term_postings = get_postings(next_term, inverted_index)
-        
-        # Lakukan Operasi Boolean
-        if operator == 'AND':
-            current_result_set = current_result_set.intersection(next_term_postings)
-        elif operator == 'OR':
-            current_result_set = current_result_set.union(next_term_postings)
-        elif operator == 'NOT':
-            current_result_set = current_result_set.difference(next_term_postings)
-            
-        i += 2 # Lompat melewati operator dan term berikutnya
-            
-    return current_result_set
\ No newline at end of file
+    return set(inverted_index.names(doc_ids))
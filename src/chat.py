@@ -1,64 +1,34 @@
 import sys
 import os
-import re
-import glob
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
-from nltk.corpus import stopwords
-import nltk
+
+# Pastikan folder root proyek ada di sys.path agar 'src' bisa diimpor
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.preprocess import preprocess_text, clean_tokenize, remove_stopwords, load_stem_cache, save_stem_cache
+from src.search import load_search_index
+from src.vsm_ir import rank_vsm
+from src.corpus_reader import read_text
+from src.server_client import ping_server, query_server
 
 # --- SETUP (Sama seperti search.py) ---
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
-
-factory = StemmerFactory()
-stemmer = factory.create_stemmer()
-list_stopwords_dasar = stopwords.words('indonesian')
-STOPWORDS_SET = set(list_stopwords_dasar)
-STOPWORDS_SET.update(['yg', 'utk', 'dgn', 'jg', 'dg', 'wfo', 'wfh'])
-
-# --- FUNGSI PREPROCESSING ---
-def preprocess_text(text):
-    text = text.lower()
-    text = re.sub(r'[^a-zA-Z\s]', ' ', text)
-    tokens = text.split()
-    tokens_without_stopwords = [
-        word for word in tokens
-        if word not in STOPWORDS_SET and len(word) > 2
-    ]
-    stemmed_tokens = [stemmer.stem(word) for word in tokens_without_stopwords]
-    return [token for token in stemmed_tokens if token]
-
-def load_data(root_dir):
-    """Memuat data ASLI (untuk snippet) dan data PROSES (untuk VSM)"""
-    
-    # 1. Muat Data Proses (untuk VSM)
-    processed_dir = os.path.join(root_dir, 'data', 'processed')
-    file_paths_proc = sorted(glob.glob(os.path.join(processed_dir, 'processed_doc*.txt')))
-    doc_names = [os.path.basename(f) for f in file_paths_proc]
-    processed_corpus = [open(f, 'r', encoding='utf-8').read() for f in file_paths_proc]
+# Preprocessing memakai Preprocessor bersama di src/preprocess.py
 
-    # 2. Muat Data Asli (untuk snippet)
+def load_original_docs(root_dir, doc_names):
+    """Memuat data ASLI (untuk snippet) untuk setiap dokumen 'processed_doc...'"""
     original_dir = os.path.join(root_dir, 'data')
     original_docs = {}
-    for f_proc in file_paths_proc:
+    for doc_name in doc_names:
         # Ubah 'processed_doc01...' menjadi 'doc01...'
-        original_name = os.path.basename(f_proc).replace('processed_', '')
+        original_name = doc_name.replace('processed_', '')
         original_path = os.path.join(original_dir, original_name)
         
         try:
-            original_docs[os.path.basename(f_proc)] = open(original_path, 'r', encoding='utf-8').read()
+            original_docs[doc_name] = read_text(original_path)
         except FileNotFoundError:
-            original_docs[os.path.basename(f_proc)] = "Teks asli tidak ditemukan."
-            
-    if not doc_names:
-        print(f"Error: Tidak ada file di '{processed_dir}'.")
-        sys.exit(1)
-        
-    return doc_names, processed_corpus, original_docs
+            original_docs[doc_name] = "Teks asli tidak ditemukan."
+    return original_docs
 
 def generate_template_response(results, original_docs):
     """Langkah 3b: Generator template-based (gabungkan kalimat kunci)"""
@@ -84,17 +54,44 @@ def generate_template_response(results, original_docs):
 
 # --- MAIN CHAT INTERFACE ---
 
+def load_local_engine(root_dir):
+    """Muat artefak indeks di proses ini. Returns: fungsi search(query, k) -> list hasil."""
+    load_stem_cache()
+
+    # Muat Vektorizer & Matriks TF-IDF dari artefak indeks (dibangun ulang jika basi)
+    index = load_search_index(root_dir)
+    doc_names = index['doc_names']
+    vectorizer, tfidf_matrix_docs = index['vsm_model']
+    vsm_postings = index['vsm_postings']
+    term_upper_bounds = index['term_upper_bounds']
+
+    def search(query, k):
+        # 1. Preprocess Kueri
+        clean_query = ' '.join(preprocess_text(query))
+        if not clean_query:
+            return None
+
+        # 2. Representasi & Similarity (Langkah 3a)
+        query_vector = vectorizer.transform([clean_query])
+
+        # 3. Ambil Top-k: skor cosine hanya dari postings term kueri
+        top_ids, top_scores = rank_vsm(query_vector, vsm_postings, k, upper_bounds=term_upper_bounds)
+        return [{"doc": doc_names[doc_id], "score": score} for doc_id, score in zip(top_ids, top_scores)]
+
+    return search
+
 def main():
     print("Mempersiapkan mesin VSM...")
     
     current_dir = os.path.dirname(os.path.abspath(__file__))
     root_dir = os.path.abspath(os.path.join(current_dir, '..'))
-    
-    doc_names, processed_corpus, original_docs = load_data(root_dir)
-    
-    # Bangun Vektorizer & Matriks TF-IDF 
-    vectorizer = TfidfVectorizer()
-    tfidf_matrix_docs = vectorizer.fit_transform(processed_corpus)
+
+    # Pakai server kueri (src/server.py) jika aktif; jika tidak, muat indeks sendiri
+    server_info = ping_server()
+    local_search = None if server_info else load_local_engine(root_dir)
+    if server_info:
+        print(f"Terhubung ke server kueri ({server_info.get('docs')} dokumen).")
+    original_docs = {} # Teks asli dimuat saat dokumen pertama kali tampil
     
     print("Sistem Temu Kembali Informasi (VSM) siap.")
     print("Ketik 'exit' untuk keluar.")
@@ -102,33 +99,32 @@ def main():
     while True:
         query = input("\nMasukkan kueri Anda: ")
         if query.lower() == 'exit':
+            if local_search is not None:
+                save_stem_cache()
             break
-        
-        # 1. Preprocess Kueri
-        clean_query = ' '.join(preprocess_text(query))
-        
-        if not clean_query:
+
+        k = 3
+        results = None
+        if local_search is None:
+            responses = query_server([{'model': 'vsm', 'query': query, 'k': k}])
+            if responses is None or 'results' not in responses[0]:
+                # Server mati/gagal di tengah sesi: lanjutkan dengan indeks lokal
+                print("Server kueri tidak merespons, beralih ke pencarian lokal...")
+                local_search = load_local_engine(root_dir)
+            else:
+                results = responses[0]['results']
+                if not results and not remove_stopwords(clean_tokenize(query)):
+                    results = None # Samakan pesan dengan mode lokal (tanpa memuat stemmer)
+        if local_search is not None:
+            results = local_search(query, k)
+
+        if results is None:
             print("Kueri tidak valid setelah preprocessing.")
             continue
 
-        # 2. Representasi & Similarity (Langkah 3a)
-        query_vector = vectorizer.transform([clean_query])
-        cosine_scores = cosine_similarity(query_vector, tfidf_matrix_docs).flatten()
-        
-        # 3. Ambil Top-k (k=3)
-        k = 3
-        top_k_indices = cosine_scores.argsort()[-k:][::-1]
-        
-        results = []
-        for index in top_k_indices:
-            score = cosine_scores[index]
-            if score > 0.0:
-                results.append({
-                    "doc": doc_names[index],
-                    "score": score
-                })
-        
         # 4. Generate Respon (Langkah 3b)
+        missing = [res['doc'] for res in results if res['doc'] not in original_docs]
+        original_docs.update(load_original_docs(root_dir, missing))
         response = generate_template_response(results, original_docs)
         print(response)
 
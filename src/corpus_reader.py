@@ -0,0 +1,175 @@
+import codecs
+import fnmatch
+import glob
+import gzip
+import json
+import os
+import sys
+import zipfile
+
+# Pastikan folder root proyek ada di sys.path agar 'src' bisa diimpor (saat dijalankan langsung)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+# ---
+# PEMBACA KORPUS STREAMING
+# ---
+# Satu pintu untuk membaca korpus: iter_corpus(source) menghasilkan
+# (doc_id, name, text) satu per satu, dari:
+#   - folder         : file yang cocok dengan `pattern` (default *.txt), urut nama
+#   - .zip           : anggota arsip yang cocok dengan `pattern`, urut nama
+#   - .jsonl(.gz)    : satu dokumen per baris {"id": ..., "text": ...}
+#   - .gz / file lain: satu dokumen
+#
+# Setiap file dibaca SEKALI sebagai bytes (per blok, dengan batas ukuran), lalu
+# encoding-nya dideteksi di memori: BOM UTF-8/UTF-16, UTF-8, atau latin-1
+# sebagai fallback (tidak pernah gagal). Baris baru dinormalisasi ke '\n' seperti
+# open() mode teks, jadi offset karakter sama dengan pembacaan lama.
+# Hanya satu dokumen (atau satu baris JSONL) yang ditahan di memori setiap saat.
+
+DEFAULT_PATTERN = '*.txt'
+READ_CHUNK_SIZE = 1 << 16
+MAX_DOC_BYTES = 64 * 1024 * 1024
+FALLBACK_ENCODING = 'latin-1'
+JSONL_SUFFIXES = ('.jsonl', '.ndjson', '.jsonl.gz', '.ndjson.gz')
+
+
+def decode_text(data):
+    """Bytes -> str dengan deteksi encoding satu kali (tanpa membaca ulang file)."""
+    if data.startswith(codecs.BOM_UTF8):
+        data = data[len(codecs.BOM_UTF8):]
+    elif data.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        text = data.decode('utf-16')
+        return text.replace('\r\n', '\n').replace('\r', '\n')
+    try:
+        text = data.decode('utf-8')
+    except UnicodeDecodeError:
+        text = data.decode(FALLBACK_ENCODING)
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+def read_bytes(f, name, max_bytes=MAX_DOC_BYTES):
+    """Baca stream per blok READ_CHUNK_SIZE; dokumen di atas `max_bytes` dipotong (dengan peringatan)."""
+    chunks = []
+    size = 0
+    while True:
+        chunk = f.read(READ_CHUNK_SIZE if max_bytes is None else min(READ_CHUNK_SIZE, max_bytes - size + 1))
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+        if max_bytes is not None and size > max_bytes:
+            print(f"PERINGATAN: '{name}' lebih dari {max_bytes} byte, dipotong.")
+            chunks[-1] = chunk[:len(chunk) - (size - max_bytes)]
+            break
+    return b''.join(chunks)
+
+def read_text(path, max_bytes=MAX_DOC_BYTES):
+    """Isi satu file teks (.gz didekompresi) sebagai str."""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        return decode_text(read_bytes(f, path, max_bytes))
+
+
+def _doc_name(path):
+    name = os.path.basename(path)
+    return name[:-len('.gz')] if name.endswith('.gz') else name
+
+def iter_files(paths, max_bytes=MAX_DOC_BYTES):
+    """(doc_id, name, text) untuk setiap path, dibaca satu per satu."""
+    for doc_id, path in enumerate(paths):
+        yield doc_id, _doc_name(path), read_text(path, max_bytes)
+
+def _iter_zip(path, pattern, max_bytes):
+    with zipfile.ZipFile(path) as archive:
+        members = sorted(
+            (info for info in archive.infolist()
+             if not info.is_dir() and fnmatch.fnmatch(os.path.basename(info.filename), pattern)),
+            key=lambda info: info.filename
+        )
+        for doc_id, info in enumerate(members):
+            with archive.open(info) as f:
+                yield doc_id, os.path.basename(info.filename), decode_text(read_bytes(f, info.filename, max_bytes))
+
+def _iter_jsonl(path, text_field, name_field):
+    opener = gzip.open if path.endswith('.gz') else open
+    doc_id = 0
+    with opener(path, 'rb') as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(decode_text(line))
+                text = record[text_field]
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"PERINGATAN: baris {line_no} di '{path}' dilewati ({e}).")
+                continue
+            name = str(record.get(name_field) or f"doc{line_no}")
+            yield doc_id, name, text
+            doc_id += 1
+
+def iter_corpus(source, pattern=DEFAULT_PATTERN, text_field='text', name_field='id', max_bytes=MAX_DOC_BYTES):
+    """
+    Iterasi dokumen korpus secara lazy.
+
+    Args:
+        source (str): Folder, arsip .zip, file .jsonl/.jsonl.gz, file .gz, atau file teks.
+        pattern (str): Pola nama file (folder & .zip).
+        text_field, name_field (str): Kunci teks & nama dokumen (JSONL).
+        max_bytes (int): Batas ukuran satu dokumen (None = tanpa batas).
+
+    Yields:
+        tuple: (doc_id, name, text), doc_id berurutan mulai 0.
+    """
+    if os.path.isdir(source):
+        yield from iter_files(list_corpus_files(source, pattern), max_bytes)
+    elif source.endswith('.zip'):
+        yield from _iter_zip(source, pattern, max_bytes)
+    elif source.endswith(JSONL_SUFFIXES):
+        yield from _iter_jsonl(source, text_field, name_field)
+    else:
+        yield from iter_files([source], max_bytes)
+
+def list_corpus_files(directory, pattern=DEFAULT_PATTERN):
+    """Path file korpus di `directory` yang cocok dengan `pattern`, urut nama."""
+    return sorted(glob.glob(os.path.join(directory, pattern)))
+
+
+if __name__ == '__main__':
+    # Self-test: folder, zip, jsonl.gz, encoding (utf-8, BOM, latin-1, utf-16), CRLF
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = {'a.txt': 'Café di Semarang\r\nbaris dua', 'b.txt': 'Lowongan barista', 'c.txt': 'Gaji naïve'}
+        with open(os.path.join(tmp, 'a.txt'), 'wb') as f:
+            f.write(codecs.BOM_UTF8 + docs['a.txt'].encode('utf-8'))
+        with open(os.path.join(tmp, 'b.txt'), 'wb') as f:
+            f.write(docs['b.txt'].encode('utf-16'))
+        with open(os.path.join(tmp, 'c.txt'), 'wb') as f:
+            f.write(docs['c.txt'].encode('latin-1'))
+        expected = [(i, name, text.replace('\r\n', '\n')) for i, (name, text) in enumerate(sorted(docs.items()))]
+        assert list(iter_corpus(tmp)) == expected, list(iter_corpus(tmp))
+
+        zip_path = os.path.join(tmp, 'korpus.zip')
+        with zipfile.ZipFile(zip_path, 'w') as archive:
+            for name in sorted(docs):
+                archive.write(os.path.join(tmp, name), f"sub/{name}")
+            archive.writestr('sub/abaikan.md', 'bukan korpus')
+        assert list(iter_corpus(zip_path)) == expected
+
+        jsonl_path = os.path.join(tmp, 'korpus.jsonl.gz')
+        with gzip.open(jsonl_path, 'wt', encoding='utf-8') as f:
+            for _, name, text in expected:
+                f.write(json.dumps({'id': name, 'text': text}) + '\n')
+            f.write('\nbukan json\n')
+        assert list(iter_corpus(jsonl_path)) == expected
+
+        with gzip.open(os.path.join(tmp, 'd.txt.gz'), 'wb') as f:
+            f.write('isi terkompresi'.encode('utf-8'))
+        assert list(iter_corpus(os.path.join(tmp, 'd.txt.gz'))) == [(0, 'd.txt', 'isi terkompresi')]
+        assert read_text(os.path.join(tmp, 'c.txt'), max_bytes=4) == 'Gaji'
+
+    n_docs = sum(1 for _ in iter_corpus(os.path.join(PROJECT_ROOT, 'data')))
+    print(f"Korpus data/: {n_docs} dokumen.")
+    print("Self-test corpus_reader.py OK.")
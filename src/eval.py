@@ -204,4 +204,155 @@ def calculate_mean_ndcg_at_k(all_queries_results, k):
         )
         ndcg_sum += ndcg
     
-    return ndcg_sum / len(all_queries_results)
\ No newline at end of file
+    return ndcg_sum / len(all_queries_results)
+
+# ---
+# ENGINE EVALUASI BATCH (VEKTORISASI)
+# ---
+# Semua kueri dikemas menjadi matriks relevansi (n_kueri x max_k): sel [q, i]
+# berisi nilai relevansi (gain) dokumen di peringkat i+1 untuk kueri q, 0 jika
+# tidak relevan atau daftar hasilnya lebih pendek (padding). Semua metrik untuk
+# semua k lalu dihitung sekaligus dengan cumsum, tanpa loop per dokumen.
+
+_LOG2_TABLE = np.log2(np.arange(2, 1026, dtype=np.float64)) # log2(rank + 1) untuk rank 1..1024
+
+def get_log2_table(max_k):
+    """Tabel penyebut diskon DCG, log2(rank + 1) untuk rank 1..max_k (dihitung sekali)."""
+    global _LOG2_TABLE
+    if max_k > len(_LOG2_TABLE):
+        _LOG2_TABLE = np.log2(np.arange(2, max_k + 2, dtype=np.float64))
+    return _LOG2_TABLE[:max_k]
+
+def build_relevance_matrices(all_queries_results, max_k):
+    """
+    Mengemas hasil semua kueri menjadi matriks NumPy.
+
+    Args:
+        all_queries_results (list of dicts): Format sama dengan calculate_map_at_k.
+            'relevant' boleh set (relevansi biner) atau dict doc -> nilai relevansi (graded).
+        max_k (int): Panjang peringkat terbesar yang dievaluasi.
+
+    Returns:
+        tuple: (gains, ideal_gains, n_relevant, n_hits_total)
+            gains        -> (n_kueri x max_k) relevansi dokumen di setiap peringkat
+            ideal_gains  -> (n_kueri x max_k) relevansi terurut menurun (peringkat ideal)
+            n_relevant   -> jumlah dokumen relevan per kueri
+            n_hits_total -> jumlah dokumen relevan di SELURUH daftar hasil (untuk Recall)
+    """
+    n_queries = len(all_queries_results)
+    gains = np.zeros((n_queries, max_k))
+    ideal_gains = np.zeros((n_queries, max_k))
+    n_relevant = np.zeros(n_queries)
+    n_hits_total = np.zeros(n_queries)
+
+    for q, result in enumerate(all_queries_results):
+        relevant = result['relevant']
+        if not isinstance(relevant, dict):
+            relevant = dict.fromkeys(relevant, 1)
+        row = [relevant.get(doc, 0) for doc in result['retrieved']]
+        gains[q, :min(len(row), max_k)] = row[:max_k]
+
+        grades = sorted((grade for grade in relevant.values() if grade > 0), reverse=True)[:max_k]
+        ideal_gains[q, :len(grades)] = grades
+        n_relevant[q] = sum(1 for grade in relevant.values() if grade > 0)
+        n_hits_total[q] = sum(1 for grade in row if grade > 0)
+
+    return gains, ideal_gains, n_relevant, n_hits_total
+
+def _safe_divide(numerator, denominator):
+    """Pembagian elemen per elemen; hasil 0 jika penyebutnya 0."""
+    out = np.zeros(np.broadcast(numerator, denominator).shape)
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    return out
+
+def evaluate_batch(all_queries_results, ks=(1, 3, 5, 10), per_query=False):
+    """
+    Menghitung P@k, R@k, AP@k (MAP@k), nDCG@k (biner maupun graded) dan MRR@k
+    untuk semua kueri dan semua k sekaligus, plus Recall atas seluruh daftar hasil.
+    Nilainya sama dengan fungsi calculate_* di atas.
+
+    Args:
+        all_queries_results (list of dicts): Format sama dengan calculate_map_at_k.
+        ks (iterable of int): Batas ranking yang dievaluasi.
+        per_query (bool): True = kembalikan array nilai per kueri, bukan rata-rata.
+
+    Returns:
+        dict: nama metrik ('P@5', 'R@5', 'MAP@5', 'nDCG@5', 'MRR@5', 'Recall') -> nilai.
+    """
+    ks = sorted(set(ks))
+    max_k = ks[-1]
+    gains, ideal_gains, n_relevant, n_hits_total = build_relevance_matrices(all_queries_results, max_k)
+
+    log2_table = get_log2_table(max_k)
+    ranks = np.arange(1, max_k + 1)
+    is_hit = (gains > 0).astype(np.float64)
+
+    hits_at = np.cumsum(is_hit, axis=1)                        # TP di top-k
+    precision_sum_at = np.cumsum(hits_at / ranks * is_hit, axis=1) # Jumlah presisi di peringkat relevan
+    dcg_at = np.cumsum(gains / log2_table, axis=1)
+    idcg_at = np.cumsum(ideal_gains / log2_table, axis=1)
+
+    # Peringkat dokumen relevan pertama (max_k + 1 jika tidak ada di top max_k)
+    first_hit = np.where(is_hit.any(axis=1), is_hit.argmax(axis=1) + 1, max_k + 1)
+
+    metrics = {}
+    for k in ks:
+        metrics[f'P@{k}'] = hits_at[:, k - 1] / k
+        metrics[f'R@{k}'] = _safe_divide(hits_at[:, k - 1], n_relevant)
+        metrics[f'MAP@{k}'] = _safe_divide(precision_sum_at[:, k - 1], n_relevant)
+        metrics[f'nDCG@{k}'] = _safe_divide(dcg_at[:, k - 1], idcg_at[:, k - 1])
+        metrics[f'MRR@{k}'] = np.where(first_hit <= k, 1.0 / first_hit, 0.0)
+    metrics['Recall'] = _safe_divide(n_hits_total, n_relevant)
+
+    if per_query:
+        return metrics
+    return {name: float(values.mean()) if len(values) else 0.0 for name, values in metrics.items()}
+
+
+if __name__ == '__main__':
+    import time
+    import random
+
+    # Uji cepat: engine batch harus sama dengan fungsi per kueri di atas
+    random.seed(42)
+    docs = [f"doc{i:02d}" for i in range(40)]
+    queries = []
+    for _ in range(500):
+        retrieved = random.sample(docs, random.randint(0, 15))
+        relevant = set(random.sample(docs, random.randint(0, 8)))
+        queries.append({'retrieved': retrieved, 'relevant': relevant})
+
+    batch = evaluate_batch(queries, ks=(1, 3, 5, 10), per_query=True)
+    for k in (1, 3, 5, 10):
+        expected_p = [calculate_precision_at_k(q['retrieved'], q['relevant'], k) for q in queries]
+        expected_ap = [calculate_average_precision_at_k(q['retrieved'], q['relevant'], k) for q in queries]
+        expected_ndcg = [calculate_ndcg_at_k(q['retrieved'], q['relevant'], k) for q in queries]
+        assert np.allclose(batch[f'P@{k}'], expected_p)
+        assert np.allclose(batch[f'MAP@{k}'], expected_ap)
+        assert np.allclose(batch[f'nDCG@{k}'], expected_ndcg)
+        assert np.isclose(evaluate_batch(queries, ks=(k,))[f'MAP@{k}'], calculate_map_at_k(queries, k))
+        assert np.isclose(evaluate_batch(queries, ks=(k,))[f'nDCG@{k}'], calculate_mean_ndcg_at_k(queries, k))
+        expected_rr = [
+            next((1.0 / (i + 1) for i, doc in enumerate(q['retrieved'][:k]) if doc in q['relevant']), 0.0)
+            for q in queries
+        ]
+        assert np.allclose(batch[f'MRR@{k}'], expected_rr)
+    for q, recall in zip(queries, batch['Recall']):
+        assert np.isclose(recall, calculate_precision_recall_f1(set(q['retrieved']), q['relevant'])[1] if q['relevant'] else 0.0)
+    print("OK: P@k, MAP@k, nDCG@k, MRR@k, dan Recall sama dengan fungsi per kueri.")
+
+    # Graded relevance: nDCG dibandingkan dengan rumus langsung
+    graded = [{'retrieved': q['retrieved'], 'relevant': {doc: random.randint(1, 3) for doc in q['relevant']}} for q in queries]
+    batch_graded = evaluate_batch(graded, ks=(5,), per_query=True)
+    for q, value in zip(graded, batch_graded['nDCG@5']):
+        dcg = sum(q['relevant'].get(doc, 0) / np.log2(i + 2) for i, doc in enumerate(q['retrieved'][:5]))
+        ideal = sorted(q['relevant'].values(), reverse=True)[:5]
+        idcg = sum(grade / np.log2(i + 2) for i, grade in enumerate(ideal))
+        assert np.isclose(value, dcg / idcg if idcg > 0 else 0.0)
+    print("OK: nDCG graded sama dengan rumus langsung.")
+
+    # Kecepatan: 100 ribu kueri
+    many = queries * 200
+    start = time.perf_counter()
+    evaluate_batch(many, ks=(1, 3, 5, 10, 20))
+    print(f"{len(many)} kueri dievaluasi dalam {time.perf_counter() - start:.2f} detik.")
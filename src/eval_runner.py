@@ -0,0 +1,264 @@
+import argparse
+import os
+import re
+import sys
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Pastikan folder root proyek ada di sys.path agar 'src' bisa diimpor
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.preprocess import load_stem_cache, save_stem_cache, print_progress
+from src.index_store import RAW_INDEX_DIR, load_index
+from src.incremental_index import IncrementalIndexer
+from src.boolean_ir import parse_boolean_query
+from src.vsm_ir import search_vsm, DEFAULT_PROXIMITY_WEIGHT
+from src.bm25 import BM25_INDEX_DIR, BM25Index, DEFAULT_FIELD_WEIGHTS, load_or_build_bm25, search_bm25
+from src.eval import (
+    calculate_precision_recall_f1, calculate_map_at_k, calculate_mean_ndcg_at_k,
+    calculate_average_precision_at_k, calculate_ndcg_at_k
+)
+
+# ---
+# RUNNER EVALUASI END-TO-END
+# ---
+# topics (TSV atau format TREC <top>) + qrels TREC -> jalankan setiap model untuk
+# semua topik di beberapa proses worker -> file run TREC, tabel metrik
+# (efektivitas + latensi per kueri) di out_dir.
+
+MODELS = ('boolean', 'vsm', 'vsm_prox', 'bm25', 'bm25f')
+
+DEFAULT_TOPICS = os.path.join(PROJECT_ROOT, 'data', 'eval', 'topics.tsv')
+DEFAULT_QRELS = os.path.join(PROJECT_ROOT, 'data', 'eval', 'qrels.txt')
+DEFAULT_OUT_DIR = os.path.join(PROJECT_ROOT, 'data', 'cache', 'eval')
+
+_TREC_TOP_RE = re.compile(r'<top>(.*?)</top>', re.S | re.I)
+_TREC_FIELD_RE = r'<{tag}>\s*(?:Number:)?(.*?)(?=<|$)'
+
+
+def read_topics(path):
+    """
+    Membaca file topik. Dua format didukung:
+      - TSV: qid<TAB>kueri[<TAB>kueri Boolean], baris '#' diabaikan
+      - TREC: blok <top><num>...<title>...</top>
+    Tanpa kueri Boolean, semua kata kueri digabung dengan AND.
+
+    Returns:
+        list of dict: {'qid', 'query', 'boolean_query'}
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    topics = []
+    blocks = _TREC_TOP_RE.findall(content)
+    if blocks:
+        for block in blocks:
+            qid = re.search(_TREC_FIELD_RE.format(tag='num'), block, re.S | re.I).group(1).strip()
+            query = re.search(_TREC_FIELD_RE.format(tag='title'), block, re.S | re.I).group(1).strip()
+            topics.append({'qid': qid, 'query': query, 'boolean_query': ' AND '.join(query.split())})
+        return topics
+
+    for line in content.splitlines():
+        if not line.strip() or line.startswith('#'):
+            continue
+        parts = line.rstrip('\n').split('\t')
+        query = parts[1].strip()
+        boolean_query = parts[2].strip() if len(parts) > 2 and parts[2].strip() else ' AND '.join(query.split())
+        topics.append({'qid': parts[0].strip(), 'query': query, 'boolean_query': boolean_query})
+    return topics
+
+def read_qrels(path):
+    """
+    Membaca qrels format TREC: 'qid iterasi docno relevansi'.
+
+    Returns:
+        dict: qid -> {docno: relevansi} (hanya relevansi > 0)
+    """
+    qrels = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 4:
+                continue
+            qid, _, docno, relevance = parts[:4]
+            if int(relevance) > 0:
+                qrels.setdefault(qid, {})[docno] = int(relevance)
+    return qrels
+
+def write_run_file(path, run_tag, runs):
+    """Menulis hasil satu model sebagai file run TREC: 'qid Q0 docno rank skor tag'."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in runs:
+            for rank, (doc_name, score) in enumerate(record['ranked'], start=1):
+                f.write(f"{record['qid']} Q0 {doc_name} {rank} {score:.6f} {run_tag}\n")
+
+
+# --- Worker ---
+
+_WORKER_STATE = {}
+
+def _init_eval_worker():
+    """Setiap worker memuat artefak indeks sekali (memory-map, jadi murah)."""
+    load_stem_cache()
+    _WORKER_STATE['index'] = load_index(RAW_INDEX_DIR)
+    _WORKER_STATE['bm25'] = BM25Index.load(BM25_INDEX_DIR)
+
+def _run_query(model, topic, k):
+    """Jalankan satu topik dengan satu model. Returns: list of (doc_name, skor)."""
+    index = _WORKER_STATE['index']
+    if model == 'boolean':
+        # Hasil Boolean tidak berperingkat: diurutkan per nama, skor 1
+        return [(doc, 1.0) for doc in sorted(parse_boolean_query(topic['boolean_query'], index['inverted_index']))]
+    if model in ('vsm', 'vsm_prox'):
+        # vsm_prox: cosine di-rerank dengan kedekatan term kueri (indeks posisional)
+        return search_vsm(
+            topic['query'], index['vsm_model'], index['doc_names'], None, k=k,
+            postings=index['vsm_postings'], upper_bounds=index['term_upper_bounds'],
+            inverted_index=index['inverted_index'],
+            proximity_weight=DEFAULT_PROXIMITY_WEIGHT if model == 'vsm_prox' else 0.0
+        )
+    field_weights = DEFAULT_FIELD_WEIGHTS if model == 'bm25f' else None
+    return search_bm25(topic['query'], _WORKER_STATE['bm25'], k=k, field_weights=field_weights)
+
+def _run_shard(model, topics, k):
+    """Jalankan sekumpulan topik untuk satu model, catat latensi tiap kueri."""
+    runs = []
+    for topic in topics:
+        start = time.perf_counter()
+        ranked = _run_query(model, topic, k)
+        latency_ms = (time.perf_counter() - start) * 1000
+        runs.append({'qid': topic['qid'], 'ranked': [(doc, float(score)) for doc, score in ranked], 'latency_ms': latency_ms})
+    return model, runs
+
+
+def prepare_indexes(data_dir, workers=None):
+    """Pastikan artefak VSM/Boolean dan BM25 sudah ada dan segar sebelum worker dimulai."""
+    load_stem_cache()
+    IncrementalIndexer(data_dir, RAW_INDEX_DIR, workers=workers).refresh(progress=print_progress)
+    load_or_build_bm25(data_dir, workers=workers, progress=print_progress)
+    save_stem_cache()
+
+def run_all(topics, models, k=5, workers=None, shard_size=50):
+    """
+    Jalankan semua topik untuk semua model secara paralel (shard topik per proses).
+
+    Returns:
+        dict: model -> list of {'qid', 'ranked', 'latency_ms'} (urutan sama dengan topics)
+    """
+    shards = [topics[i:i + shard_size] for i in range(0, len(topics), shard_size)]
+    runs = {model: [] for model in models}
+
+    if workers == 1:
+        _init_eval_worker()
+        for model in models:
+            for shard in shards:
+                runs[model].extend(_run_shard(model, shard, k)[1])
+        return runs
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_eval_worker) as executor:
+        futures = [executor.submit(_run_shard, model, shard, k) for model in models for shard in shards]
+        for future in futures: # Urutan submit = urutan topik
+            model, shard_runs = future.result()
+            runs[model].extend(shard_runs)
+    return runs
+
+def compute_metrics(runs, qrels, k):
+    """
+    Tabel metrik per model: efektivitas (fungsi di src/eval.py) dan latensi.
+
+    Returns:
+        tuple: (summary, per_query)
+            summary   -> model -> {metrik: nilai}
+            per_query -> model -> list of {'qid', 'latency_ms', 'precision', 'recall', 'f1', 'ap', 'ndcg'}
+    """
+    summary, per_query = {}, {}
+    for model, model_runs in runs.items():
+        all_queries_results = []
+        rows = []
+        for record in model_runs:
+            retrieved = [doc for doc, _ in record['ranked']]
+            relevant = set(qrels.get(record['qid'], {}))
+            precision, recall, f1 = calculate_precision_recall_f1(set(retrieved[:k]), relevant)
+            all_queries_results.append({'query': record['qid'], 'retrieved': retrieved, 'relevant': relevant})
+            rows.append({
+                'qid': record['qid'],
+                'latency_ms': record['latency_ms'],
+                'precision': precision,
+                'recall': recall,
+                'f1': f1,
+                'ap': calculate_average_precision_at_k(retrieved, relevant, k),
+                'ndcg': calculate_ndcg_at_k(retrieved, relevant, k),
+            })
+
+        latencies = np.array([row['latency_ms'] for row in rows])
+        summary[model] = {
+            'queries': len(rows),
+            f'P@{k}': float(np.mean([row['precision'] for row in rows])) if rows else 0.0,
+            f'R@{k}': float(np.mean([row['recall'] for row in rows])) if rows else 0.0,
+            f'F1@{k}': float(np.mean([row['f1'] for row in rows])) if rows else 0.0,
+            f'MAP@{k}': calculate_map_at_k(all_queries_results, k),
+            f'nDCG@{k}': calculate_mean_ndcg_at_k(all_queries_results, k),
+            'latency_mean_ms': float(latencies.mean()) if rows else 0.0,
+            'latency_p50_ms': float(np.percentile(latencies, 50)) if rows else 0.0,
+            'latency_p95_ms': float(np.percentile(latencies, 95)) if rows else 0.0,
+        }
+        per_query[model] = rows
+    return summary, per_query
+
+def write_reports(out_dir, runs, summary, per_query, k):
+    """Tulis file run TREC, metrik per kueri (TSV), dan ringkasan (JSON + TSV)."""
+    os.makedirs(out_dir, exist_ok=True)
+    for model, model_runs in runs.items():
+        write_run_file(os.path.join(out_dir, f"run_{model}.txt"), f"stki_{model}", model_runs)
+        with open(os.path.join(out_dir, f"per_query_{model}.tsv"), 'w', encoding='utf-8') as f:
+            f.write("qid\tlatency_ms\tprecision\trecall\tf1\tap\tndcg\n")
+            for row in per_query[model]:
+                f.write(f"{row['qid']}\t{row['latency_ms']:.3f}\t{row['precision']:.4f}\t{row['recall']:.4f}"
+                        f"\t{row['f1']:.4f}\t{row['ap']:.4f}\t{row['ndcg']:.4f}\n")
+
+    with open(os.path.join(out_dir, 'metrics.json'), 'w', encoding='utf-8') as f:
+        json.dump({'k': k, 'models': summary}, f, indent=2)
+
+    columns = list(next(iter(summary.values())).keys()) if summary else []
+    with open(os.path.join(out_dir, 'metrics.tsv'), 'w', encoding='utf-8') as f:
+        f.write('model\t' + '\t'.join(columns) + '\n')
+        for model, values in summary.items():
+            f.write(model + '\t' + '\t'.join(f"{values[c]:.4f}" if isinstance(values[c], float) else str(values[c]) for c in columns) + '\n')
+
+def print_metrics_table(summary, k):
+    """Cetak tabel metrik ke konsol."""
+    print(f"\n{'model':<8} {'P@' + str(k):>7} {'R@' + str(k):>7} {'F1@' + str(k):>7} {'MAP@' + str(k):>7} "
+          f"{'nDCG@' + str(k):>7} {'ms/q':>8} {'p95 ms':>8}")
+    for model, m in summary.items():
+        print(f"{model:<8} {m[f'P@{k}']:>7.3f} {m[f'R@{k}']:>7.3f} {m[f'F1@{k}']:>7.3f} {m[f'MAP@{k}']:>7.3f} "
+              f"{m[f'nDCG@{k}']:>7.3f} {m['latency_mean_ms']:>8.2f} {m['latency_p95_ms']:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluasi end-to-end model STKI (qrels & topik TREC)")
+    parser.add_argument('--topics', default=DEFAULT_TOPICS, help="File topik (TSV atau format TREC).")
+    parser.add_argument('--qrels', default=DEFAULT_QRELS, help="File qrels format TREC.")
+    parser.add_argument('--models', nargs='+', default=list(MODELS), choices=MODELS, help="Model yang dievaluasi.")
+    parser.add_argument('--k', type=int, default=5, help="Batas ranking untuk metrik.")
+    parser.add_argument('--workers', type=int, default=None, help="Jumlah proses worker (default: jumlah CPU; 1 = serial).")
+    parser.add_argument('--out-dir', default=DEFAULT_OUT_DIR, help="Folder file run dan tabel metrik.")
+    args = parser.parse_args()
+
+    topics = read_topics(args.topics)
+    qrels = read_qrels(args.qrels)
+    print(f"{len(topics)} topik, {len(qrels)} topik dengan qrels.")
+
+    prepare_indexes(os.path.join(PROJECT_ROOT, 'data'), workers=args.workers)
+    runs = run_all(topics, args.models, k=args.k, workers=args.workers)
+    summary, per_query = compute_metrics(runs, qrels, args.k)
+    write_reports(args.out_dir, runs, summary, per_query, args.k)
+
+    print_metrics_table(summary, args.k)
+    print(f"\nFile run dan metrik disimpan di '{args.out_dir}'.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,497 @@
+import os
+import glob
+import json
+import shutil
+import hashlib
+from collections.abc import Mapping
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from src.preprocess import iter_preprocess_docs, get_preprocessor
+from src.corpus_reader import iter_files, list_corpus_files
+from src.index_store import write_index, load_index, read_index_meta, check_pipeline
+from src.snippets import build_sentence_index
+
+# ---
+# INDEKS INKREMENTAL
+# ---
+# Melacak setiap file di folder data (ukuran, mtime, sha256). Saat refresh(),
+# hanya dokumen yang baru/berubah yang di-preprocess (bagian termahal: stemming).
+# Hasil preprocessing di-cache per dokumen sebagai ID term (urutan asli token)
+# terhadap kamus term yang hanya bertambah. Dokumen yang dihapus/berubah ditandai
+# sebagai tombstone dan dibuang saat compaction (sekaligus term yang tak terpakai).
+#
+# Ini adalah REBUILD DARI PREPROCESSING YANG DI-CACHE, bukan patch postings di
+# tempat: idf dan normalisasi L2 bergantung pada N dan df seluruh korpus, jadi
+# bobot TF-IDF dan daftar posisi dimaterialisasi ulang dari ID term yang di-cache
+# (satu pass NumPy tervektorisasi, tanpa loop per token) dan semua artefak indeks
+# ditulis ulang. Rumusnya sama persis seperti TfidfVectorizer default:
+#   idf = ln((1 + N) / (1 + df)) + 1,  tf = raw count,  normalisasi L2
+# sehingga skor cosine sama dengan hasil build ulang penuh (lihat
+# tests/test_incremental_index.py).
+#
+# Setiap dokumen juga menyimpan indeks kalimatnya (offset + term per kalimat,
+# lihat src/snippets.py) agar snippet tidak perlu memecah kalimat saat kueri.
+#
+# Penyimpanan di index_dir (token dan kalimat TIDAK ditahan di RAM):
+#   incremental_state.json             -> metadata kecil: file, slot dokumen
+#                                         (offset + panjang di log ID term), ukuran log
+#   incremental_term_ids.<gen>.u32     -> log append-only ID term (uint32) semua dokumen,
+#                                         dibaca lewat memmap hanya saat materialisasi
+#   incremental_terms.<gen>.txt        -> log append-only kamus term (satu term per baris)
+#   incremental_sentences/<sha256>.json -> indeks kalimat per dokumen, dibaca saat snippet
+# State mencatat panjang sah kedua log; ekor yatim dari refresh yang terputus
+# dipotong pada penulisan berikutnya. Compaction menulis log generasi baru,
+# menyimpan state, baru kemudian menghapus generasi lama.
+#
+# ID term di state hanya berlaku untuk pipeline preprocessing yang
+# membuatnya; state dari pipeline lain dibuang dan indeks dibangun dari awal.
+
+STATE_FORMAT_VERSION = 5
+STATE_FILENAME = 'incremental_state.json'
+TERM_IDS_FILENAME = 'incremental_term_ids.{generation}.u32'
+TERMS_FILENAME = 'incremental_terms.{generation}.txt'
+SENTENCES_DIRNAME = 'incremental_sentences'
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SentenceIndex(Mapping):
+    """
+    Indeks kalimat dokumen hidup: nama -> [[start, end, terms], ...] (untuk snippet).
+    Setiap dokumen dibaca dari file-nya sendiri saat diminta, bukan dimuat sekaligus.
+    """
+
+    def __init__(self, sentences_dir, doc_hashes):
+        self.sentences_dir = sentences_dir
+        self.doc_hashes = doc_hashes # nama -> sha256 isi dokumen
+
+    def __getitem__(self, name):
+        path = os.path.join(self.sentences_dir, self.doc_hashes[name] + '.json')
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            raise KeyError(name) # .get() -> None, snippet dihitung langsung dari teks
+
+    def __iter__(self):
+        return iter(self.doc_hashes)
+
+    def __len__(self):
+        return len(self.doc_hashes)
+
+
+class IncrementalIndexer:
+    """
+    Indeks yang diperbarui secara inkremental dari file-file di data_dir.
+    Hasil akhirnya disimpan sebagai artefak indeks (lihat src/index_store.py)
+    di index_dir, bersama state inkremental-nya.
+    """
+
+    def __init__(self, data_dir, index_dir, pattern='*.txt', workers=None, compaction_ratio=0.25):
+        self.data_dir = data_dir
+        self.index_dir = index_dir
+        self.pattern = pattern
+        self.workers = workers
+        self.compaction_ratio = compaction_ratio
+
+        self.files = {}       # name -> {'size', 'mtime_ns', 'sha256', 'doc_id'}
+        self.docs = []        # doc_id -> {'name', 'offset', 'length'} di log ID term; None = tombstone
+        self.tombstones = set()
+        self.terms = []       # term_id -> term (hanya bertambah sampai compaction)
+        self.term_to_id = {}
+        self.generation = 0   # generasi file log (naik setiap compaction)
+        self.n_term_ids = 0   # panjang sah log ID term (elemen)
+        self.terms_bytes = 0  # panjang sah log kamus term (byte)
+        self._state_loaded = False
+        self._dirty = False
+        self._stats_dirty = False
+        self._index = None
+
+    # --- State ---
+
+    @property
+    def state_path(self):
+        return os.path.join(self.index_dir, STATE_FILENAME)
+
+    @property
+    def sentences_dir(self):
+        return os.path.join(self.index_dir, SENTENCES_DIRNAME)
+
+    def _log_path(self, filename, generation=None):
+        generation = self.generation if generation is None else generation
+        return os.path.join(self.index_dir, filename.format(generation=generation))
+
+    def _load_state(self):
+        """Muat state dari disk (sekali saja). State yang tidak valid -> mulai dari awal."""
+        if self._state_loaded:
+            return
+        self._state_loaded = True
+        if not self._read_state():
+            self._reset_storage()
+
+    def _read_state(self):
+        if not os.path.exists(self.state_path):
+            return False
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"State inkremental tidak bisa dibaca ({e}). Indeks dibangun dari awal.")
+            return False
+        if state.get('format_version') != STATE_FORMAT_VERSION:
+            return False
+        if not check_pipeline(state, self.index_dir):
+            print("State inkremental dibuang. Indeks dibangun dari awal.")
+            return False
+
+        self.generation = state['generation']
+        self.n_term_ids = state['n_term_ids']
+        self.terms_bytes = state['terms_bytes']
+        try:
+            with open(self._log_path(TERMS_FILENAME), 'rb') as f:
+                terms_data = f.read(self.terms_bytes)
+            term_ids_size = os.path.getsize(self._log_path(TERM_IDS_FILENAME))
+        except OSError as e:
+            print(f"Log indeks inkremental tidak bisa dibaca ({e}). Indeks dibangun dari awal.")
+            return False
+        terms = terms_data.decode('utf-8').split('\n')[:-1]
+        if len(terms_data) != self.terms_bytes or len(terms) != state['n_terms'] \
+                or term_ids_size < self.n_term_ids * np.dtype(np.uint32).itemsize:
+            print("Log indeks inkremental terpotong. Indeks dibangun dari awal.")
+            return False
+
+        self.files = state['files']
+        self.docs = state['docs']
+        self.terms = terms
+        self.term_to_id = {term: i for i, term in enumerate(self.terms)}
+        self.tombstones = {i for i, doc in enumerate(self.docs) if doc is None}
+        return True
+
+    def _reset_storage(self):
+        """Kosongkan state di memori dan hapus log/kalimat lama yang tidak lagi dirujuk."""
+        self.files, self.docs, self.tombstones = {}, [], set()
+        self.terms, self.term_to_id = [], {}
+        self.generation, self.n_term_ids, self.terms_bytes = 0, 0, 0
+        if not os.path.isdir(self.index_dir):
+            return
+        prefixes = tuple(name.split('{')[0] for name in (TERM_IDS_FILENAME, TERMS_FILENAME))
+        for name in os.listdir(self.index_dir):
+            if name.startswith(prefixes):
+                os.remove(os.path.join(self.index_dir, name))
+        shutil.rmtree(self.sentences_dir, ignore_errors=True)
+
+    def save_state(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        state = {
+            'format_version': STATE_FORMAT_VERSION,
+            'pipeline': get_preprocessor().config(),
+            'generation': self.generation,
+            'n_term_ids': self.n_term_ids,
+            'n_terms': len(self.terms),
+            'terms_bytes': self.terms_bytes,
+            'files': self.files,
+            'docs': self.docs,
+        }
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    # --- Deteksi perubahan ---
+
+    def _list_files(self):
+        return {os.path.basename(p): p for p in list_corpus_files(self.data_dir, self.pattern)}
+
+    def scan(self):
+        """
+        Bandingkan isi data_dir dengan state.
+
+        Returns:
+            tuple: (added, changed, removed) berisi nama file. File yang hanya
+            berubah mtime-nya (isi sama) cukup diperbarui statistiknya.
+        """
+        self._load_state()
+        current = self._list_files()
+        added, changed = [], []
+
+        for name, path in current.items():
+            st = os.stat(path)
+            info = self.files.get(name)
+            if info is None:
+                added.append(name)
+                continue
+            if info['size'] == st.st_size and info['mtime_ns'] == st.st_mtime_ns:
+                continue
+            if _file_sha256(path) != info['sha256']:
+                changed.append(name)
+            else:
+                info['size'], info['mtime_ns'] = st.st_size, st.st_mtime_ns
+                self._stats_dirty = True
+
+        removed = [name for name in self.files if name not in current]
+        return added, changed, removed
+
+    # --- Cache preprocessing per dokumen ---
+
+    def _encode(self, tokens):
+        """Token -> ID term; term baru ditambahkan ke akhir kamus."""
+        term_ids = np.empty(len(tokens), dtype=np.uint32)
+        for i, token in enumerate(tokens):
+            term_id = self.term_to_id.get(token)
+            if term_id is None:
+                term_id = self.term_to_id[token] = len(self.terms)
+                self.terms.append(token)
+            term_ids[i] = term_id
+        return term_ids
+
+    def _append_terms(self, terms):
+        """Tambahkan term baru ke log kamus (ekor yatim dipotong lebih dulu)."""
+        data = ''.join(term + '\n' for term in terms).encode('utf-8')
+        with open(self._log_path(TERMS_FILENAME), 'a+b') as f:
+            f.truncate(self.terms_bytes)
+            f.write(data)
+        self.terms_bytes += len(data)
+
+    def _read_term_ids(self):
+        """Log ID term sebagai memmap (tidak dimuat ke RAM)."""
+        if self.n_term_ids == 0:
+            return np.zeros(0, dtype=np.uint32)
+        return np.memmap(self._log_path(TERM_IDS_FILENAME), dtype=np.uint32, mode='r', shape=(self.n_term_ids,))
+
+    def _write_sentences(self, sha256, sentences):
+        path = os.path.join(self.sentences_dir, sha256 + '.json')
+        if os.path.exists(path):
+            return # Isi dokumen sama -> indeks kalimat sama
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(sentences, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _remove_doc(self, name):
+        """Tandai dokumen sebagai tombstone."""
+        info = self.files.pop(name)
+        doc_id = info['doc_id']
+        self.docs[doc_id] = None
+        self.tombstones.add(doc_id)
+
+    def _add_docs(self, names, progress=None):
+        current = self._list_files()
+        paths = [current[name] for name in names]
+        # Streaming: teks mentah hanya ditahan selama dokumennya diproses
+        processed = iter_preprocess_docs(iter_files(paths), workers=self.workers, total=len(paths), progress=progress)
+
+        os.makedirs(self.sentences_dir, exist_ok=True)
+        n_terms = len(self.terms)
+        with open(self._log_path(TERM_IDS_FILENAME), 'a+b') as log:
+            log.truncate(self.n_term_ids * np.dtype(np.uint32).itemsize) # Buang ekor yatim dari refresh yang terputus
+            for (_, _, text, tokens), name, path in zip(processed, names, paths):
+                st = os.stat(path)
+                sha256 = _file_sha256(path)
+                term_ids = self._encode(tokens) # Token tidak disimpan; hanya ID-nya, langsung ke log
+                log.write(term_ids.tobytes())
+                self.files[name] = {
+                    'size': st.st_size,
+                    'mtime_ns': st.st_mtime_ns,
+                    'sha256': sha256,
+                    'doc_id': len(self.docs),
+                }
+                self.docs.append({'name': name, 'offset': self.n_term_ids, 'length': len(term_ids)})
+                self.n_term_ids += len(term_ids)
+                # Stem cache sudah hangat dari preprocessing dokumen
+                self._write_sentences(sha256, build_sentence_index([text])[0])
+        self._append_terms(self.terms[n_terms:])
+
+    def compact(self):
+        """
+        Buang tombstone: nomori ulang doc_id, buang term yang tak terpakai lagi,
+        dan tulis ulang log ke generasi baru (generasi lama dihapus setelah state disimpan).
+        """
+        self._load_state()
+        if not self.tombstones:
+            return
+        remap = {}
+        new_docs = []
+        for old_id, doc in enumerate(self.docs):
+            if doc is not None:
+                remap[old_id] = len(new_docs)
+                new_docs.append(doc)
+
+        old_generation = self.generation
+        old_term_ids = self._read_term_ids()
+        used = np.zeros(len(self.terms), dtype=bool)
+        for doc in new_docs:
+            used[old_term_ids[doc['offset']:doc['offset'] + doc['length']]] = True
+        term_remap = (np.cumsum(used, dtype=np.int64) - 1).astype(np.uint32)
+
+        self.generation += 1
+        self.n_term_ids = 0
+        with open(self._log_path(TERM_IDS_FILENAME), 'wb') as log:
+            for doc in new_docs:
+                log.write(term_remap[old_term_ids[doc['offset']:doc['offset'] + doc['length']]].tobytes())
+                doc['offset'] = self.n_term_ids
+                self.n_term_ids += doc['length']
+        del old_term_ids
+
+        self.terms = [term for term, keep in zip(self.terms, used) if keep]
+        self.term_to_id = {term: i for i, term in enumerate(self.terms)}
+        self.terms_bytes = 0
+        self._append_terms(self.terms)
+
+        for info in self.files.values():
+            info['doc_id'] = remap[info['doc_id']]
+        self.docs = new_docs
+        self.tombstones = set()
+        self.save_state()
+        self._dirty = True
+
+        for filename in (TERM_IDS_FILENAME, TERMS_FILENAME):
+            path = self._log_path(filename, old_generation)
+            if os.path.exists(path):
+                os.remove(path)
+        live_hashes = {info['sha256'] for info in self.files.values()}
+        for name in os.listdir(self.sentences_dir) if os.path.isdir(self.sentences_dir) else []:
+            if name[:-len('.json')] not in live_hashes:
+                os.remove(os.path.join(self.sentences_dir, name))
+        print("Compaction indeks inkremental selesai.")
+
+    # --- Materialisasi ---
+
+    def live_doc_ids(self):
+        """doc_id dokumen hidup, diurutkan berdasarkan nama (sama seperti build ulang penuh)."""
+        live = [i for i, doc in enumerate(self.docs) if doc is not None]
+        return sorted(live, key=lambda i: self.docs[i]['name'])
+
+    def materialize(self):
+        """
+        Hitung matriks TF-IDF dokumen hidup dari ID term yang di-cache.
+
+        Returns:
+            tuple: (doc_names, vocabulary, idf, tfidf_matrix_docs, positions)
+            dengan positions = (term_ids, doc_lengths): indeks vocabulary semua
+            token dokumen hidup yang disambung berurutan (lihat write_index).
+        """
+        doc_ids = self.live_doc_ids()
+        log = self._read_term_ids()
+        term_id_lists = [log[self.docs[i]['offset']:self.docs[i]['offset'] + self.docs[i]['length']] for i in doc_ids]
+        doc_lengths = np.fromiter((len(ids) for ids in term_id_lists), dtype=np.int64, count=len(doc_ids))
+        all_ids = np.concatenate(term_id_lists) if term_id_lists else np.zeros(0, dtype=np.uint32)
+        del log, term_id_lists
+
+        # Vocabulary = term yang dipakai dokumen hidup, urut alfabetis (sama seperti TfidfVectorizer)
+        used, local_ids = np.unique(all_ids, return_inverse=True)
+        used_terms = np.array([self.terms[i] for i in used], dtype=str)
+        order = np.argsort(used_terms, kind='stable')
+        rank = np.empty(len(used), dtype=np.int64)
+        rank[order] = np.arange(len(used))
+        term_ids = rank[local_ids.ravel()]
+        vocabulary = used_terms[order].tolist()
+
+        rows = np.repeat(np.arange(len(doc_ids), dtype=np.int64), doc_lengths)
+        counts = csr_matrix(
+            (np.ones(len(term_ids), dtype=np.float64), (rows, term_ids)),
+            shape=(len(doc_ids), len(vocabulary))
+        )
+        counts.sum_duplicates()
+        counts.sort_indices()
+
+        df = np.bincount(counts.indices, minlength=len(vocabulary)).astype(np.float64)
+        idf = np.full_like(df, fill_value=len(doc_ids) + 1, dtype=np.float64)
+        idf /= df + 1
+        np.log(idf, out=idf)
+        idf += 1.0
+
+        counts.data *= idf[counts.indices]
+        from sklearn.preprocessing import normalize # Impor berat, hanya saat membangun
+        tfidf_matrix_docs = normalize(counts, norm='l2', copy=False)
+
+        doc_names = [self.docs[i]['name'] for i in doc_ids]
+        return doc_names, vocabulary, idf, tfidf_matrix_docs, (term_ids, doc_lengths)
+
+    def sentence_index(self):
+        """Indeks kalimat dokumen hidup (SentenceIndex, dibaca dari disk per dokumen)."""
+        self._load_state()
+        return SentenceIndex(self.sentences_dir, {name: info['sha256'] for name, info in self.files.items()})
+
+    def checksum(self):
+        """Checksum korpus dari sha256 setiap file yang terindeks."""
+        digest = hashlib.sha256()
+        for name in sorted(self.files):
+            digest.update(f"{name}\0{self.files[name]['sha256']}\0".encode('utf-8'))
+        return digest.hexdigest()
+
+    # --- API utama ---
+
+    def refresh(self, progress=None):
+        """
+        Sinkronkan indeks dengan isi data_dir. Hanya dokumen baru/berubah yang
+        di-preprocess. Mengembalikan indeks dalam format src/index_store.py.
+        """
+        added, changed, removed = self.scan()
+
+        if added or changed or removed:
+            print(f"Indeks inkremental: {len(added)} baru, {len(changed)} berubah, {len(removed)} dihapus.")
+            for name in changed + removed:
+                self._remove_doc(name)
+            if added or changed:
+                self._add_docs(sorted(added + changed), progress=progress)
+            self._dirty = True
+
+            # Compaction berkala: hanya jika tombstone sudah terlalu banyak
+            if len(self.tombstones) > self.compaction_ratio * len(self.docs):
+                self.compact()
+
+        if not self._dirty:
+            if self._stats_dirty:
+                self.save_state() # Hanya mtime yang berubah, indeks tidak perlu dibangun ulang
+                self._stats_dirty = False
+            if self._index is None:
+                meta = read_index_meta(self.index_dir)
+                if meta is not None and meta.get('checksum') == self.checksum() and check_pipeline(meta, self.index_dir):
+                    self._index = load_index(self.index_dir)
+            if self._index is not None:
+                return self._index
+
+        self.save_state()
+        self._dirty = False
+        self._stats_dirty = False
+        doc_names, vocabulary, idf, tfidf_matrix_docs, positions = self.materialize()
+        self._index = write_index(
+            self.index_dir, doc_names, vocabulary, idf, tfidf_matrix_docs, positions, self.checksum()
+        )
+        return self._index
+
+
+if __name__ == '__main__':
+    import shutil
+    import tempfile
+    from src.vsm_ir import search_vsm
+
+    print("--- MENJALANKAN DEMO INCREMENTAL_INDEX.PY ---")
+    print("(Uji kesamaan dengan build ulang penuh: python -m pytest -q tests/test_incremental_index.py)")
+    PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(tmp, 'data')
+        os.makedirs(data_dir)
+        paths = sorted(glob.glob(os.path.join(PROJECT_ROOT, 'data', '*.txt')))
+        for path in paths[:10]:
+            shutil.copy(path, data_dir)
+
+        indexer = IncrementalIndexer(data_dir, os.path.join(tmp, 'index'), workers=1)
+        index = indexer.refresh()
+        print(f"Build awal: {len(index['doc_names'])} dokumen, {len(indexer.terms)} term.")
+
+        for path in paths[10:]:
+            shutil.copy(path, data_dir)
+        index = indexer.refresh()
+        print(f"Setelah tambah dokumen: {len(index['doc_names'])} dokumen, {len(indexer.terms)} term.")
+
+        for doc_name, score in search_vsm('magang web semarang', index['vsm_model'], index['doc_names'], None, k=3):
+            print(f"  {doc_name}: {score:.4f}")
@@ -0,0 +1,306 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import numpy as np
+
+from src.vsm_ir import FittedTfidfVectorizer, build_vsm_model, compute_term_upper_bounds
+from src.boolean_ir import InvertedIndex, build_positional_postings, positional_postings_from_ids
+from src.preprocess import get_preprocessor
+
+# ---
+# ARTEFAK INDEKS PERSISTEN
+# ---
+# Satu folder indeks berisi:
+#   meta.json            -> versi format, checksum korpus, pipeline preprocessing, doc_names, vocabulary,
+#                           dan 'generation': nama subfolder gen-* tempat semua array di bawah ini
+#   gen-<id>/            -> satu generasi array (tidak pernah diubah setelah ditulis):
+#   idf.npy              -> vektor IDF (urutan sama dengan vocabulary)
+#   tfidf_data.npy       -> matriks TF-IDF dokumen (CSR: data/indices/indptr)
+#   tfidf_indices.npy
+#   tfidf_indptr.npy
+#   postings_indptr.npy  -> postings per term (CSC dari matriks yang sama):
+#   postings_docs.npy       dokumen term ke-i = postings_docs[indptr[i]:indptr[i+1]]
+#   postings_weights.npy    bobot TF-IDF (ternormalisasi) pasangan postings_docs
+#   term_upper_bounds.npy -> bobot maksimum tiap term (batas atas untuk pruning MaxScore)
+#   positions_indptr.npy -> posisi term per posting (urutan sama dengan postings_docs):
+#   positions_data.npy      gap posisi ter-encode variable-byte, posting ke-j =
+#                           positions_data[positions_indptr[j]:positions_indptr[j+1]]
+# Semua array .npy dimuat dengan memory-map sehingga loading hampir instan.
+#
+# Penulisan ulang: array ditulis ke folder generasi BARU, lalu meta.json (penunjuk
+# generasi) diganti secara atomik. Pembaca (misal worker src/server.py) selalu
+# melihat meta + array dari generasi yang sama, tidak pernah campuran lama/baru.
+# Generasi sebelumnya disimpan satu putaran lagi untuk pembaca yang baru saja
+# membaca meta lama; generasi yang lebih tua dihapus.
+
+INDEX_FORMAT_VERSION = 5
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+INDEX_ROOT = os.path.join(PROJECT_ROOT, 'data', 'cache')
+PROCESSED_INDEX_DIR = os.path.join(INDEX_ROOT, 'index_processed') # Sumber: data/processed/ (CLI)
+RAW_INDEX_DIR = os.path.join(INDEX_ROOT, 'index_raw')             # Sumber: data/*.txt (Streamlit, inkremental)
+
+_ARRAY_NAMES = ['idf', 'tfidf_data', 'tfidf_indices', 'tfidf_indptr', 'postings_indptr', 'postings_docs', 'postings_weights', 'term_upper_bounds',
+                'positions_indptr', 'positions_data']
+
+
+def get_source_stats(file_paths):
+    """Tanda tangan murah (nama, ukuran, mtime) untuk cek cepat tanpa membaca isi file."""
+    stats = []
+    for path in sorted(file_paths):
+        st = os.stat(path)
+        stats.append([os.path.basename(path), st.st_size, st.st_mtime_ns])
+    return stats
+
+def compute_checksum(file_paths):
+    """Checksum SHA-256 dari nama dan isi semua file sumber korpus."""
+    digest = hashlib.sha256()
+    for path in sorted(file_paths):
+        digest.update(os.path.basename(path).encode('utf-8'))
+        digest.update(b'\0')
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _make_vectorizer(vocabulary, idf):
+    """Rekonstruksi vectorizer yang sudah 'fit' tanpa melatih ulang (tanpa scikit-learn)."""
+    return FittedTfidfVectorizer(vocabulary, idf)
+
+def _write_meta(index_dir, meta):
+    """Tulis meta.json secara atomik."""
+    tmp_path = os.path.join(index_dir, 'meta.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(index_dir, 'meta.json'))
+
+
+def save_artifact_arrays(index_dir, arrays, meta):
+    """
+    Tulis array ke folder generasi baru, lalu tukar meta.json (dengan kunci
+    'generation') secara atomik. Dipakai juga oleh artefak lain (misal BM25).
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    previous = (read_index_meta(index_dir) or {}).get('generation')
+    generation = f"gen-{time.time_ns()}"
+    gen_dir = os.path.join(index_dir, generation)
+    os.makedirs(gen_dir)
+    for name, array in arrays.items():
+        np.save(os.path.join(gen_dir, f"{name}.npy"), np.ascontiguousarray(array))
+
+    meta = dict(meta, generation=generation)
+    _write_meta(index_dir, meta) # Titik komit: mulai sekarang pembaca melihat generasi baru
+
+    for name in os.listdir(index_dir):
+        path = os.path.join(index_dir, name)
+        if name.startswith('gen-') and name not in (generation, previous):
+            shutil.rmtree(path, ignore_errors=True) # Generasi tua / sisa penulisan yang terputus
+        elif name.endswith(('.npy', '.npy.tmp')):
+            os.remove(path) # Array format lama (langsung di index_dir)
+    return meta
+
+def load_artifact_arrays(index_dir, meta, names, mmap=True):
+    """
+    Muat array generasi yang ditunjuk meta (memory-map). None jika tidak lengkap,
+    misal generasinya sudah dihapus oleh penulis yang lebih baru.
+    """
+    generation = meta.get('generation')
+    if not generation:
+        return None
+    try:
+        return {
+            name: np.load(os.path.join(index_dir, generation, f"{name}.npy"), mmap_mode='r' if mmap else None)
+            for name in names
+        }
+    except (OSError, ValueError) as e:
+        print(f"Artefak di '{index_dir}' tidak lengkap: {e}")
+        return None
+
+
+def check_pipeline(meta, index_dir):
+    """
+    True jika artefak dibangun dengan pipeline preprocessing yang sama dengan
+    Preprocessor proses ini (lihat src/preprocess.py). Jika tidak, term indeks
+    dan term kueri bisa berbeda diam-diam, jadi artefak dianggap basi.
+    """
+    recorded = (meta.get('pipeline') or {}).get('fingerprint')
+    current = get_preprocessor().fingerprint
+    if recorded == current:
+        return True
+    print(f"Artefak di '{index_dir}' dibangun dengan pipeline preprocessing "
+          f"{recorded or '(tidak tercatat)'}, sedangkan pipeline saat ini {current}.")
+    return False
+
+def write_index(index_dir, doc_names, vocabulary, idf, tfidf_matrix_docs, token_lists, checksum, source_stats=None):
+    """
+    Menyimpan komponen indeks yang sudah jadi (vocabulary, IDF, matriks TF-IDF)
+    sebagai artefak di index_dir, lalu memuatnya kembali. Pipeline preprocessing
+    yang sedang dipakai ikut dicatat di meta.json.
+
+    token_lists: token setiap dokumen (urutan doc_names), sumber daftar posisi
+    untuk kueri frasa dan NEAR/k. Boleh juga tuple (term_ids, doc_lengths):
+    indeks vocabulary semua token yang disambung berurutan + jumlah token per dokumen.
+    """
+    tfidf_matrix_docs = tfidf_matrix_docs.tocsr()
+    tfidf_matrix_docs.sort_indices()
+    postings = tfidf_matrix_docs.tocsc() # Kolom = term, indices = id dokumen (terurut)
+
+    if isinstance(token_lists, tuple):
+        positional = positional_postings_from_ids(*token_lists, len(vocabulary))
+    else:
+        positional = build_positional_postings(token_lists, vocabulary)
+    positional_indptr, positional_docs, positions_indptr, positions_data = positional
+    if not (np.array_equal(positional_indptr, postings.indptr) and np.array_equal(positional_docs, postings.indices)):
+        raise ValueError("Daftar posisi tidak cocok dengan postings matriks TF-IDF (token_lists berbeda dengan korpus?).")
+
+    arrays = {
+        'idf': idf,
+        'tfidf_data': tfidf_matrix_docs.data,
+        'tfidf_indices': tfidf_matrix_docs.indices,
+        'tfidf_indptr': tfidf_matrix_docs.indptr,
+        'postings_indptr': postings.indptr,
+        'postings_docs': postings.indices,
+        'postings_weights': postings.data,
+        'term_upper_bounds': compute_term_upper_bounds((postings.indptr, postings.indices, postings.data)),
+        'positions_indptr': positions_indptr,
+        'positions_data': positions_data,
+    }
+
+    meta = {
+        'format_version': INDEX_FORMAT_VERSION,
+        'checksum': checksum,
+        'pipeline': get_preprocessor().config(),
+        'source_stats': source_stats or [],
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'doc_names': list(doc_names),
+        'vocabulary': list(vocabulary),
+    }
+    save_artifact_arrays(index_dir, arrays, meta)
+
+    print(f"Artefak indeks disimpan di '{index_dir}' ({len(doc_names)} dokumen, {len(vocabulary)} term).")
+    return load_index(index_dir)
+
+def save_index(index_dir, doc_names, processed_corpus_text, checksum, source_stats=None):
+    """
+    Membangun model VSM + postings dari korpus yang sudah diproses,
+    lalu menyimpannya sebagai artefak indeks di index_dir.
+    """
+    vectorizer, tfidf_matrix_docs = build_vsm_model(processed_corpus_text)
+    analyzer = vectorizer.build_analyzer() # Tokenisasi yang sama dengan vocabulary -> posisi konsisten
+    return write_index(
+        index_dir, doc_names,
+        vectorizer.get_feature_names_out().tolist(), vectorizer.idf_, tfidf_matrix_docs,
+        [analyzer(text) for text in processed_corpus_text],
+        checksum, source_stats
+    )
+
+def read_index_meta(index_dir):
+    """Baca meta.json dari artefak indeks. None jika tidak ada atau rusak."""
+    meta_path = os.path.join(index_dir, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"meta.json di '{index_dir}' tidak bisa dibaca: {e}")
+        return None
+
+def load_index(index_dir, mmap=True):
+    """
+    Memuat artefak indeks dari disk (array dengan memory-map).
+
+    Returns:
+        dict dengan kunci: 'doc_names', 'vocabulary', 'vsm_model' (vectorizer, matriks),
+        'inverted_index' (InvertedIndex posisional di atas array memmap), 'postings_indptr', 'postings_docs',
+        'vsm_postings' (indptr, docs, weights untuk skoring term-at-a-time),
+        'term_upper_bounds' (untuk pruning MaxScore), 'idf', 'meta'.
+        None jika artefak tidak ada atau versinya berbeda.
+    """
+    meta = read_index_meta(index_dir)
+    if meta is None or meta.get('format_version') != INDEX_FORMAT_VERSION:
+        return None
+
+    arrays = load_artifact_arrays(index_dir, meta, _ARRAY_NAMES, mmap=mmap)
+    if arrays is None:
+        return None
+
+    doc_names = meta['doc_names']
+    vocabulary = meta['vocabulary']
+
+    from scipy.sparse import csr_matrix
+    tfidf_matrix_docs = csr_matrix(
+        (arrays['tfidf_data'], arrays['tfidf_indices'], arrays['tfidf_indptr']),
+        shape=(len(doc_names), len(vocabulary)),
+        copy=False
+    )
+    vectorizer = _make_vectorizer(vocabulary, arrays['idf'])
+
+    return {
+        'doc_names': doc_names,
+        'vocabulary': vocabulary,
+        'vsm_model': (vectorizer, tfidf_matrix_docs),
+        'inverted_index': InvertedIndex.from_arrays(
+            vocabulary, doc_names, arrays['postings_indptr'], arrays['postings_docs'],
+            positions=(arrays['positions_indptr'], arrays['positions_data'])
+        ),
+        'postings_indptr': arrays['postings_indptr'],
+        'postings_docs': arrays['postings_docs'],
+        'vsm_postings': (arrays['postings_indptr'], arrays['postings_docs'], arrays['postings_weights']),
+        'term_upper_bounds': arrays['term_upper_bounds'],
+        'idf': arrays['idf'],
+        'meta': meta,
+    }
+
+def is_index_fresh(index_dir, file_paths, format_version=INDEX_FORMAT_VERSION):
+    """
+    Cek apakah artefak masih sesuai dengan file sumber.
+    Cek cepat memakai (nama, ukuran, mtime); jika berbeda, baru checksum isi dihitung.
+    Artefak dari pipeline preprocessing lain juga dianggap basi (check_pipeline).
+    format_version: versi format yang diharapkan (artefak lain, misal BM25, punya versinya sendiri).
+    """
+    meta = read_index_meta(index_dir)
+    if meta is None or meta.get('format_version') != format_version:
+        return False
+    if not check_pipeline(meta, index_dir):
+        return False
+
+    source_stats = get_source_stats(file_paths)
+    if meta.get('source_stats') == source_stats:
+        return True
+
+    if meta.get('checksum') != compute_checksum(file_paths):
+        return False
+
+    # Isi sama, hanya mtime yang berubah (misal file di-copy ulang): perbarui tanda tangan
+    meta['source_stats'] = source_stats
+    _write_meta(index_dir, meta)
+    return True
+
+def load_or_build_index(index_dir, file_paths, get_corpus):
+    """
+    Memuat artefak indeks jika masih segar; jika tidak ada atau basi
+    (checksum berbeda), indeks dibangun ulang dan disimpan.
+
+    Args:
+        index_dir (str): Folder artefak indeks.
+        file_paths (list): File sumber korpus (untuk checksum).
+        get_corpus (callable): Dipanggil hanya saat rebuild, harus mengembalikan
+            (doc_names, processed_corpus_text).
+    """
+    if is_index_fresh(index_dir, file_paths):
+        index = load_index(index_dir)
+        if index is not None:
+            return index
+
+    print(f"Artefak indeks di '{index_dir}' tidak ada atau basi. Membangun ulang...")
+    doc_names, processed_corpus_text = get_corpus()
+    return save_index(
+        index_dir, doc_names, processed_corpus_text,
+        checksum=compute_checksum(file_paths),
+        source_stats=get_source_stats(file_paths)
+    )
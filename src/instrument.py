@@ -0,0 +1,291 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+# ---
+# INSTRUMENTASI HOT PATH (SPAN PER TAHAP)
+# ---
+# Span mencatat durasi satu tahap (tokenisasi, stemming, transform, skoring,
+# top-k, snippet, ...) beserta hitungan (postings disentuh, kandidat diskor).
+#
+#   with span('vsm.score') as s:
+#       ...
+#       s.count('postings', n)
+#
+# Span aktif jika instrumentasi dinyalakan global (enable() atau env
+# STKI_INSTRUMENT=1) ATAU ada trace() yang sedang berjalan di thread ini.
+# Jika tidak aktif, span() mengembalikan objek no-op bersama: biayanya hanya
+# satu pemanggilan fungsi, tanpa perf_counter dan tanpa alokasi.
+#
+# Setiap span aktif masuk ke histogram global (ekspor Prometheus text) dan,
+# jika di dalam trace(), ke daftar span trace tersebut (ekspor JSON).
+
+# Batas atas bucket histogram (detik), mirip default client Prometheus
+HISTOGRAM_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+METRIC_PREFIX = 'stki'
+
+_enabled = os.environ.get('STKI_INSTRUMENT', '').lower() in ('1', 'true', 'yes')
+_local = threading.local()
+_registry_lock = threading.Lock()
+_histograms = {} # nama tahap -> [bucket_counts, jumlah_detik, jumlah_observasi]
+_counters = defaultdict(float) # (nama tahap, nama hitungan) -> total
+
+
+def enable():
+    """Nyalakan instrumentasi global (semua thread)."""
+    global _enabled
+    _enabled = True
+
+def disable():
+    """Matikan instrumentasi global. trace() yang berjalan tetap mencatat."""
+    global _enabled
+    _enabled = False
+
+def is_enabled():
+    return _enabled or getattr(_local, 'spans', None) is not None
+
+
+class _NullSpan:
+    """Span no-op saat instrumentasi mati."""
+    __slots__ = ()
+    active = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def count(self, key, value=1):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class Span:
+    """Satu tahap yang diukur. Dibuat lewat span(), jangan langsung."""
+    __slots__ = ('name', 'counts', 'start', 'duration', 'depth', '_spans')
+    active = True
+
+    def __init__(self, name, spans):
+        self.name = name
+        self.counts = {}
+        self.start = 0.0
+        self.duration = 0.0
+        self.depth = 0
+        self._spans = spans
+
+    def __enter__(self):
+        self.depth = getattr(_local, 'depth', 0)
+        _local.depth = self.depth + 1
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self.start
+        _local.depth = self.depth
+        _observe(self)
+        if self._spans is not None:
+            self._spans.append(self)
+        return False
+
+    def count(self, key, value=1):
+        """Tambahkan hitungan (misal jumlah postings yang disentuh) ke span ini."""
+        self.counts[key] = self.counts.get(key, 0) + value
+
+
+def span(name):
+    """
+    Context manager untuk satu tahap. Mengembalikan objek dengan method
+    count(key, value) dan atribut `active` (False jika instrumentasi mati,
+    berguna untuk melewati perhitungan hitungan yang mahal).
+    """
+    spans = getattr(_local, 'spans', None)
+    if spans is None and not _enabled:
+        return _NULL_SPAN
+    return Span(name, spans)
+
+def traced(name=None):
+    """Decorator: seluruh pemanggilan fungsi menjadi satu span (default: nama modul.fungsi)."""
+    def decorator(func):
+        stage = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled and getattr(_local, 'spans', None) is None:
+                return func(*args, **kwargs)
+            with Span(stage, getattr(_local, 'spans', None)):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _observe(finished):
+    with _registry_lock:
+        hist = _histograms.get(finished.name)
+        if hist is None:
+            hist = _histograms[finished.name] = [[0] * len(HISTOGRAM_BUCKETS), 0.0, 0]
+        for i, bound in enumerate(HISTOGRAM_BUCKETS):
+            if finished.duration <= bound:
+                hist[0][i] += 1
+                break
+        hist[1] += finished.duration
+        hist[2] += 1
+        for key, value in finished.counts.items():
+            _counters[(finished.name, key)] += value
+
+def reset_metrics():
+    """Kosongkan histogram & counter global."""
+    with _registry_lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+class Trace:
+    """Span yang tercatat selama satu blok trace(), urut sesuai selesainya."""
+
+    def __init__(self):
+        self.spans = []
+        self.start = 0.0
+        self.duration = 0.0
+
+    def to_records(self):
+        """List dict per span, diurutkan menurut waktu mulai (relatif ke awal trace)."""
+        records = []
+        for s in sorted(self.spans, key=lambda s: s.start):
+            records.append({
+                'stage': s.name,
+                'start_ms': (s.start - self.start) * 1000,
+                'duration_ms': s.duration * 1000,
+                'depth': s.depth,
+                'counts': dict(s.counts),
+            })
+        return records
+
+    def summary(self):
+        """Total durasi & hitungan per tahap (tahap yang dipanggil berulang dijumlahkan)."""
+        stages = {}
+        for s in self.spans:
+            stage = stages.setdefault(s.name, {'stage': s.name, 'calls': 0, 'total_ms': 0.0, 'counts': {}})
+            stage['calls'] += 1
+            stage['total_ms'] += s.duration * 1000
+            for key, value in s.counts.items():
+                stage['counts'][key] = stage['counts'].get(key, 0) + value
+        return sorted(stages.values(), key=lambda stage: -stage['total_ms'])
+
+    def to_json(self, indent=None):
+        return json.dumps({
+            'total_ms': self.duration * 1000,
+            'summary': self.summary(),
+            'spans': self.to_records(),
+        }, indent=indent)
+
+class trace:
+    """
+    Kumpulkan semua span di thread ini selama blok berjalan, meskipun
+    instrumentasi global mati. Trace bersarang tidak didukung (yang dalam
+    menimpa yang luar sampai selesai).
+
+        with trace() as t:
+            search_vsm(...)
+        print(t.to_json())
+    """
+
+    def __init__(self):
+        self.result = Trace()
+
+    def __enter__(self):
+        self._previous = (getattr(_local, 'spans', None), getattr(_local, 'depth', 0))
+        _local.spans = self.result.spans
+        _local.depth = 0
+        self.result.start = time.perf_counter()
+        return self.result
+
+    def __exit__(self, exc_type, exc, tb):
+        self.result.duration = time.perf_counter() - self.result.start
+        _local.spans, _local.depth = self._previous
+        return False
+
+
+def _format_labels(**labels):
+    return ','.join(f'{key}="{value}"' for key, value in labels.items())
+
+def export_prometheus():
+    """
+    Histogram durasi per tahap dan counter hitungan dalam format teks Prometheus
+    (bisa disajikan di endpoint /metrics atau ditulis ke file untuk node_exporter).
+    """
+    name = f"{METRIC_PREFIX}_stage_duration_seconds"
+    lines = [
+        f"# HELP {name} Durasi tiap tahap pencarian/indexing.",
+        f"# TYPE {name} histogram",
+    ]
+    with _registry_lock:
+        histograms = {stage: (list(hist[0]), hist[1], hist[2]) for stage, hist in _histograms.items()}
+        counters = dict(_counters)
+
+    for stage in sorted(histograms):
+        buckets, total_seconds, n_obs = histograms[stage]
+        cumulative = 0
+        for bound, n in zip(HISTOGRAM_BUCKETS, buckets):
+            cumulative += n
+            lines.append(f"{name}_bucket{{{_format_labels(stage=stage, le=repr(bound))}}} {cumulative}")
+        lines.append(f"{name}_bucket{{{_format_labels(stage=stage, le='+Inf')}}} {n_obs}")
+        lines.append(f"{name}_sum{{{_format_labels(stage=stage)}}} {total_seconds!r}")
+        lines.append(f"{name}_count{{{_format_labels(stage=stage)}}} {n_obs}")
+
+    counter_name = f"{METRIC_PREFIX}_stage_items_total"
+    lines += [
+        f"# HELP {counter_name} Hitungan per tahap (postings disentuh, kandidat diskor, token, ...).",
+        f"# TYPE {counter_name} counter",
+    ]
+    for (stage, key), value in sorted(counters.items()):
+        lines.append(f"{counter_name}{{{_format_labels(stage=stage, item=key)}}} {value:g}")
+    return '\n'.join(lines) + '\n'
+
+def export_json():
+    """Snapshot histogram & counter global sebagai JSON (untuk perbandingan antar run)."""
+    with _registry_lock:
+        stages = {
+            stage: {
+                'count': hist[2],
+                'sum_seconds': hist[1],
+                'buckets': dict(zip(map(repr, HISTOGRAM_BUCKETS), hist[0])),
+            }
+            for stage, hist in _histograms.items()
+        }
+        for (stage, key), value in _counters.items():
+            stages.setdefault(stage, {}).setdefault('counts', {})[key] = value
+    return json.dumps(stages, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    # Self-test kecil: span mati tidak mencatat, span dalam trace tercatat & bersarang
+    assert span('x') is _NULL_SPAN
+
+    with trace() as t:
+        with span('luar') as outer:
+            outer.count('item', 3)
+            with span('dalam'):
+                time.sleep(0.001)
+
+        @traced('fungsi')
+        def kerja():
+            return 42
+        assert kerja() == 42
+
+    records = t.to_records()
+    assert [r['stage'] for r in records] == ['luar', 'dalam', 'fungsi'], records
+    assert records[0]['depth'] == 0 and records[1]['depth'] == 1
+    assert records[0]['counts'] == {'item': 3}
+    assert records[1]['duration_ms'] >= 1.0
+    assert span('x') is _NULL_SPAN # trace selesai -> kembali mati
+
+    prom = export_prometheus()
+    assert 'stki_stage_duration_seconds_count{stage="dalam"} 1' in prom
+    assert 'stki_stage_items_total{stage="luar",item="item"} 3' in prom
+    print(t.to_json(indent=2))
+    print(prom)
+    print("Self-test instrument.py OK.")
@@ -1,25 +1,46 @@
-import nltk
 import re
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+import os
+import sys
+import string
+import json
+import hashlib
+import glob
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
 
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    print("Downloading NLTK stopwords...")
-    nltk.download('stopwords')
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    print("Downloading NLTK punkt tokenizer...")
-    nltk.download('punkt')
+# Pastikan folder root proyek ada di sys.path agar 'src' bisa diimpor (saat dijalankan langsung)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
 
+from src.instrument import span
+from src.stopwords_id import STOPWORDS_ID
+from src.corpus_reader import iter_corpus, list_corpus_files
 
-factory = StemmerFactory()
-stemmer = factory.create_stemmer()
+# NLTK (hanya untuk jalur tokenizer 'nltk') dan stemmer Sastrawi dimuat saat
+# pertama dipakai, bukan saat impor: CLI yang hanya menjawab kueri dengan stem
+# cache yang sudah hangat tidak perlu membayar keduanya. Tidak ada unduhan data
+# NLTK otomatis; jalankan `python -m nltk.downloader punkt` jika memakai jalur NLTK.
 
-list_stopwords_dasar = stopwords.words('indonesian')
+_stemmer = None
+
+def get_stemmer():
+    """Stemmer Sastrawi (dibuat sekali, saat pertama dibutuhkan)."""
+    global _stemmer
+    if _stemmer is None:
+        from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+        _stemmer = StemmerFactory().create_stemmer()
+    return _stemmer
+
+def _sastrawi_stem(word):
+    return get_stemmer().stem(word)
+
+STEM_CACHE_PATH = os.path.join(PROJECT_ROOT, 'data', 'cache', 'stem_cache.json')
+STEM_CACHE_MAXSIZE = 200000
+
+list_stopwords_dasar = list(STOPWORDS_ID)
 
 custom_stopwords = [
     'yg', 'utk', 'dgn', 'jg', 'dg', 'sbb', 'yakni', 'wfo', 'wfh', 
@@ -39,43 +60,675 @@ def clean(text):
     return text.strip()
     
 def tokenize(text):
-    """2. Tokenisasi."""
+    """2. Tokenisasi (NLTK word_tokenize, diimpor saat pertama dipakai)."""
+    from nltk.tokenize import word_tokenize
     return word_tokenize(text)
 
+# ---
+# TOKENIZER JALUR CEPAT
+# ---
+# Setelah clean(), teks hanya berisi [a-z] dan spasi, jadi word_tokenize
+# (Punkt + regex Treebank) praktis hanya memecah di spasi. fast_tokenize
+# melakukan case folding, normalisasi, dan pemecahan dalam satu langkah:
+# teks ASCII lewat satu tabel str.translate (huruf besar -> kecil, selain huruf
+# -> spasi) lalu split(); teks non-ASCII lewat satu regex terkompilasi.
+# Hasilnya sama dengan clean() + split(). Bedanya dengan jalur NLTK hanya pada
+# kontraksi Inggris yang dipecah Treebank ('cannot' -> 'can', 'not').
+
+_ASCII_FOLD_TABLE = str.maketrans({
+    chr(i): (chr(i).lower() if chr(i) in string.ascii_letters else ' ') for i in range(128)
+})
+_WORD_RE = re.compile(r'[a-zA-Z]+')
+
+TOKENIZER = os.environ.get('STKI_TOKENIZER', 'fast')
+
+def fast_tokenize(text):
+    """Case folding + normalisasi + tokenisasi sekaligus (tanpa NLTK)."""
+    if text.isascii():
+        return text.translate(_ASCII_FOLD_TABLE).split()
+    return _WORD_RE.findall(text.lower())
+
+def nltk_tokenize(text):
+    """Jalur lengkap lama: clean() lalu NLTK word_tokenize."""
+    return tokenize(clean(text))
+
+# Tokenizer yang bisa dipilih (nama -> fungsi); tambah lewat register_tokenizer
+TOKENIZERS = {'fast': fast_tokenize, 'nltk': nltk_tokenize}
+
+def set_tokenizer(name):
+    """Pilih tokenizer untuk preprocessing: 'fast' (default) atau 'nltk'."""
+    global TOKENIZER
+    if name not in TOKENIZERS:
+        raise ValueError(f"Tokenizer tidak dikenal: {name!r}. Pilihan: {', '.join(TOKENIZERS)}")
+    TOKENIZER = name
+    set_preprocessor(get_preprocessor().replace(tokenizer=name))
+
+def clean_tokenize(text):
+    """Langkah 1 & 2 dengan tokenizer yang dipilih (lihat set_tokenizer / env STKI_TOKENIZER)."""
+    return get_preprocessor().tokenize(text)
+
 def remove_stopwords(tokens):
     """3. Stopword Removal & Filter Panjang Kata."""
-    return [word for word in tokens if word not in STOPWORDS_SET and len(word) > 2] 
+    return get_preprocessor().remove_stopwords(tokens)
+
+class StemCache:
+    """
+    Cache LRU untuk hasil stemming, dengan kunci bentuk kata asli (surface form).
+    Satu instance dipakai bersama di seluruh proses (lihat `stem_cache` di bawah),
+    sehingga Sastrawi hanya dipanggil untuk kata yang belum pernah dilihat.
+    """
+
+    def __init__(self, stem_func, maxsize=STEM_CACHE_MAXSIZE):
+        self.stem_func = stem_func
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        # Entri baru hanya dicatat di proses worker (lihat _init_preprocess_worker),
+        # yang mengirimkannya ke proses utama lewat pop_new_entries() per shard.
+        self.track_new_entries = False
+        self._new_entries = []
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def dirty(self):
+        """True jika ada entri baru yang belum disimpan ke disk."""
+        return self._dirty
+
+    def _put(self, word, root):
+        self._data[word] = root
+        self._data.move_to_end(word)
+        if self.maxsize and len(self._data) > self.maxsize:
+            self._data.popitem(last=False) # Buang entri yang paling lama tidak dipakai
+
+    def stem(self, word):
+        """Stem satu kata lewat cache."""
+        with self._lock:
+            root = self._data.get(word)
+            if root is not None:
+                self.hits += 1
+                self._data.move_to_end(word)
+                return root
+            self.misses += 1
+
+        root = self.stem_func(word)
+
+        with self._lock:
+            self._put(word, root)
+            if self.track_new_entries:
+                self._new_entries.append((word, root))
+            self._dirty = True
+        return root
+
+    def stem_many(self, words):
+        """
+        Stem banyak kata sekaligus. Kata yang sama dalam satu batch hanya
+        dicari sekali, dan hanya kata yang belum ada di cache yang di-stem.
+        """
+        resolved = {}
+        unknown = []
+        with self._lock:
+            for word in words:
+                if word in resolved:
+                    self.hits += 1
+                    continue
+                root = self._data.get(word)
+                if root is not None:
+                    self.hits += 1
+                    self._data.move_to_end(word)
+                    resolved[word] = root
+                else:
+                    self.misses += 1
+                    resolved[word] = None
+                    unknown.append(word)
+
+        if unknown:
+            new_roots = [(word, self.stem_func(word)) for word in unknown]
+            with self._lock:
+                for word, root in new_roots:
+                    resolved[word] = root
+                    self._put(word, root)
+                if self.track_new_entries:
+                    self._new_entries.extend(new_roots)
+                self._dirty = True
+
+        return [resolved[word] for word in words]
+
+    def info(self):
+        """Statistik cache: hits, misses, hit ratio, dan ukuran."""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total > 0 else 0.0,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+        }
+
+    def items(self):
+        """Salinan seluruh entri (word, root), dari yang paling lama ke yang terbaru."""
+        with self._lock:
+            return list(self._data.items())
+
+    def update(self, items):
+        """Gabungkan entri (word, root) dari luar, misal hasil worker preprocessing."""
+        with self._lock:
+            for word, root in items:
+                self._put(word, root)
+            if items:
+                self._dirty = True
+
+    def pop_new_entries(self):
+        """Ambil (lalu kosongkan) entri yang di-stem sejak pemanggilan terakhir."""
+        with self._lock:
+            entries = self._new_entries
+            self._new_entries = []
+        return entries
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._new_entries = []
+            self.hits = 0
+            self.misses = 0
+            self._dirty = False
+
+    def save(self, path):
+        """Simpan isi cache ke file JSON (urutan LRU tetap terjaga)."""
+        with self._lock:
+            items = list(self._data.items())
+            self._dirty = False
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(items, f, ensure_ascii=False)
+        os.replace(tmp_path, path) # Tulis atomik agar file tidak setengah jadi
+
+    def load(self, path):
+        """Hangatkan cache dari file JSON. Mengembalikan jumlah entri yang dimuat."""
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                items = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Gagal memuat stem cache dari {path}: {e}")
+            return 0
+
+        with self._lock:
+            for word, root in items:
+                if word not in self._data:
+                    self._put(word, root)
+        return len(items)
+
+
+stem_cache = StemCache(_sastrawi_stem)
+
+# Stemmer yang bisa dipilih Preprocessor: nama -> StemCache (None = tanpa stemming).
+# Setiap stemmer punya cache sendiri karena kunci cache hanya bentuk kata asli.
+STEMMERS = {'sastrawi': stem_cache, 'none': None}
+
+def register_tokenizer(name, tokenize_func):
+    """
+    Daftarkan tokenizer baru untuk Preprocessor. `tokenize_func` harus fungsi
+    level modul (bisa di-pickle) dan didaftarkan saat impor modulnya, agar
+    proses worker ikut mengenalnya.
+    """
+    TOKENIZERS[name] = tokenize_func
+
+def register_stemmer(name, stem_func, maxsize=STEM_CACHE_MAXSIZE):
+    """Daftarkan stemmer baru (kata -> kata dasar), otomatis dengan stem cache sendiri."""
+    STEMMERS[name] = StemCache(stem_func, maxsize)
+
+
+def stem_word(word):
+    """Stem satu kata lewat stem cache bersama."""
+    return stem_cache.stem(word)
+
+def load_stem_cache(path=STEM_CACHE_PATH):
+    """Muat stem cache dari disk (dipanggil saat startup)."""
+    return stem_cache.load(path)
+
+def save_stem_cache(path=STEM_CACHE_PATH):
+    """Simpan stem cache ke disk, hanya jika ada kata baru sejak terakhir disimpan."""
+    if stem_cache.dirty:
+        stem_cache.save(path)
 
 def stem(tokens):
-    """4. Stemming."""
-    return [stemmer.stem(word) for word in tokens]
+    """4. Stemming (lewat stem cache)."""
+    return get_preprocessor().stem(tokens)
+
+
+# ---
+# PIPELINE PREPROCESSING BERSAMA
+# ---
+# Satu objek Preprocessor = satu konfigurasi pipeline: tokenizer, daftar
+# stopword, panjang token minimum, dan stemmer (dipilih lewat nama dari
+# TOKENIZERS / STEMMERS). Objeknya tidak berubah setelah dibuat, dan satu-satunya
+# state bersama (stem cache) sudah memakai lock, jadi aman dipakai banyak thread.
+#
+# Semua modul (search.py, chat.py, app, BM25, indeks inkremental) memakai
+# instance yang sama lewat get_preprocessor(), dibuat sekali saat impor.
+# Saat di-pickle (misal ke worker ProcessPoolExecutor) yang dikirim hanya
+# konfigurasinya; worker memakai stemmer & stem cache miliknya sendiri.
+#
+# config() / fingerprint mengidentifikasi pipeline secara persis. Artefak
+# indeks menyimpannya di meta, dan artefak yang dibangun dengan pipeline lain
+# terdeteksi saat dimuat (lihat check_pipeline di src/index_store.py).
+# Naikkan PIPELINE_VERSION jika perilaku tokenizer/stemmer berubah tanpa
+# mengubah namanya.
+
+PIPELINE_VERSION = 1
+MIN_TOKEN_LENGTH = 3
+
+class Preprocessor:
+    """Pipeline tokenisasi -> stopword removal -> stemming yang bisa dikonfigurasi."""
+
+    def __init__(self, tokenizer='fast', stopwords=None, min_length=MIN_TOKEN_LENGTH, stemmer='sastrawi'):
+        if tokenizer not in TOKENIZERS:
+            raise ValueError(f"Tokenizer tidak dikenal: {tokenizer!r}. Pilihan: {', '.join(TOKENIZERS)}")
+        if stemmer not in STEMMERS:
+            raise ValueError(f"Stemmer tidak dikenal: {stemmer!r}. Pilihan: {', '.join(STEMMERS)}")
+        self.tokenizer = tokenizer
+        self.stopwords = frozenset(STOPWORDS_SET if stopwords is None else stopwords)
+        self.min_length = min_length
+        self.stemmer = stemmer
+        self.stem_cache = STEMMERS[stemmer]
+        self._tokenize = TOKENIZERS[tokenizer]
+        self.fingerprint = self._compute_fingerprint()
+
+    def __reduce__(self):
+        # Pickle hanya konfigurasi; fungsi tokenizer & stem cache diambil ulang di proses tujuan
+        return (self.__class__, (self.tokenizer, sorted(self.stopwords), self.min_length, self.stemmer))
+
+    def __eq__(self, other):
+        return isinstance(other, Preprocessor) and self.fingerprint == other.fingerprint
+
+    def __hash__(self):
+        return hash(self.fingerprint)
+
+    def __repr__(self):
+        return (f"Preprocessor(tokenizer={self.tokenizer!r}, stopwords={len(self.stopwords)}, "
+                f"min_length={self.min_length}, stemmer={self.stemmer!r}, fingerprint={self.fingerprint!r})")
+
+    def _compute_fingerprint(self):
+        config = self.config(with_fingerprint=False)
+        return hashlib.sha256(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+    def config(self, with_fingerprint=True):
+        """Deskripsi pipeline yang disimpan di meta artefak indeks (JSON-serializable)."""
+        config = {
+            'version': PIPELINE_VERSION,
+            'tokenizer': self.tokenizer,
+            'stemmer': self.stemmer,
+            'min_length': self.min_length,
+            'stopwords': len(self.stopwords),
+            'stopwords_sha256': hashlib.sha256('\n'.join(sorted(self.stopwords)).encode('utf-8')).hexdigest(),
+        }
+        if with_fingerprint:
+            config['fingerprint'] = self.fingerprint
+        return config
+
+    def replace(self, **changes):
+        """Preprocessor baru dengan sebagian konfigurasi diganti."""
+        options = {
+            'tokenizer': self.tokenizer, 'stopwords': self.stopwords,
+            'min_length': self.min_length, 'stemmer': self.stemmer,
+        }
+        options.update(changes)
+        return self.__class__(**options)
+
+    # --- Langkah-langkah ---
+
+    def tokenize(self, text):
+        """Langkah 1 & 2: case folding, normalisasi, tokenisasi."""
+        return self._tokenize(text)
+
+    def remove_stopwords(self, tokens):
+        """Langkah 3: stopword removal & filter panjang kata."""
+        stopwords = self.stopwords
+        min_length = self.min_length
+        return [word for word in tokens if word not in stopwords and len(word) >= min_length]
+
+    def stem(self, tokens):
+        """Langkah 4: stemming lewat stem cache (dalam satu batch)."""
+        if self.stem_cache is None:
+            return list(tokens)
+        return self.stem_cache.stem_many(tokens)
+
+    def preprocess(self, text):
+        """Keempat langkah untuk satu teks. Token kosong hasil stemming dibuang."""
+        with span('preprocess.tokenize') as s:
+            tokens = self.tokenize(text)
+            s.count('tokens', len(tokens))
+        with span('preprocess.stopwords'):
+            stopped_tokens = self.remove_stopwords(tokens)
+        with span('preprocess.stem') as s:
+            misses = self.stem_cache.misses if self.stem_cache is not None else 0
+            stemmed_tokens = self.stem(stopped_tokens)
+            if s.active:
+                s.count('tokens', len(stopped_tokens))
+                if self.stem_cache is not None:
+                    s.count('cache_misses', self.stem_cache.misses - misses)
+
+        # Hapus token kosong jika ada
+        return [token for token in stemmed_tokens if token]
+
+    __call__ = preprocess
+
+    def preprocess_many(self, texts):
+        """
+        Preprocessing banyak teks pendek (misal kueri) sekaligus. Semua token
+        di-stem dalam SATU batch, jadi kata yang berulang antar teks hanya
+        dicari sekali. Hasil sama dengan preprocess() per teks.
+        """
+        with span('preprocess.tokenize') as s:
+            token_lists = [self.remove_stopwords(self.tokenize(text)) for text in texts]
+            s.count('texts', len(token_lists))
+        with span('preprocess.stem') as s:
+            all_tokens = [token for tokens in token_lists for token in tokens]
+            stemmed = self.stem(all_tokens)
+            s.count('tokens', len(all_tokens))
+
+        results = []
+        start = 0
+        for tokens in token_lists:
+            results.append([token for token in stemmed[start:start + len(tokens)] if token])
+            start += len(tokens)
+        return results
+
+
+_preprocessor = Preprocessor(TOKENIZER)
+
+def get_preprocessor():
+    """Preprocessor bersama untuk proses ini (dibuat sekali saat impor)."""
+    return _preprocessor
+
+def set_preprocessor(preprocessor):
+    """Ganti Preprocessor bersama (misal di worker, atau untuk eksperimen pipeline)."""
+    global _preprocessor
+    _preprocessor = preprocessor
 
 
 def preprocess_text(text):
     """
     Fungsi utama untuk membersihkan teks (Menggabungkan 4 langkah terpisah).
     """
-    cleaned_text = clean(text)
-    tokens = tokenize(cleaned_text)
-    stopped_tokens = remove_stopwords(tokens)
-    stemmed_tokens = stem(stopped_tokens)
-    
-    # Hapus token kosong jika ada
-    final_tokens = [token for token in stemmed_tokens if token]
-    
-    return final_tokens
+    return get_preprocessor().preprocess(text)
+
+def preprocess_many(texts):
+    """
+    Preprocessing banyak teks pendek (misal kueri) sekaligus di proses ini.
+    Semua token di-stem dalam SATU batch lewat stem cache, jadi kata yang
+    berulang antar kueri hanya dicari sekali. Hasil sama dengan preprocess_text.
+    """
+    return get_preprocessor().preprocess_many(texts)
+
+
+# ---
+# PREPROCESSING KORPUS PARALEL
+# ---
+
+def _init_preprocess_worker(cache_items, preprocessor=None):
+    """
+    Initializer untuk setiap proses worker. Setiap worker memuat modul ini
+    sendiri, sehingga punya stemmer Sastrawi sendiri; di sini Preprocessor
+    proses utama (hasil unpickle) dipasang dan stem cache-nya dihangatkan
+    dengan isi cache proses utama.
+    """
+    if preprocessor is not None:
+        set_preprocessor(preprocessor)
+    cache = get_preprocessor().stem_cache
+    if cache is not None:
+        cache.update(cache_items)
+        cache.pop_new_entries()
+        cache.track_new_entries = True # Kata baru dikirim ke proses utama per shard
+
+def _preprocess_chunk(texts):
+    """Jalankan preprocess_text untuk satu shard dokumen di dalam worker."""
+    tokens_list = [preprocess_text(text) for text in texts]
+    cache = get_preprocessor().stem_cache
+    return tokens_list, cache.pop_new_entries() if cache is not None else []
+
+def _worker_initargs():
+    """initargs untuk _init_preprocess_worker: isi stem cache + Preprocessor proses ini."""
+    preprocessor = get_preprocessor()
+    cache = preprocessor.stem_cache
+    return (cache.items() if cache is not None else [], preprocessor)
+
+def _merge_worker_entries(new_entries):
+    """Gabungkan kata baru hasil stemming worker ke stem cache proses ini."""
+    cache = get_preprocessor().stem_cache
+    if cache is not None:
+        cache.update(new_entries)
+
+def preprocess_corpus(texts, workers=None, chunksize=None, progress=None):
+    """
+    Preprocessing banyak dokumen sekaligus, dibagi (shard) ke beberapa proses.
+
+    Args:
+        texts (list of str): Teks mentah dokumen.
+        workers (int): Jumlah proses worker. None = jumlah CPU; 1 = serial.
+        chunksize (int): Jumlah dokumen per shard. None = dihitung otomatis.
+        progress (callable): Dipanggil sebagai progress(selesai, total).
+
+    Returns:
+        list of list: Token hasil preprocess_text, urutannya sama dengan `texts`.
+    """
+    texts = list(texts)
+    total = len(texts)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, -(-total // (workers * 4)))
+
+    # Korpus kecil tidak sebanding dengan ongkos membuat proses baru
+    if workers <= 1 or total <= chunksize:
+        results = []
+        for i, text in enumerate(texts):
+            results.append(preprocess_text(text))
+            if progress:
+                progress(i + 1, total)
+        return results
+
+    results = [None] * total
+    done = 0
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_preprocess_worker,
+        initargs=_worker_initargs(),
+    ) as executor:
+        futures = {}
+        for start in range(0, total, chunksize):
+            future = executor.submit(_preprocess_chunk, texts[start:start + chunksize])
+            futures[future] = start
+
+        for future in as_completed(futures):
+            start = futures[future]
+            tokens_list, new_entries = future.result()
+            results[start:start + len(tokens_list)] = tokens_list # Urutan asli tetap terjaga
+            _merge_worker_entries(new_entries)
+
+            done += len(tokens_list)
+            if progress:
+                progress(done, total)
+
+    return results
+
+STREAM_CHUNKSIZE = 64
+
+def iter_preprocess_corpus(texts, workers=None, chunksize=STREAM_CHUNKSIZE, total=None, progress=None):
+    """
+    Versi streaming preprocess_corpus: `texts` boleh generator (misal dari
+    iter_corpus) dan token di-yield per dokumen, urutannya sama dengan input.
+    Paling banyak 2 * workers shard yang sedang diproses, jadi memori tetap
+    datar berapa pun ukuran korpus.
+
+    Args:
+        total (int): Jumlah dokumen jika diketahui (hanya untuk progress).
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    texts = iter(texts)
+    first = list(islice(texts, chunksize))
+    done = 0
+
+    # Korpus kecil (muat dalam satu shard) tidak sebanding dengan ongkos membuat proses baru
+    if workers <= 1 or len(first) < chunksize:
+        chunk = first
+        while chunk:
+            for text in chunk:
+                yield preprocess_text(text)
+                done += 1
+                if progress:
+                    progress(done, total)
+            chunk = list(islice(texts, chunksize))
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_preprocess_worker,
+        initargs=_worker_initargs(),
+    ) as executor:
+        pending = deque([executor.submit(_preprocess_chunk, first)])
+        exhausted = False
+        while pending:
+            while not exhausted and len(pending) < 2 * workers:
+                chunk = list(islice(texts, chunksize))
+                if not chunk:
+                    exhausted = True
+                    break
+                pending.append(executor.submit(_preprocess_chunk, chunk))
+
+            tokens_list, new_entries = pending.popleft().result()
+            _merge_worker_entries(new_entries)
+            for tokens in tokens_list:
+                yield tokens
+            done += len(tokens_list)
+            if progress:
+                progress(done, total)
+
+def print_progress(done, total):
+    """Callback progress sederhana untuk preprocess_corpus (cetak ke konsol)."""
+    if total is None:
+        print(f"Preprocessing: {done} dokumen", end='\r')
+    else:
+        print(f"Preprocessing: {done}/{total} dokumen", end='\r' if done < total else '\n')
+
+def iter_preprocess_docs(docs, workers=None, total=None, progress=None):
+    """
+    (doc_id, name, text) dari iter_corpus -> (doc_id, name, text, tokens), streaming.
+    Hanya dokumen yang sedang diproses worker yang ditahan di memori.
+    """
+    in_flight = deque()
+    def texts():
+        for doc in docs:
+            in_flight.append(doc)
+            yield doc[2]
+
+    for tokens in iter_preprocess_corpus(texts(), workers=workers, total=total, progress=progress):
+        doc_id, name, text = in_flight.popleft()
+        yield doc_id, name, text, tokens
+
+PIPELINE_FILENAME = 'pipeline.json'
+
+def read_pipeline_config(processed_dir):
+    """Konfigurasi pipeline yang menghasilkan processed_dir (None jika tidak tercatat)."""
+    path = os.path.join(processed_dir, PIPELINE_FILENAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"'{path}' tidak bisa dibaca: {e}")
+        return None
+
+def save_processed_corpus(processed_docs, processed_dir):
+    """
+    Menyimpan hasil preprocessing ke data/processed/ (satu file per dokumen)
+    beserta log ringkas, dengan format yang sama seperti di notebook.
+    `processed_docs` berisi (doc_name, tokens) dan boleh iterator: setiap
+    dokumen langsung ditulis begitu token-nya tersedia.
+    """
+    os.makedirs(processed_dir, exist_ok=True)
+
+    log_lines = []
+    for doc_name, tokens in processed_docs:
+        new_filename = os.path.join(processed_dir, f"processed_{doc_name}")
+        with open(new_filename, 'w', encoding='utf-8') as f:
+            f.write(' '.join(tokens))
+        log_lines.append(f"Sukses: '{doc_name}' -> '{new_filename}' | {len(tokens)} tokens.")
+
+    log_path = os.path.join(processed_dir, 'preprocessing_log.txt')
+    with open(log_path, 'w', encoding='utf-8') as f:
+        f.write("--- LOG PREPROCESSING ---\n")
+        f.write('\n'.join(log_lines))
+
+    # Catat pipeline yang menghasilkan file-file ini (dicek saat indeks dimuat)
+    with open(os.path.join(processed_dir, PIPELINE_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump(get_preprocessor().config(), f, indent=2)
+
+    print(f"Berhasil menyimpan {len(log_lines)} file bersih ke '{processed_dir}'.")
+    return len(log_lines)
+
+def build_processed_folder(data_dir, processed_dir, workers=None, progress=None):
+    """
+    Membaca data/doc*.txt secara streaming (src/corpus_reader.py), memprosesnya
+    secara paralel, lalu menulis hasilnya ke processed_dir per dokumen, tanpa
+    menahan seluruh korpus mentah/bersih di memori. Mengembalikan jumlah dokumen.
+    """
+    processed = iter_preprocess_docs(
+        iter_corpus(data_dir, 'doc*.txt'), workers=workers,
+        total=len(list_corpus_files(data_dir, 'doc*.txt')), progress=progress
+    )
+    return save_processed_corpus(((name, tokens) for _, name, _, tokens in processed), processed_dir)
 
 if __name__ == '__main__':
     print("--- MENJALANKAN TEST PREPROCESS.PY ---")
     sample_text = "Info Magang (Internship) Web Developer. Lokasi: WFO di Semarang Tengah. Syarat skill: PHP, Gaji nego."
     
     # Demo 4 langkah terpisah
-    cleaned = clean(sample_text)
-    tokenized = tokenize(cleaned)
+    tokenized = fast_tokenize(sample_text)
     stopped = remove_stopwords(tokenized)
     stemmed = stem(stopped)
 
     print(f"\n1. Teks Asli: {sample_text}")
-    print(f"2. HASIL clean() & tokenize(): {tokenized}")
+    print(f"2. HASIL fast_tokenize() (clean + tokenisasi): {tokenized}")
     print(f"3. HASIL remove_stopwords(): {stopped}")
-    print(f"4. HASIL preprocess_text() (Final): {stemmed}")
\ No newline at end of file
+    print(f"4. HASIL preprocess_text() (Final): {stemmed}")
+    print(f"5. Statistik stem cache: {stem_cache.info()}")
+
+    # Uji paritas tokenizer: fast_tokenize == clean() + split() untuk seluruh korpus data/*.txt,
+    # dan == clean() + word_tokenize() jika data punkt NLTK tersedia
+    samples = [sample_text, "Gaji Rp5.000.000/bulan; e-mail: HRD@PT-ABC.co.id", "Café Über  \t\nnaïve KOPI"]
+    for path in glob.glob(os.path.join(PROJECT_ROOT, 'data', '*.txt')):
+        with open(path, 'r', encoding='utf-8') as f:
+            samples.append(f.read())
+    for text in samples:
+        assert fast_tokenize(text) == clean(text).split(), text
+    try:
+        mismatches = [text for text in samples if fast_tokenize(text) != nltk_tokenize(text)]
+        print(f"6. Paritas fast vs NLTK: {len(samples) - len(mismatches)}/{len(samples)} teks identik.")
+    except (LookupError, ImportError):
+        print("6. Paritas fast vs NLTK dilewati (data punkt NLTK tidak tersedia).")
+    print("Paritas fast_tokenize vs clean() + split(): OK")
+    # Preprocessor: pickle (ke worker), fingerprint, thread-safety
+    import pickle
+    from concurrent.futures import ThreadPoolExecutor
+    preprocessor = get_preprocessor()
+    clone = pickle.loads(pickle.dumps(preprocessor))
+    assert clone == preprocessor and clone.stem_cache is stem_cache
+    assert clone.preprocess(sample_text) == preprocess_text(sample_text) == stemmed
+    assert preprocessor.replace(stopwords=STOPWORDS_SET - {'info'}).fingerprint != preprocessor.fingerprint
+    assert preprocessor.replace(stemmer='none').preprocess("Lowongan Barista") == ['lowongan', 'barista']
+    texts = samples * 4
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert list(pool.map(preprocessor.preprocess, texts)) == preprocess_many(texts)
+    print(f"7. Pipeline: {preprocessor}")
+    print("Preprocessor (pickle, fingerprint, thread-safe): OK")
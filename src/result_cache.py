@@ -0,0 +1,206 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Pastikan folder root proyek ada di sys.path agar 'src' bisa diimpor (saat dijalankan langsung)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.instrument import span
+
+# ---
+# CACHE HASIL KUERI
+# ---
+# Kunci: (model, kueri ternormalisasi, k, versi indeks, parameter lain).
+#   - Kueri ternormalisasi = token hasil preprocessing (sudah di-stem), jadi
+#     "Magang Semarang" dan "semarang  magang" memakai entri yang sama (VSM/BM25),
+#     atau plan Boolean hasil compile_boolean_query.
+#   - Versi indeks = checksum artefak. Begitu satu model melihat versi baru,
+#     semua entri lama model itu dibuang (indeks dibangun ulang -> cache basi).
+# Eviction: LRU (jumlah entri), TTL, dan batas memori (perkiraan ukuran hasil).
+#
+# `result_cache` adalah satu instance per proses yang dipakai bersama oleh
+# semua sesi Streamlit (app/main.py) dan oleh server kueri (src/server.py).
+#
+# Setiap lookup dicatat di span 'cache.lookup' (hits, misses, saved_ms =
+# durasi komputasi yang dihemat), jadi hit ratio & latensi yang dihemat ikut
+# terekspor lewat src/instrument.py (trace JSON / Prometheus).
+
+DEFAULT_MAXSIZE = 1024
+DEFAULT_TTL = 600.0 # detik
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+def estimate_size(value):
+    """Perkiraan ukuran (byte) hasil kueri: list/tuple/dict berisi str, angka, dll."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+def query_key(tokens):
+    """Kunci kueri bag-of-words (VSM/BM25): token ter-stem diurutkan, frekuensi tetap dihitung."""
+    return tuple(sorted(tokens))
+
+
+class ResultCache:
+    """
+    Cache LRU + TTL + batas memori untuk hasil kueri. Thread-safe: satu instance
+    bisa dipakai bersama oleh semua sesi Streamlit.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+        self.nbytes = 0
+        self._data = OrderedDict() # key -> (value, size, expires_at, cost_seconds)
+        self._versions = {}        # model -> versi indeks yang sedang dilayani
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    @staticmethod
+    def make_key(model, query, k, version, **params):
+        """Kunci cache. `params` untuk parameter lain yang memengaruhi hasil (misal k1, b BM25)."""
+        return (model, query, k, version, tuple(sorted(params.items())))
+
+    def _drop(self, key):
+        _, size, _, _ = self._data.pop(key)
+        self.nbytes -= size
+
+    def _check_version(self, model, version):
+        """Buang semua entri `model` jika versi indeksnya berubah. Dipanggil di dalam lock."""
+        if self._versions.get(model, version) != version:
+            stale = [key for key in self._data if key[0] == model]
+            for key in stale:
+                self._drop(key)
+            self.invalidations += 1
+        self._versions[model] = version
+
+    def lookup(self, key):
+        """Returns: (ditemukan, hasil, durasi komputasi asli dalam detik)."""
+        with self._lock:
+            self._check_version(key[0], key[3])
+            entry = self._data.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= self.clock():
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None, 0.0
+            self.hits += 1
+            self.saved_seconds += entry[3]
+            self._data.move_to_end(key)
+            return True, entry[0], entry[3]
+
+    def put(self, key, value, cost=0.0):
+        """Simpan hasil. `cost` = durasi komputasi (detik), dipakai untuk statistik latensi yang dihemat."""
+        size = estimate_size(value)
+        if self.max_bytes and size > self.max_bytes:
+            return # Satu hasil lebih besar dari seluruh cache: jangan disimpan
+        expires_at = self.clock() + self.ttl if self.ttl else None
+        with self._lock:
+            self._check_version(key[0], key[3])
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (value, size, expires_at, cost)
+            self.nbytes += size
+            while self._data and (
+                (self.maxsize and len(self._data) > self.maxsize)
+                or (self.max_bytes and self.nbytes > self.max_bytes)
+            ):
+                self._drop(next(iter(self._data))) # Entri yang paling lama tidak dipakai
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """
+        Ambil hasil dari cache; jika tidak ada, jalankan compute() lalu simpan.
+        Exception dari compute() diteruskan dan tidak di-cache.
+        """
+        with span('cache.lookup') as s:
+            found, value, cost = self.lookup(key)
+            s.count('hits' if found else 'misses')
+            if found:
+                s.count('saved_ms', cost * 1000)
+        if found:
+            return value
+
+        start = time.perf_counter()
+        value = compute()
+        self.put(key, value, time.perf_counter() - start)
+        return value
+
+    def invalidate(self, model=None):
+        """Kosongkan cache (semua model, atau satu model saja)."""
+        with self._lock:
+            for key in [key for key in self._data if model is None or key[0] == model]:
+                self._drop(key)
+            self.invalidations += 1
+
+    def info(self):
+        """Statistik cache: hits, misses, hit ratio, latensi yang dihemat, ukuran."""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total > 0 else 0.0,
+            'saved_ms': self.saved_seconds * 1000,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'bytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
+
+# Satu cache bersama untuk seluruh proses
+result_cache = ResultCache()
+
+
+if __name__ == '__main__':
+    # Self-test kecil dengan jam palsu: LRU, TTL, batas memori, invalidasi versi
+    now = [0.0]
+    cache = ResultCache(maxsize=2, ttl=10, max_bytes=10_000, clock=lambda: now[0])
+    key = lambda q, version='v1': ResultCache.make_key('vsm', query_key(q.split()), 5, version)
+
+    calls = []
+    def compute(value):
+        calls.append(value)
+        return [(value, 1.0)]
+
+    assert cache.get_or_compute(key('magang semarang'), lambda: compute('a')) == [('a', 1.0)]
+    assert cache.get_or_compute(key('semarang magang'), lambda: compute('b')) == [('a', 1.0)] # kunci sama
+    assert calls == ['a'] and cache.hits == 1
+
+    cache.get_or_compute(key('kopi'), lambda: compute('c'))
+    cache.get_or_compute(key('admin'), lambda: compute('d')) # maxsize 2 -> 'magang semarang' dibuang
+    assert cache.evictions == 1 and not cache.lookup(key('magang semarang'))[0]
+
+    now[0] = 11.0 # TTL lewat
+    assert not cache.lookup(key('admin'))[0] and cache.expirations == 1
+
+    cache.put(key('kopi'), ['x'])
+    cache.put(ResultCache.make_key('boolean', 'kopi', 5, 'v1'), ['y'])
+    assert not cache.lookup(key('kopi', version='v2'))[0] # versi baru -> entri VSM lama dibuang
+    assert len(cache) == 1 and cache.lookup(ResultCache.make_key('boolean', 'kopi', 5, 'v1'))[0]
+
+    cache.put(key('besar'), ['x' * 20_000]) # lebih besar dari max_bytes: tidak disimpan
+    assert not cache.lookup(key('besar'))[0]
+    print(cache.info())
+    print("Self-test result_cache.py OK.")
@@ -1,57 +1,54 @@
 import argparse
+import contextlib
 import glob
+import json
 import os
-import re
 import sys
-from collections import defaultdict
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
-from nltk.corpus import stopwords
-import nltk
+from collections import deque
+
+# Pastikan folder root proyek ada di sys.path agar 'src' bisa diimpor
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.preprocess import (
+    preprocess_text, preprocess_many, get_preprocessor, read_pipeline_config,
+    load_stem_cache, save_stem_cache, build_processed_folder, print_progress
+)
+from src.index_store import PROCESSED_INDEX_DIR, load_or_build_index
+from src.boolean_ir import parse_boolean_query
+from src.vsm_ir import rank_vsm, rank_vsm_batch, search_vsm_batch, proximity_candidates, rerank_by_proximity, DEFAULT_PROXIMITY_WEIGHT
+from src.corpus_reader import iter_files
+from src.bm25 import DEFAULT_K1, DEFAULT_B, DEFAULT_FIELD_WEIGHTS, load_or_build_bm25, search_bm25
+from src import instrument
+from src.server_client import SERVER_MODELS, query_server
 
 # --- SETUP (Diambil dari Notebook Anda) ---
-# Download NLTK data (jika belum)
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
-
-# Setup Stemmer Sastrawi
-factory = StemmerFactory()
-stemmer = factory.create_stemmer()
-
-# Setup Stopwords NLTK
-list_stopwords_dasar = stopwords.words('indonesian')
-STOPWORDS_SET = set(list_stopwords_dasar)
-STOPWORDS_SET.update(['yg', 'utk', 'dgn', 'jg', 'dg', 'wfo', 'wfh'])
-
-# --- FUNGSI INTI (Diambil dari Notebook Anda) ---
-
-def preprocess_text(text):
-    """Fungsi preprocessing lengkap dari Sel 7 notebook Anda."""
-    text = text.lower()
-    text = re.sub(r'[^a-zA-Z\s]', ' ', text)
-    tokens = text.split() # Gunakan split() sederhana untuk CLI
-    tokens_without_stopwords = [
-        word for word in tokens
-        if word not in STOPWORDS_SET and len(word) > 2
-    ]
-    stemmed_tokens = [stemmer.stem(word) for word in tokens_without_stopwords]
-    return [token for token in stemmed_tokens if token]
+# Preprocessing (tokenizer, stopword, stemmer Sastrawi lewat stem cache) memakai
+# Preprocessor bersama di src/preprocess.py, sama persis dengan pipeline indeks.
 
-def load_processed_data(root_dir):
-    """Memuat dokumen yang SUDAH bersih dari data/processed/"""
+def load_processed_data(root_dir, workers=None):
+    """
+    Memuat dokumen yang SUDAH bersih dari data/processed/.
+    Jika folder tersebut belum berisi, dokumen di data/ diproses dulu (paralel).
+    """
     processed_dir = os.path.join(root_dir, 'data', 'processed')
     file_paths = sorted(glob.glob(os.path.join(processed_dir, 'processed_doc*.txt')))
+
+    if not file_paths:
+        print(f"'{processed_dir}' masih kosong. Menjalankan preprocessing...")
+        build_processed_folder(
+            os.path.join(root_dir, 'data'), processed_dir,
+            workers=workers, progress=print_progress
+        )
+        file_paths = sorted(glob.glob(os.path.join(processed_dir, 'processed_doc*.txt')))
     
-    doc_names = [os.path.basename(f) for f in file_paths]
+    doc_names = []
     processed_corpus = []
     
-    for file in file_paths:
-        with open(file, 'r', encoding='utf-8') as f:
-            processed_corpus.append(f.read())
+    for _, doc_name, text in iter_files(file_paths):
+        doc_names.append(doc_name)
+        processed_corpus.append(text)
             
     if not doc_names:
         print(f"Error: Tidak ada file di '{processed_dir}'.")
@@ -60,106 +57,238 @@ def load_processed_data(root_dir):
         
     return doc_names, processed_corpus
 
+def load_search_index(root_dir, workers=None):
+    """
+    Memuat artefak indeks (inverted index + model VSM) dari disk.
+    Indeks hanya dibangun ulang jika belum ada atau isi data/processed/ berubah.
+    """
+    processed_dir = os.path.join(root_dir, 'data', 'processed')
+    file_paths = sorted(glob.glob(os.path.join(processed_dir, 'processed_doc*.txt')))
+    pipeline = read_pipeline_config(processed_dir)
+    if file_paths and pipeline is not None and pipeline.get('fingerprint') != get_preprocessor().fingerprint:
+        # Token di data/processed/ berasal dari pipeline lain: kueri tidak akan cocok
+        print(f"'{processed_dir}' dibuat dengan pipeline preprocessing {pipeline.get('fingerprint')}, "
+              f"sedangkan pipeline saat ini {get_preprocessor().fingerprint}. Menjalankan ulang preprocessing...")
+        build_processed_folder(
+            os.path.join(root_dir, 'data'), processed_dir,
+            workers=workers, progress=print_progress
+        )
+        file_paths = sorted(glob.glob(os.path.join(processed_dir, 'processed_doc*.txt')))
+    if not file_paths:
+        load_processed_data(root_dir, workers=workers) # Membuat data/processed/ dulu
+        file_paths = sorted(glob.glob(os.path.join(processed_dir, 'processed_doc*.txt')))
+
+    return load_or_build_index(
+        PROCESSED_INDEX_DIR, file_paths,
+        lambda: load_processed_data(root_dir, workers=workers)
+    )
+
 # --- LOGIKA MODEL (Langkah 2) ---
 
-def run_boolean_search(query, doc_names, processed_corpus):
+def run_boolean_search(query, index):
     """Menjalankan pencarian Boolean (dari Sel 12 & 13)"""
     
-    # 1. Bangun Inverted Index (on-the-fly)
-    inverted_index = defaultdict(set)
-    for i, text in enumerate(processed_corpus):
-        tokens = text.split()
-        for token in tokens:
-            inverted_index[token].add(doc_names[i])
-
-    # 2. Preprocess Kueri
-    query_tokens = query.split()
-    clean_terms = [stemmer.stem(t.lower()) for t in query_tokens if t.upper() not in ['AND', 'OR', 'NOT']]
-    
-    # 3. Parse Kueri (dari Sel 13)
+    # 1. Ambil Inverted Index dari artefak indeks
+    inverted_index = index['inverted_index']
+
+    # 2. Compile & jalankan kueri (AND/OR/NOT, prioritas & kurung) lewat src.boolean_ir
     try:
-        current_result_set = inverted_index.get(clean_terms[0], set())
-        i = 1
-        while i < len(query_tokens):
-            operator = query_tokens[i].upper()
-            next_term = clean_terms[i//2] # Ambil term bersih berikutnya
-            next_term_postings = inverted_index.get(next_term, set())
-            
-            if operator == 'AND':
-                current_result_set = current_result_set.intersection(next_term_postings)
-            elif operator == 'OR':
-                current_result_set = current_result_set.union(next_term_postings)
-            elif operator == 'NOT':
-                current_result_set = current_result_set.difference(next_term_postings)
-            i += 2
-        
-        return list(current_result_set)
+        return sorted(parse_boolean_query(query, inverted_index))
     
     except Exception as e:
         print(f"Error parsing boolean query: {e}")
         return []
 
-def run_vsm_search(query, k, doc_names, processed_corpus):
-    """Menjalankan pencarian VSM (dari Sel 15 & 16)"""
+def run_vsm_search(query, k, index, proximity_weight=0.0):
+    """
+    Menjalankan pencarian VSM (dari Sel 15 & 16).
+    proximity_weight > 0: kandidat cosine di-rerank dengan kedekatan term kueri (indeks posisional).
+    """
     
-    # 1. Bangun Vektorizer & Matriks TF-IDF (Model A: Standar)
-    vectorizer = TfidfVectorizer()
-    tfidf_matrix_docs = vectorizer.fit_transform(processed_corpus)
+    # 1. Ambil Vektorizer & Matriks TF-IDF (Model A: Standar) dari artefak indeks
+    vectorizer, _ = index['vsm_model']
     
     # 2. Preprocess Kueri (Gunakan fungsi lengkap)
-    clean_query = ' '.join(preprocess_text(query))
+    with instrument.span('preprocess.text'):
+        clean_tokens = preprocess_text(query)
+        clean_query = ' '.join(clean_tokens)
     if not clean_query:
         return []
 
     # 3. Representasi Kueri
-    query_vector = vectorizer.transform([clean_query])
-    
-    # 4. Hitung Cosine Similarity
-    cosine_scores = cosine_similarity(query_vector, tfidf_matrix_docs).flatten()
+    with instrument.span('vsm.transform'):
+        query_vector = vectorizer.transform([clean_query])
     
-    # 5. Ambil Top-k
-    top_k_indices = cosine_scores.argsort()[-k:][::-1]
+    # 4. Skor cosine hanya dari postings term kueri (pruning MaxScore) + Top-k (hanya skor > 0)
+    top_ids, top_scores = rank_vsm(
+        query_vector, index['vsm_postings'], proximity_candidates(k) if proximity_weight else k,
+        upper_bounds=index['term_upper_bounds']
+    )
+    if proximity_weight:
+        top_ids, top_scores = rerank_by_proximity(
+            top_ids, top_scores, clean_tokens, index['inverted_index'], k, weight=proximity_weight
+        )
     
+    return format_vsm_results(top_ids, top_scores, index)
+
+def format_vsm_results(top_ids, top_scores, index):
+    """Hasil VSM dalam format CLI: doc, score, dan explain (3 term berbobot tertinggi di dokumen)."""
+    _, tfidf_matrix_docs = index['vsm_model']
+    doc_names = index['doc_names']
+    feature_names = index['vocabulary']
+
     results = []
-    for index in top_k_indices:
-        score = cosine_scores[index]
-        if score > 0.0:
-            # Dapatkan top-terms (explain singkat)
-            feature_names = vectorizer.get_feature_names_out()
-            doc_vector = tfidf_matrix_docs[index]
-            top_terms_indices = doc_vector.indices[doc_vector.data.argsort()[-3:]][::-1]
-            top_terms = [feature_names[i] for i in top_terms_indices]
-            
-            results.append({
-                "doc": doc_names[index],
-                "score": score,
-                "explain": f"Top terms: {', '.join(top_terms)}"
-            })
+    for doc_id, score in zip(top_ids, top_scores):
+        # Dapatkan top-terms (explain singkat)
+        doc_vector = tfidf_matrix_docs[doc_id]
+        top_terms_indices = doc_vector.indices[doc_vector.data.argsort()[-3:]][::-1]
+        top_terms = [feature_names[i] for i in top_terms_indices]
+        
+        results.append({
+            "doc": doc_names[doc_id],
+            "score": score,
+            "explain": f"Top terms: {', '.join(top_terms)}"
+        })
     return results
 
+def run_vsm_search_many(queries, k, index, doc_matrix_t=None):
+    """
+    Versi batch run_vsm_search (dipakai server kueri): semua kueri di-preprocess
+    bersama dan diskor dengan satu perkalian matriks sparse. Urutan hasil sama
+    dengan run_vsm_search per kueri.
+    """
+    if len(queries) == 1:
+        return [run_vsm_search(queries[0], k, index)]
+
+    vectorizer, tfidf_matrix_docs = index['vsm_model']
+    clean_queries = [' '.join(tokens) for tokens in preprocess_many(queries)]
+    query_matrix = vectorizer.transform(clean_queries)
+    ranked = rank_vsm_batch(query_matrix, tfidf_matrix_docs, k, chunk_size=len(queries), doc_matrix_t=doc_matrix_t)
+    return [format_vsm_results(top_ids, top_scores, index) for top_ids, top_scores in ranked]
+
+def run_bm25_search(query, k, bm25_index, k1=DEFAULT_K1, b=DEFAULT_B, field_weights=None):
+    """Menjalankan pencarian BM25 (atau BM25F jika field_weights diberikan)."""
+    return [
+        {"doc": doc_name, "score": score}
+        for doc_name, score in search_bm25(query, bm25_index, k=k, k1=k1, b=b, field_weights=field_weights)
+    ]
+
+# --- MODE BATCH (--queries-file) ---
+
+def read_queries_file(path):
+    """
+    Membaca kueri satu per baris (teks biasa) atau JSONL ({"id": ..., "query": ...}).
+    Dibaca secara streaming; '-' berarti stdin.
+
+    Baris JSONL yang rusak atau tanpa "query" berupa string dilewati dengan
+    peringatan (ke stderr), jadi satu baris buruk tidak menghentikan batch.
+
+    Yields:
+        tuple: (query_id, query_text). Tanpa id, nomor baris dipakai sebagai id.
+    """
+    f = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    try:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('{'):
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    print(f"PERINGATAN: baris {line_no} di '{path}' dilewati ({e}).", file=sys.stderr)
+                    continue
+                query = record.get('query') if isinstance(record, dict) else None
+                if not isinstance(query, str):
+                    print(f"PERINGATAN: baris {line_no} di '{path}' dilewati (\"query\" harus berupa string).", file=sys.stderr)
+                    continue
+                yield record.get('id', record.get('qid', line_no)), query
+            else:
+                yield line_no, line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def run_batch_search(records, args, index, out):
+    """
+    Menjalankan banyak kueri dan menulis hasilnya sebagai JSONL ke `out`.
+    VSM diskor per chunk dengan satu perkalian matriks sparse (kecuali dengan --proximity);
+    Boolean dan BM25 per kueri.
+    """
+    query_ids = deque() # Diisi saat kueri dibaca, dikosongkan saat hasilnya ditulis
+    texts = (query_ids.append(query_id) or text for query_id, text in records)
+
+    if args.model == 'vsm' and args.proximity:
+        # Rerank kedekatan butuh indeks posisional per kueri: tidak lewat perkalian matriks batch
+        results = (
+            (query, run_vsm_search(query, args.k, index, proximity_weight=args.proximity)) for query in texts
+        )
+        results = ((query, [{"doc": res['doc'], "score": res['score']} for res in ranked]) for query, ranked in results)
+    elif args.model == 'vsm':
+        results = search_vsm_batch(
+            texts, index['vsm_model'], index['doc_names'], k=args.k,
+            chunk_size=args.batch_size, preprocess_batch=preprocess_many
+        )
+        results = ((query, [{"doc": doc, "score": score} for doc, score in ranked]) for query, ranked in results)
+    elif args.model == 'bm25':
+        field_weights = DEFAULT_FIELD_WEIGHTS if args.bm25f else None
+        results = (
+            (query, run_bm25_search(query, args.k, index, k1=args.k1, b=args.b, field_weights=field_weights))
+            for query in texts
+        )
+    else:
+        results = ((query, [{"doc": doc} for doc in run_boolean_search(query, index)]) for query in texts)
+
+    n_queries = 0
+    for query, ranked in results:
+        for res in ranked:
+            if 'score' in res:
+                res['score'] = float(res['score'])
+        out.write(json.dumps(
+            {"id": query_ids.popleft(), "query": query,
+             "model": args.model, "results": ranked},
+            ensure_ascii=False
+        ) + '\n')
+        n_queries += 1
+    out.flush()
+    return n_queries
+
 # --- MAIN ORCHESTRATOR ---
 
-def main():
-    parser = argparse.ArgumentParser(description="STKI Search Engine Orchestrator")
-    parser.add_argument('--model', required=True, choices=['boolean', 'vsm'], help="Model yang digunakan.")
-    parser.add_argument('--k', type=int, default=3, help="Jumlah hasil (untuk VSM).")
-    parser.add_argument('--query', required=True, help="Kueri pencarian.")
-    
-    args = parser.parse_args()
-    
-    # Tentukan ROOT_DIR (asumsi search.py ada di root atau src/)
-    # Sesuaikan ini jika perlu
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    root_dir = os.path.abspath(os.path.join(current_dir, '..'))
-    
-    # Muat data yang sudah diproses
-    doc_names, processed_corpus = load_processed_data(root_dir)
-    
+def run_single_search(args, index):
+    """Jalankan satu kueri (--query) dengan model yang dipilih."""
+    if args.model == 'boolean':
+        return run_boolean_search(args.query, index)
+    if args.model == 'vsm':
+        return run_vsm_search(args.query, args.k, index, proximity_weight=args.proximity)
+    field_weights = DEFAULT_FIELD_WEIGHTS if args.bm25f else None
+    return run_bm25_search(args.query, args.k, index, k1=args.k1, b=args.b, field_weights=field_weights)
+
+def try_server_search(args):
+    """
+    Kirim kueri tunggal ke server kueri (src/server.py) jika aktif.
+    Returns: hasil seperti run_single_search, atau None jika harus dicari di proses ini.
+    """
+    if args.no_server or args.model not in SERVER_MODELS or args.trace or args.metrics_file or args.proximity:
+        return None
+    responses = query_server([{'model': args.model, 'query': args.query, 'k': args.k}], address=args.server)
+    if not responses or 'results' not in responses[0]:
+        return None
+    return responses[0]['results']
+
+def write_metrics_file(path):
+    """Tulis histogram & counter per tahap (teks Prometheus) jika --metrics-file diberikan."""
+    if not path:
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(instrument.export_prometheus())
+    print(f"Metrik per tahap ditulis ke '{path}'.", file=sys.stderr)
+
+def print_single_results(args, results):
     print(f"--- Menjalankan Model: {args.model.upper()} ---")
     print(f"Kueri: {args.query}\n")
-    
+
     if args.model == 'boolean':
-        results = run_boolean_search(args.query, doc_names, processed_corpus)
         print("Hasil ditemukan:")
         if not results:
             print("Tidak ada dokumen yang cocok.")
@@ -167,7 +296,6 @@ def main():
             print(f"- {doc}")
             
     elif args.model == 'vsm':
-        results = run_vsm_search(args.query, args.k, doc_names, processed_corpus)
         print(f"Hasil Top-{args.k}:")
         if not results:
             print("Tidak ada dokumen yang relevan.")
@@ -176,5 +304,78 @@ def main():
             print(f"  Skor: {res['score']:.4f}")
             print(f"  Explain: {res['explain']}\n")
 
+    elif args.model == 'bm25':
+        print(f"Hasil Top-{args.k} ({'BM25F' if args.bm25f else 'BM25'}, k1={args.k1}, b={args.b}):")
+        if not results:
+            print("Tidak ada dokumen yang relevan.")
+        for res in results:
+            print(f"- Dokumen: {res['doc']}")
+            print(f"  Skor: {res['score']:.4f}\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="STKI Search Engine Orchestrator")
+    parser.add_argument('--model', required=True, choices=['boolean', 'vsm', 'bm25'], help="Model yang digunakan.")
+    parser.add_argument('--k', type=int, default=3, help="Jumlah hasil (untuk VSM/BM25).")
+    parser.add_argument('--k1', type=float, default=DEFAULT_K1, help="Parameter saturasi tf BM25.")
+    parser.add_argument('--b', type=float, default=DEFAULT_B, help="Parameter normalisasi panjang BM25.")
+    parser.add_argument('--bm25f', action='store_true', help="Pakai bobot field (Posisi, Lokasi, Kualifikasi) untuk BM25.")
+    parser.add_argument('--proximity', type=float, nargs='?', const=DEFAULT_PROXIMITY_WEIGHT, default=0.0,
+                        help=f"VSM: rerank dengan kedekatan term kueri (bobot, default {DEFAULT_PROXIMITY_WEIGHT} jika tanpa nilai).")
+    query_group = parser.add_mutually_exclusive_group(required=True)
+    query_group.add_argument('--query', help="Kueri pencarian.")
+    query_group.add_argument('--queries-file', help="File kueri (satu per baris atau JSONL, '-' = stdin); hasil JSONL ke stdout.")
+    parser.add_argument('--batch-size', type=int, default=1024, help="Jumlah kueri per perkalian matriks (mode batch VSM).")
+    parser.add_argument('--workers', type=int, default=None, help="Jumlah proses untuk preprocessing korpus (default: jumlah CPU).")
+    parser.add_argument('--trace', action='store_true', help="Cetak rincian waktu per tahap kueri (JSON) ke stderr.")
+    parser.add_argument('--metrics-file', default=None, help="Tulis histogram durasi per tahap (format teks Prometheus) ke file ini.")
+    parser.add_argument('--server', default=None, help="Alamat server kueri (Unix socket atau http://host:port, default: env STKI_SERVER).")
+    parser.add_argument('--no-server', action='store_true', help="Selalu cari di proses ini, jangan pakai server kueri.")
+    
+    args = parser.parse_args()
+    if args.metrics_file:
+        instrument.enable()
+    
+    # Tentukan ROOT_DIR (asumsi search.py ada di root atau src/)
+    # Sesuaikan ini jika perlu
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    root_dir = os.path.abspath(os.path.join(current_dir, '..'))
+    
+    # Kueri tunggal: pakai server kueri jika aktif (indeks sudah dimuat di sana)
+    results = try_server_search(args) if args.query is not None else None
+    if results is not None:
+        print("(dijawab oleh server kueri)", file=sys.stderr)
+        print_single_results(args, results)
+        return
+
+    # Mode batch: stdout khusus untuk JSONL, pesan status dialihkan ke stderr
+    results_out = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr if args.queries_file else sys.stdout):
+        # Hangatkan stem cache dari disk agar kata yang sudah dikenal tidak di-stem ulang
+        load_stem_cache()
+
+        # Muat artefak indeks (dibangun ulang otomatis jika basi)
+        if args.model == 'bm25':
+            # BM25F butuh field dokumen, jadi dibangun dari dokumen mentah di data/
+            index = load_or_build_bm25(os.path.join(root_dir, 'data'), workers=args.workers, progress=print_progress)
+        else:
+            index = load_search_index(root_dir, workers=args.workers)
+
+        if args.queries_file:
+            n_queries = run_batch_search(read_queries_file(args.queries_file), args, index, results_out)
+            print(f"{n_queries} kueri selesai diproses (model: {args.model}).")
+            save_stem_cache()
+            write_metrics_file(args.metrics_file)
+            return
+    
+    query_trace = instrument.trace() if args.trace else contextlib.nullcontext()
+    with query_trace as recorded:
+        results = run_single_search(args, index)
+    if args.trace:
+        print(recorded.to_json(indent=2), file=sys.stderr)
+
+    print_single_results(args, results)
+    save_stem_cache()
+    write_metrics_file(args.metrics_file)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,430 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+# Pastikan folder root proyek ada di sys.path agar 'src' bisa diimpor
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src import instrument
+from src.preprocess import load_stem_cache
+from src.index_store import PROCESSED_INDEX_DIR, load_index, read_index_meta, is_index_fresh
+from src.result_cache import ResultCache, result_cache
+from src.server_client import SERVER_MODELS, default_server_address, parse_address
+
+# ---
+# SERVER KUERI (DAEMON)
+# ---
+# Indeks dimuat sekali, lalu kueri Boolean & VSM dilayani lewat Unix socket
+# (NDJSON: satu pesan JSON per baris) atau HTTP localhost (POST /search).
+#
+#   - asyncio menerima koneksi; skoring (CPU-bound) dijalankan di pool proses.
+#     Setiap worker memory-map artefak indeks sekali saat start.
+#   - Batching: kueri yang datang dalam jendela singkat (--batch-window-ms)
+#     dikelompokkan per (model, k) dan dikirim ke worker sebagai satu batch;
+#     VSM diskor dengan satu perkalian matriks sparse per batch.
+#   - Batas konkurensi: paling banyak --max-inflight kueri diproses bersamaan,
+#     sisanya menunggu.
+#   - Reload: jika artefak indeks berubah (checksum di meta.json) atau sumbernya
+#     basi, indeks dibangun/dimuat ulang dan pool worker baru dipakai untuk kueri
+#     berikutnya; kueri yang sedang berjalan selesai di pool lama. Juga lewat
+#     SIGHUP atau pesan {"op": "reload"}.
+#   - Cache hasil: kueri yang sama (setelah dirapikan) untuk versi indeks yang
+#     sama dijawab dari `result_cache` (src/result_cache.py) tanpa ke worker.
+#     Reload ke versi baru otomatis membuang entri lama.
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_MAX_INFLIGHT = 64
+DEFAULT_BATCH_WINDOW_MS = 2.0
+DEFAULT_MAX_BATCH = 64
+DEFAULT_RELOAD_INTERVAL = 2.0
+
+
+# --- WORKER (dijalankan di proses pool) ---
+
+_worker_index = None
+_worker_doc_matrix_t = None
+
+def _init_server_worker(index_dir):
+    """Initializer worker: hangatkan stem cache dan memory-map artefak indeks."""
+    global _worker_index, _worker_doc_matrix_t
+    load_stem_cache()
+    _worker_index = load_index(index_dir)
+    if _worker_index is not None:
+        _worker_doc_matrix_t = _worker_index['vsm_model'][1].T.tocsr() # Sekali per worker untuk batch VSM
+
+def _search_batch(model, k, queries):
+    """Jalankan satu batch kueri (model & k sama) di worker. Hasil siap di-JSON-kan."""
+    from src.search import run_boolean_search, run_vsm_search_many
+
+    if _worker_index is None:
+        raise RuntimeError("Artefak indeks tidak bisa dimuat di worker.")
+    if model == 'boolean':
+        return [run_boolean_search(query, _worker_index) for query in queries]
+
+    results = run_vsm_search_many(queries, k, _worker_index, doc_matrix_t=_worker_doc_matrix_t)
+    for ranked in results:
+        for res in ranked:
+            res['score'] = float(res['score'])
+    return results
+
+def _worker_ready():
+    return _worker_index is not None
+
+
+def request_cache_query(model, query):
+    """
+    Bentuk kueri untuk kunci cache server, tanpa preprocessing (stemmer hanya
+    ada di worker): Boolean memakai bentuk kanoniknya, VSM cukup huruf kecil dan
+    spasi dirapikan (preprocessing juga melakukan case folding).
+    """
+    if model == 'boolean':
+        from src.boolean_ir import normalize_boolean_query
+        return normalize_boolean_query(query)
+    return ' '.join(query.lower().split())
+
+
+# --- SERVER ---
+
+class QueryServer:
+    """
+    Server kueri asyncio. Dibuat di dalam event loop yang sedang berjalan,
+    lalu start(address) untuk mulai menerima koneksi.
+    """
+
+    def __init__(self, root_dir=PROJECT_ROOT, index_dir=PROCESSED_INDEX_DIR, workers=DEFAULT_WORKERS,
+                 max_inflight=DEFAULT_MAX_INFLIGHT, batch_window_ms=DEFAULT_BATCH_WINDOW_MS,
+                 max_batch=DEFAULT_MAX_BATCH, reload_interval=DEFAULT_RELOAD_INTERVAL):
+        self.root_dir = root_dir
+        self.index_dir = index_dir
+        self.workers = workers
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max_batch
+        self.reload_interval = reload_interval
+
+        self.index_info = None # {'index_version', 'docs', 'loaded_at'}
+        self._pool = None
+        self._inflight = asyncio.Semaphore(max_inflight)
+        self._queue = asyncio.Queue()
+        self._reload_lock = asyncio.Lock()
+        self._tasks = set()
+        self._servers = []
+        self.stats = {'requests': 0, 'batches': 0, 'errors': 0, 'reloads': 0}
+
+    # --- indeks & pool worker ---
+
+    def _processed_files(self):
+        import glob
+        processed_dir = os.path.join(self.root_dir, 'data', 'processed')
+        return sorted(glob.glob(os.path.join(processed_dir, 'processed_doc*.txt')))
+
+    def _prepare_index(self):
+        """(Di thread) Pastikan artefak segar (build jika perlu). Returns: info indeks."""
+        from src.search import load_search_index
+        index = load_search_index(self.root_dir)
+        return {
+            'index_version': index['meta']['checksum'],
+            'docs': len(index['doc_names']),
+            'loaded_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+    def _make_pool(self):
+        # 'spawn': worker tidak mewarisi state event loop/thread proses utama
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_server_worker,
+            initargs=(self.index_dir,)
+        )
+
+    async def reload(self, reason='manual'):
+        """Muat ulang indeks dan ganti pool worker tanpa memutus kueri yang sedang berjalan."""
+        loop = asyncio.get_running_loop()
+        async with self._reload_lock:
+            info = await loop.run_in_executor(None, self._prepare_index)
+            pool = self._make_pool()
+            # Pastikan semua worker baru sudah memuat indeks sebelum dipakai
+            ready = await asyncio.gather(*[loop.run_in_executor(pool, _worker_ready) for _ in range(self.workers)])
+            if not all(ready):
+                pool.shutdown(wait=False)
+                raise RuntimeError("Worker gagal memuat artefak indeks.")
+
+            old_pool, self._pool = self._pool, pool
+            self.index_info = info
+            if old_pool is not None:
+                self.stats['reloads'] += 1
+                # Kueri yang sudah dikirim ke pool lama tetap selesai di sana
+                old_pool.shutdown(wait=False)
+            print(f"Indeks dimuat ({reason}): {info['docs']} dokumen, versi {info['index_version'][:12]}.")
+        return info
+
+    def _index_changed(self):
+        """(Di thread) True jika artefak di disk berbeda dari yang dilayani, atau sumbernya basi."""
+        meta = read_index_meta(self.index_dir)
+        if meta is None or self.index_info is None:
+            return False
+        if meta.get('checksum') != self.index_info['index_version']:
+            return True
+        return not is_index_fresh(self.index_dir, self._processed_files())
+
+    async def _watch_index(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                if await loop.run_in_executor(None, self._index_changed):
+                    await self.reload(reason='artefak berubah')
+            except Exception as e:
+                print(f"Reload otomatis gagal, tetap memakai indeks lama: {e}")
+
+    # --- batching ---
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            groups = defaultdict(list)
+            for request, future in batch:
+                groups[(request['model'], request['k'])].append((request['query'], future))
+            for (model, k), items in groups.items():
+                self._spawn(self._dispatch(model, k, items))
+
+    async def _dispatch(self, model, k, items):
+        loop = asyncio.get_running_loop()
+        self.stats['batches'] += 1
+        try:
+            with instrument.span(f'server.batch.{model}') as s:
+                s.count('queries', len(items))
+                results = await loop.run_in_executor(self._pool, _search_batch, model, k, [q for q, _ in items])
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
+
+    def _spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    # --- request ---
+
+    async def search(self, request):
+        """Satu kueri -> {'results': ...} atau {'error': pesan}."""
+        if not isinstance(request, dict):
+            return {'error': "Setiap request harus objek JSON."}
+        model = request.get('model', 'vsm')
+        query = request.get('query', '')
+        try:
+            k = int(request.get('k', 3))
+        except (TypeError, ValueError):
+            return {'error': "k harus bilangan bulat."}
+        if model not in SERVER_MODELS:
+            return {'error': f"Model '{model}' tidak dilayani server (pilihan: {', '.join(SERVER_MODELS)})."}
+        if not isinstance(query, str):
+            return {'error': "query harus string."}
+
+        self.stats['requests'] += 1
+        cache_key = ResultCache.make_key(
+            model, request_cache_query(model, query), k, (self.index_info or {}).get('index_version')
+        )
+        with instrument.span('cache.lookup') as s:
+            found, results, cost = result_cache.lookup(cache_key)
+            s.count('hits' if found else 'misses')
+            if found:
+                s.count('saved_ms', cost * 1000)
+        if found:
+            return {'results': results}
+
+        async with self._inflight:
+            future = asyncio.get_running_loop().create_future()
+            start = time.perf_counter()
+            await self._queue.put(({'model': model, 'query': query, 'k': k}, future))
+            try:
+                with instrument.span(f'server.request.{model}'):
+                    results = await future
+            except Exception as e:
+                self.stats['errors'] += 1
+                return {'error': str(e)}
+            if cache_key[3] == self.index_info.get('index_version'): # Indeks tidak di-reload sementara itu
+                result_cache.put(cache_key, results, time.perf_counter() - start)
+            return {'results': results}
+
+    async def handle_message(self, message):
+        """Pesan JSON (dict) -> balasan (dict). Dipakai oleh Unix socket dan HTTP."""
+        if not isinstance(message, dict):
+            return {'error': "Pesan harus objek JSON."}
+        op = message.get('op', 'search')
+        if op == 'ping':
+            return dict(ok=True, **(self.index_info or {}), **self.stats, cache=result_cache.info())
+        if op == 'reload':
+            try:
+                return dict(ok=True, **await self.reload(reason='permintaan klien'))
+            except Exception as e:
+                return {'ok': False, 'error': str(e)}
+        if op == 'metrics':
+            return {'metrics': instrument.export_prometheus()}
+        if op == 'search':
+            if 'requests' in message:
+                if not isinstance(message['requests'], list):
+                    return {'error': "requests harus array JSON."}
+                responses = await asyncio.gather(*[self.search(request) for request in message['requests']])
+                return {'responses': list(responses)}
+            return await self.search(message)
+        return {'error': f"Operasi '{op}' tidak dikenal."}
+
+    async def _handle_unix(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    reply = await self.handle_message(json.loads(line))
+                except ValueError as e:
+                    reply = {'error': f"JSON tidak valid: {e}"}
+                writer.write(json.dumps(reply, ensure_ascii=False).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_http(self, reader, writer):
+        """HTTP/1.1 minimal: GET /health, GET /metrics, POST /search, POST /reload."""
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0) or 0))
+
+            status, content_type = '200 OK', 'application/json'
+            method, path = (request_line + ['', ''])[:2]
+            if method == 'GET' and path == '/health':
+                payload = await self.handle_message({'op': 'ping'})
+            elif method == 'GET' and path == '/metrics':
+                payload, content_type = instrument.export_prometheus(), 'text/plain; version=0.0.4'
+            elif method == 'POST' and path in ('/search', '/reload'):
+                try:
+                    message = json.loads(body or b'{}')
+                except ValueError as e:
+                    status, payload = '400 Bad Request', {'error': f"JSON tidak valid: {e}"}
+                else:
+                    if isinstance(message, dict):
+                        payload = await self.handle_message(dict(message, op=path[1:]))
+                    else:
+                        status, payload = '400 Bad Request', {'error': "Pesan harus objek JSON."}
+            else:
+                status, payload = '404 Not Found', {'error': f"{method} {path} tidak dikenal."}
+
+            data = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+            data = data.encode('utf-8')
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode('latin-1') + data
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    # --- lifecycle ---
+
+    async def start(self, address=None):
+        """Muat indeks, start pool worker, lalu dengarkan di `address` (Unix socket atau http://host:port)."""
+        await self.reload(reason='start')
+        self._spawn(self._batch_loop())
+        if self.reload_interval > 0:
+            self._spawn(self._watch_index())
+
+        kind, target = parse_address(address or default_server_address())
+        if kind == 'unix':
+            os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+            if os.path.exists(target):
+                os.remove(target) # Sisa server sebelumnya
+            server = await asyncio.start_unix_server(self._handle_unix, path=target)
+        else:
+            server = await asyncio.start_server(self._handle_http, host=target[0], port=target[1])
+        self._servers.append((server, kind, target))
+        print(f"Server kueri siap di {address or default_server_address()} ({self.workers} worker).")
+        return server
+
+    async def close(self):
+        for server, kind, target in self._servers:
+            server.close()
+            await server.wait_closed()
+            if kind == 'unix' and os.path.exists(target):
+                os.remove(target)
+        for task in list(self._tasks):
+            task.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+async def serve(address, **kwargs):
+    """Jalankan server sampai SIGINT/SIGTERM. SIGHUP = muat ulang indeks."""
+    server = QueryServer(**kwargs)
+    await server.start(address)
+
+    loop = asyncio.get_running_loop()
+    stop = loop.create_future()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, lambda: stop.done() or stop.set_result(None))
+    if hasattr(signal, 'SIGHUP'):
+        loop.add_signal_handler(signal.SIGHUP, lambda: server._spawn(server.reload(reason='SIGHUP')))
+
+    await stop
+    print("Menghentikan server kueri...")
+    await server.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Server kueri STKI (indeks dimuat sekali, Boolean & VSM)")
+    parser.add_argument('--address', default=None,
+                        help="Path Unix socket atau http://127.0.0.1:PORT (default: env STKI_SERVER atau data/cache/stki.sock).")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Jumlah proses worker untuk skoring.")
+    parser.add_argument('--max-inflight', type=int, default=DEFAULT_MAX_INFLIGHT, help="Maksimum kueri yang diproses bersamaan.")
+    parser.add_argument('--batch-window-ms', type=float, default=DEFAULT_BATCH_WINDOW_MS, help="Jendela pengumpulan batch (milidetik).")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH, help="Maksimum kueri per batch.")
+    parser.add_argument('--reload-interval', type=float, default=DEFAULT_RELOAD_INTERVAL,
+                        help="Interval cek perubahan artefak indeks (detik, 0 = mati).")
+    args = parser.parse_args()
+
+    instrument.enable() # Histogram latensi request/batch untuk /metrics
+    asyncio.run(serve(
+        args.address, workers=args.workers, max_inflight=args.max_inflight,
+        batch_window_ms=args.batch_window_ms, max_batch=args.max_batch, reload_interval=args.reload_interval
+    ))
+
+if __name__ == "__main__":
+    main()
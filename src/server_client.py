@@ -0,0 +1,94 @@
+import http.client
+import json
+import os
+import socket
+
+# ---
+# KLIEN TIPIS SERVER KUERI (src/server.py)
+# ---
+# Dipakai search.py dan chat.py. Hanya modul standar (socket, json, http.client)
+# agar impornya tetap murah. Jika server tidak aktif, fungsi di sini
+# mengembalikan None dan pemanggil menjalankan pencarian di prosesnya sendiri.
+#
+# Alamat server: path Unix socket (default data/cache/stki.sock) atau
+# 'http://host:port'. Bisa diatur lewat environment variable STKI_SERVER.
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+DEFAULT_SOCKET_PATH = os.path.join(PROJECT_ROOT, 'data', 'cache', 'stki.sock')
+DEFAULT_TIMEOUT = 30.0
+SERVER_MODELS = ('boolean', 'vsm')
+
+
+def default_server_address():
+    return os.environ.get('STKI_SERVER') or DEFAULT_SOCKET_PATH
+
+def parse_address(address):
+    """'http://host:port' -> ('http', (host, port)); selain itu path Unix socket -> ('unix', path)."""
+    if address.startswith('http://'):
+        host, _, port = address[len('http://'):].rstrip('/').partition(':')
+        return 'http', (host or '127.0.0.1', int(port or 80))
+    return 'unix', address
+
+
+def _send_unix(path, payload, timeout):
+    if not hasattr(socket, 'AF_UNIX') or not os.path.exists(path):
+        return None
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(json.dumps(payload, ensure_ascii=False).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as f:
+            line = f.readline()
+    return json.loads(line) if line else None
+
+def _send_http(host, port, payload, timeout):
+    path = '/' + payload.get('op', 'search')
+    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        if payload.get('op') in ('ping', 'metrics'):
+            conn.request('GET', '/health' if payload['op'] == 'ping' else '/metrics')
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            conn.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        data = response.read()
+    finally:
+        conn.close()
+    if payload.get('op') == 'metrics':
+        return {'metrics': data.decode('utf-8')}
+    return json.loads(data)
+
+def send_request(payload, address=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Kirim satu pesan JSON ke server dan kembalikan balasannya (dict).
+    None jika server tidak aktif / tidak bisa dihubungi.
+    """
+    kind, target = parse_address(address or default_server_address())
+    try:
+        if kind == 'unix':
+            return _send_unix(target, payload, timeout)
+        return _send_http(target[0], target[1], payload, timeout)
+    except (OSError, ValueError, http.client.HTTPException):
+        return None
+
+
+def ping_server(address=None, timeout=1.0):
+    """Info server ({'ok', 'docs', 'index_version', ...}) atau None jika server tidak aktif."""
+    reply = send_request({'op': 'ping'}, address, timeout=timeout)
+    return reply if reply and reply.get('ok') else None
+
+def query_server(requests, address=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Kirim banyak kueri sekaligus.
+
+    Args:
+        requests (list of dict): {'model': 'boolean'|'vsm', 'query': str, 'k': int}.
+
+    Returns:
+        list of dict: Satu balasan per kueri ({'results': ...} atau {'error': pesan}),
+        urutan sama dengan `requests`. None jika server tidak aktif.
+    """
+    reply = send_request({'op': 'search', 'requests': list(requests)}, address, timeout=timeout)
+    if reply is None or 'responses' not in reply:
+        return None
+    return reply['responses']
@@ -0,0 +1,127 @@
+import os
+import re
+import sys
+
+# Pastikan folder root proyek ada di sys.path agar 'src' bisa diimpor (saat dijalankan langsung)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.preprocess import preprocess_many
+
+# ---
+# SNIPPET DARI INDEKS KALIMAT
+# ---
+# Batas kalimat dan himpunan term (sudah di-stem) per kalimat dihitung sekali
+# saat indexing (lihat IncrementalIndexer) dan disimpan per dokumen (satu file JSON):
+#
+#   [[start, end, [term, ...]], ...]   # offset karakter di teks asli
+#
+# Saat kueri, kalimat terbaik dipilih dengan irisan himpunan term, dan
+# highlight memakai SATU regex alternasi yang dikompilasi sekali per kueri.
+
+SNIPPET_MAX_CHARS = 250
+FALLBACK_CHARS = 150
+
+# Satu kalimat: mulai dari karakter non-spasi, berhenti di akhir baris atau
+# setelah tanda baca akhir (.!?) yang diikuti spasi/akhir teks.
+# Korpus berbentuk baris-baris ("Posisi: ...", "Lokasi: ..."), jadi baris baru
+# juga dianggap batas kalimat. Titik di tengah token (misal "2.0") bukan batas.
+_SENTENCE_RE = re.compile(r'\S(?:[^\n.!?]|[.!?](?=\S))*[.!?]*')
+
+
+def split_sentences(text):
+    """Batas kalimat sebagai list (start, end) offset karakter di `text`."""
+    spans = []
+    for match in _SENTENCE_RE.finditer(text):
+        start, end = match.span()
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        spans.append((start, end))
+    return spans
+
+def build_sentence_index(texts):
+    """
+    Indeks kalimat untuk banyak dokumen sekaligus. Semua kalimat di-preprocess
+    dalam satu batch (preprocess_many), jadi kata yang berulang hanya di-stem sekali.
+
+    Returns:
+        list: Per dokumen, list [start, end, term_terurut] per kalimat.
+    """
+    spans_per_doc = [split_sentences(text) for text in texts]
+    sentences = [text[start:end] for text, spans in zip(texts, spans_per_doc) for start, end in spans]
+    terms = iter(preprocess_many(sentences))
+    return [
+        [[start, end, sorted(set(next(terms)))] for start, end in spans]
+        for spans in spans_per_doc
+    ]
+
+
+def compile_highlighter(query_terms):
+    """
+    Satu regex alternasi untuk semua term kueri (case-insensitive).
+    Term yang lebih panjang didahulukan agar tidak terpotong oleh prefiksnya.
+    None jika tidak ada term.
+    """
+    terms = sorted({term.lower() for term in query_terms if term}, key=lambda term: (-len(term), term))
+    if not terms:
+        return None
+    return re.compile('|'.join(map(re.escape, terms)), re.IGNORECASE)
+
+def highlight(text, highlighter):
+    """Tebalkan (markdown **...**) semua kecocokan term kueri di `text`."""
+    if highlighter is None:
+        return text
+    return highlighter.sub(lambda match: f"**{match.group(0)}**", text)
+
+def make_snippet(text, sentence_index, query_terms, highlighter=None, max_chars=SNIPPET_MAX_CHARS):
+    """
+    Kalimat dengan term kueri terbanyak (kalimat pertama jika seri atau tidak ada
+    yang cocok), di-highlight dan dipotong ke `max_chars`.
+
+    Args:
+        text (str): Teks asli dokumen.
+        sentence_index (list): [start, end, terms] per kalimat (build_sentence_index).
+            None = dihitung saat itu juga (dokumen di luar indeks).
+        query_terms (set): Term kueri yang sudah di-stem.
+        highlighter: Hasil compile_highlighter (dibuat sekali per kueri).
+    """
+    if sentence_index is None:
+        sentence_index = build_sentence_index([text])[0]
+    query_terms = set(query_terms)
+
+    best = None
+    max_hits = 0
+    for start, end, terms in sentence_index:
+        if query_terms.isdisjoint(terms): # Kebanyakan kalimat: tanpa alokasi set baru
+            continue
+        hits = len(query_terms.intersection(terms))
+        if hits > max_hits:
+            max_hits = hits
+            best = (start, end)
+    if best is None and sentence_index:
+        best = tuple(sentence_index[0][:2])
+
+    snippet = text[best[0]:best[1]] if best else text[:FALLBACK_CHARS]
+    snippet = highlight(snippet, highlighter)
+    if len(snippet) > max_chars:
+        snippet = "..." + snippet[:max_chars] + "..."
+    return snippet
+
+
+if __name__ == '__main__':
+    # Self-test kecil: batas kalimat, pemilihan kalimat, highlight satu regex
+    text = "Posisi: Magang - Web Developer\n\nLokasi: Semarang.  Versi 2.0 dipakai! Gaji UMR?\nKualifikasi:\n"
+    sentences = [text[s:e] for s, e in split_sentences(text)]
+    assert sentences == ["Posisi: Magang - Web Developer", "Lokasi: Semarang.", "Versi 2.0 dipakai!", "Gaji UMR?", "Kualifikasi:"], sentences
+
+    index = build_sentence_index([text])[0]
+    assert len(index) == len(sentences)
+    terms = {'semarang', 'lokasi'}
+    snippet = make_snippet(text, index, terms, compile_highlighter(terms))
+    assert snippet == "**Lokasi**: **Semarang**.", snippet
+    assert make_snippet(text, index, {'tidakada'}) == "Posisi: Magang - Web Developer"
+    assert make_snippet(text, None, terms, compile_highlighter(terms)) == snippet
+    assert highlight("magangmagang", compile_highlighter(['magang', 'mag'])) == "**magang****magang**"
+    assert make_snippet("", [], terms) == ""
+    print("Self-test snippets.py OK.")
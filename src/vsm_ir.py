@@ -1,9 +1,12 @@
 
 
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import math
+import re
+import weakref
 import numpy as np
 
+from src.instrument import span
+
 
 
 def build_vsm_model(processed_corpus_text):
@@ -15,8 +18,8 @@ def build_vsm_model(processed_corpus_text):
     agar sama dengan yang dikirim dari main.py
     """
     
-    # 1. Buat Vectorizer
-    
+    # 1. Buat Vectorizer (scikit-learn diimpor di sini saja: cukup berat untuk startup CLI)
+    from sklearn.feature_extraction.text import TfidfVectorizer
     vectorizer = TfidfVectorizer()
     
     # 2. Buat TF-IDF Matrix
@@ -30,10 +33,459 @@ def build_vsm_model(processed_corpus_text):
     return (vectorizer, tfidf_matrix_docs)
 
 
-def search_vsm(query_text, vsm_model, doc_names, preprocessed_docs, k=5):
+class FittedTfidfVectorizer:
+    """
+    Pengganti ringan TfidfVectorizer yang sudah 'fit', untuk mengubah kueri menjadi
+    vektor TF-IDF dari vocabulary + IDF artefak indeks. Mengikuti parameter default
+    scikit-learn (lowercase, token_pattern bawaan, tf mentah x idf, normalisasi L2)
+    sehingga hasil transform() identik, tanpa mengimpor scikit-learn
+    (beberapa detik) saat CLI hanya menjawab kueri.
+    """
+
+    _TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+
+    def __init__(self, vocabulary, idf):
+        if isinstance(vocabulary, dict):
+            self.vocabulary_ = vocabulary
+        else:
+            self.vocabulary_ = {term: i for i, term in enumerate(vocabulary)}
+        self.idf_ = np.asarray(idf, dtype=np.float64)
+
+    def get_feature_names_out(self):
+        names = np.empty(len(self.vocabulary_), dtype=object)
+        for term, i in self.vocabulary_.items():
+            names[i] = term
+        return names
+
+    def transform(self, raw_documents):
+        """list of str -> matriks CSR (n_dokumen x n_term), baris ternormalisasi L2."""
+        from scipy.sparse import csr_matrix
+
+        indptr, indices, data = [0], [], []
+        for text in raw_documents:
+            counts = {}
+            for token in self._TOKEN_RE.findall(text.lower()):
+                term_id = self.vocabulary_.get(token)
+                if term_id is not None:
+                    counts[term_id] = counts.get(term_id, 0) + 1
+            term_ids = sorted(counts)
+            weights = [counts[t] * self.idf_[t] for t in term_ids]
+            # Norma dijumlahkan berurutan, sama seperti normalize() scikit-learn
+            norm = math.sqrt(sum(w * w for w in weights))
+            indices.extend(term_ids)
+            data.extend(w / norm for w in weights)
+            indptr.append(len(indices))
+
+        return csr_matrix(
+            (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int32)),
+            shape=(len(indptr) - 1, len(self.vocabulary_))
+        )
+
+
+def top_k_indices(scores, k, min_score=None):
+    """
+    Memilih indeks k skor tertinggi tanpa mengurutkan semua dokumen.
+    np.argpartition (O(N)) lalu hanya k kandidat yang diurutkan.
+
+    Args:
+        scores (array): Skor per dokumen (indeks = ID dokumen).
+        k (int): Jumlah hasil maksimum.
+        min_score (float, optional): Hanya skor > min_score yang diambil.
+
+    Returns:
+        np.ndarray: Indeks dokumen, skor menurun; skor sama diurutkan
+        berdasarkan ID dokumen (kecil dulu) agar hasil stabil.
+    """
+    scores = np.asarray(scores).ravel()
+    if min_score is None:
+        candidates = np.arange(len(scores))
+    else:
+        candidates = np.flatnonzero(scores > min_score)
+
+    if k <= 0 or len(candidates) == 0:
+        return np.zeros(0, dtype=np.intp)
+
+    candidate_scores = scores[candidates]
+    if k < len(candidates):
+        # Skor ke-k sebagai batas; yang sama dengan batas diisi dari ID terkecil
+        kth_score = -np.partition(-candidate_scores, k - 1)[k - 1]
+        above = candidates[candidate_scores > kth_score]
+        tied = candidates[candidate_scores == kth_score][:k - len(above)]
+        candidates = np.concatenate([above, tied])
+
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order]
+
+
+def build_term_postings(tfidf_matrix_docs):
+    """
+    Postings berbobot per term dari matriks TF-IDF dokumen (format CSC).
+    Dokumen term ke-i = doc_ids[indptr[i]:indptr[i+1]], bobotnya di weights.
+
+    Returns:
+        tuple: (indptr, doc_ids, weights)
+    """
+    postings = tfidf_matrix_docs.tocsc()
+    postings.sort_indices()
+    return (postings.indptr, postings.indices, postings.data)
+
+# Postings hasil build_term_postings per matriks TF-IDF: id(matriks) -> (weakref matriks, postings).
+# Entri dibuang otomatis saat matriksnya dibuang (weakref callback), jadi id tidak pernah tertukar.
+_term_postings_cache = {}
+
+def get_term_postings(tfidf_matrix_docs):
+    """build_term_postings dengan cache: postings matriks yang sama hanya dibangun sekali."""
+    key = id(tfidf_matrix_docs)
+    entry = _term_postings_cache.get(key)
+    if entry is not None and entry[0]() is tfidf_matrix_docs:
+        return entry[1]
+    with span('vsm.build_postings'):
+        postings = build_term_postings(tfidf_matrix_docs)
+    ref = weakref.ref(tfidf_matrix_docs, lambda _, key=key: _term_postings_cache.pop(key, None))
+    _term_postings_cache[key] = (ref, postings)
+    return postings
+
+def compute_term_upper_bounds(postings):
+    """
+    Bobot maksimum tiap term di seluruh dokumen (batas atas kontribusi term
+    ke skor cosine, sebelum dikali bobot kueri). Dipakai untuk pruning MaxScore.
+    """
+    indptr, _, weights = postings
+    indptr = np.asarray(indptr)
+    upper_bounds = np.zeros(len(indptr) - 1)
+    nonempty = np.diff(indptr) > 0
+    if nonempty.any():
+        upper_bounds[nonempty] = np.maximum.reduceat(np.asarray(weights), indptr[:-1][nonempty])
+    return upper_bounds
+
+def _normalized_query(query_vector):
+    """(term_ids, bobot) kueri yang dinormalisasi L2, seperti di cosine_similarity."""
+    query_vector = query_vector.tocsr()
+    terms, query_weights = query_vector.indices, query_vector.data
+    query_norm = np.sqrt(np.dot(query_weights, query_weights))
+    if query_norm == 0:
+        return terms[:0], query_weights[:0]
+    return terms, query_weights / query_norm
+
+def score_term_at_a_time(query_vector, postings):
+    """
+    Skor cosine hanya untuk dokumen yang memuat minimal satu term kueri.
+    Vektor dokumen TF-IDF sudah ternormalisasi L2, jadi cosine = dot product
+    dengan vektor kueri yang dinormalisasi. Kontribusi dari postings tiap term
+    kueri dijumlahkan di akumulator sparse (np.unique + np.bincount), sehingga
+    biayanya sebanding dengan jumlah postings yang disentuh, bukan ukuran korpus.
+
+    Returns:
+        tuple: (doc_ids, scores) -- doc_ids terurut naik.
+    """
+    indptr, doc_ids, weights = postings
+    terms, query_weights = _normalized_query(query_vector)
+    if len(terms) == 0:
+        return np.zeros(0, dtype=np.intp), np.zeros(0)
+
+    touched_docs = [doc_ids[indptr[t]:indptr[t + 1]] for t in terms]
+    contributions = [weights[indptr[t]:indptr[t + 1]] * w for t, w in zip(terms, query_weights)]
+
+    touched_docs, inverse = np.unique(np.concatenate(touched_docs), return_inverse=True)
+    scores = np.bincount(inverse, weights=np.concatenate(contributions), minlength=len(touched_docs))
+    return touched_docs, scores
+
+def _lookup_contributions(docs, term_docs, term_weights, query_weight):
+    """Kontribusi satu term untuk daftar dokumen terurut (0 jika term tidak ada di dokumen)."""
+    if len(term_docs) == 0:
+        return np.zeros(len(docs))
+    pos = np.searchsorted(term_docs, docs).clip(max=len(term_docs) - 1)
+    return np.where(term_docs[pos] == docs, term_weights[pos] * query_weight, 0.0)
+
+# Di bawah jumlah postings ini, skoring lengkap lebih cepat dari overhead pruning
+# (lihat BENCHMARK PRUNING MAXSCORE di src/benchmark.py)
+MAXSCORE_MIN_POSTINGS = 20000
+
+def rank_vsm_maxscore(query_vector, postings, upper_bounds, k, min_score=0.0, stats=None):
+    """
+    Top-k VSM dengan dynamic pruning MaxScore. Hasilnya sama persis dengan rank_vsm.
+
+    1. Dokumen dengan bobot tertinggi di tiap term kueri diskor penuh -> ambang
+       awal (skor ke-k) yang pasti tidak lebih tinggi dari skor ke-k sebenarnya.
+    2. Term diurutkan dari batas atas terkecil; term yang jumlah batas atasnya
+       masih di bawah ambang adalah term "non-esensial": dokumen yang hanya
+       memuat term tersebut tidak mungkin masuk top-k, jadi tidak pernah disentuh.
+    3. Kandidat dari term esensial diberi skor parsial; ambang dinaikkan ke skor
+       parsial ke-k. Term non-esensial ditambahkan satu per satu hanya untuk
+       kandidat yang skor parsial + sisa batas atasnya masih bisa mencapai ambang.
+
+    Args:
+        upper_bounds (array): Hasil compute_term_upper_bounds(postings).
+        stats (dict, optional): Diisi jumlah dokumen 'candidates', 'scored', 'skipped'.
+
+    Returns:
+        tuple: (doc_ids, scores) berurutan dari skor tertinggi.
+    """
+    indptr, doc_ids, weights = postings
+    terms, query_weights = _normalized_query(query_vector)
+    if k <= 0 or len(terms) == 0:
+        return np.zeros(0, dtype=np.intp), np.zeros(0)
+
+    term_docs = [doc_ids[indptr[t]:indptr[t + 1]] for t in terms]
+    term_weights = [weights[indptr[t]:indptr[t + 1]] for t in terms]
+    # Sedikit kelonggaran agar pembulatan floating point tidak memangkas dokumen yang valid
+    term_bounds = query_weights * np.asarray(upper_bounds)[terms] * (1 + 1e-9)
+
+    def full_scores(docs):
+        # Urutan penjumlahan sama dengan score_term_at_a_time (urut ID term)
+        scores = np.zeros(len(docs))
+        for i in range(len(terms)):
+            scores += _lookup_contributions(docs, term_docs[i], term_weights[i], query_weights[i])
+        return scores
+
+    # 1. Ambang awal dari k dokumen berbobot tertinggi di tiap term
+    seeds = []
+    for docs, term_weight in zip(term_docs, term_weights):
+        if len(docs) > k:
+            docs = docs[np.argpartition(-term_weight, k - 1)[:k]]
+        seeds.append(docs)
+    seed_docs = np.unique(np.concatenate(seeds))
+    threshold = -np.inf
+    if len(seed_docs) >= k:
+        threshold = -np.partition(-full_scores(seed_docs), k - 1)[k - 1]
+
+    # 2. Pisahkan term non-esensial (batas atas kumulatif < ambang atau <= min_score)
+    by_bound = np.argsort(term_bounds, kind='stable')
+    cumulative = np.cumsum(term_bounds[by_bound])
+    prunable = (cumulative < threshold) | (cumulative <= min_score)
+    n_nonessential = int(np.count_nonzero(prunable))
+    essential = np.sort(by_bound[n_nonessential:])
+    nonessential_bound = cumulative[n_nonessential - 1] if n_nonessential else 0.0
+
+    # 3. Skor parsial kandidat dari term esensial (akumulator sparse)
+    if len(essential) == 1:
+        candidates = np.asarray(term_docs[essential[0]])
+        partial = term_weights[essential[0]] * query_weights[essential[0]]
+    else:
+        candidates, inverse = np.unique(np.concatenate([term_docs[i] for i in essential]), return_inverse=True)
+        partial = np.bincount(
+            inverse,
+            weights=np.concatenate([term_weights[i] * query_weights[i] for i in essential]),
+            minlength=len(candidates)
+        )
+
+    def raise_threshold(threshold, partial):
+        # Skor parsial <= skor penuh, jadi skor parsial ke-k juga batas bawah yang sah
+        # (dikurangi sedikit karena urutan penjumlahannya berbeda dengan skor akhir)
+        if len(partial) >= k:
+            return max(threshold, -np.partition(-partial, k - 1)[k - 1] * (1 - 1e-9))
+        return threshold
+
+    # 4. Tambahkan term non-esensial satu per satu (batas atas terbesar dulu),
+    #    buang kandidat yang skor parsial + sisa batas atasnya tidak bisa mencapai ambang
+    threshold = raise_threshold(threshold, partial)
+    alive = candidates
+    for j in range(n_nonessential, -1, -1):
+        remaining = cumulative[j - 1] if j > 0 else 0.0
+        if j < n_nonessential:
+            i = by_bound[j]
+            partial = partial + _lookup_contributions(alive, term_docs[i], term_weights[i], query_weights[i])
+            threshold = raise_threshold(threshold, partial)
+        keep = (partial + remaining >= threshold) & (partial + remaining > min_score)
+        alive, partial = alive[keep], partial[keep]
+
+    # Skor akhir dihitung ulang dengan urutan penjumlahan yang sama dengan
+    # score_term_at_a_time, agar skor (dan urutan hasil) identik
+    scored_docs = alive
+    scores = full_scores(scored_docs)
+
+    if stats is not None:
+        stats['candidates'] = len(candidates)
+        stats['scored'] = len(scored_docs)
+        stats['skipped'] = len(candidates) - len(scored_docs)
+
+    # scored_docs terurut naik, jadi tie-break posisi = tie-break ID dokumen
+    top = top_k_indices(scores, k, min_score=min_score)
+    return scored_docs[top], scores[top]
+
+def rank_vsm(query_vector, postings, k, min_score=0.0, upper_bounds=None):
+    """
+    Top-k dokumen untuk satu vektor kueri dengan skoring term-at-a-time.
+    Urutan sama dengan cosine_similarity + top_k_indices pada matriks penuh.
+    Jika upper_bounds diberikan dan postings yang disentuh cukup banyak,
+    dipakai pruning MaxScore (hasil tetap sama).
+
+    Returns:
+        tuple: (doc_ids, scores) berurutan dari skor tertinggi.
+    """
+    indptr = postings[0]
+    terms = query_vector.tocsr().indices
+    n_postings = int(np.sum(indptr[terms + 1] - indptr[terms]))
+
+    if upper_bounds is not None and n_postings >= MAXSCORE_MIN_POSTINGS:
+        with span('vsm.maxscore') as s:
+            stats = {} if s.active else None
+            result = rank_vsm_maxscore(query_vector, postings, upper_bounds, k, min_score=min_score, stats=stats)
+            if s.active:
+                s.count('postings', n_postings)
+                for key, value in stats.items():
+                    s.count(key, value)
+        return result
+
+    with span('vsm.score') as s:
+        doc_ids, scores = score_term_at_a_time(query_vector, postings)
+        s.count('postings', n_postings)
+        s.count('candidates', len(doc_ids))
+    with span('vsm.top_k'):
+        # doc_ids terurut naik, jadi tie-break posisi = tie-break ID dokumen
+        top = top_k_indices(scores, k, min_score=min_score)
+    return doc_ids[top], scores[top]
+
+
+def rank_vsm_batch(query_matrix, tfidf_matrix_docs, k, chunk_size=1024, min_score=0.0, doc_matrix_t=None):
+    """
+    Top-k untuk banyak kueri sekaligus: skor semua kueri dalam satu chunk
+    dihitung dengan satu perkalian matriks sparse (kueri x dokumen), lalu top-k
+    diambil per baris. chunk_size membatasi memori hasil perkalian.
+
+    Args:
+        query_matrix: Matriks TF-IDF kueri (n_kueri x n_term), ternormalisasi L2.
+        doc_matrix_t (optional): Transpos matriks dokumen dalam format CSR
+            (n_term x n_dokumen), agar tidak dibuat ulang di setiap pemanggilan.
+
+    Yields:
+        tuple: (doc_ids, scores) per kueri, urutan sama dengan baris query_matrix.
+    """
+    query_matrix = query_matrix.tocsr()
+    if doc_matrix_t is None:
+        doc_matrix_t = tfidf_matrix_docs.T.tocsr() # Sekali saja untuk semua chunk
+    for start in range(0, query_matrix.shape[0], chunk_size):
+        scores = (query_matrix[start:start + chunk_size] @ doc_matrix_t).tocsr()
+        scores.sort_indices() # Indeks kolom (ID dokumen) terurut -> tie-break ID dokumen
+        for row in range(scores.shape[0]):
+            begin, end = scores.indptr[row], scores.indptr[row + 1]
+            doc_ids, row_scores = scores.indices[begin:end], scores.data[begin:end]
+            top = top_k_indices(row_scores, k, min_score=min_score)
+            yield doc_ids[top], row_scores[top]
+
+def search_vsm_batch(query_texts, vsm_model, doc_names, k=5, chunk_size=1024, preprocess_batch=None):
+    """
+    Versi batch dari search_vsm untuk ribuan kueri (evaluasi offline, replay log).
+    query_texts boleh berupa generator: kueri dibaca, di-preprocess bersama,
+    dan diskor per chunk, jadi hasil bisa di-stream tanpa memuat semua kueri.
+
+    Args:
+        preprocess_batch (callable, optional): list teks -> list token.
+            Default: preprocess_many dari src/preprocess.py.
+
+    Yields:
+        tuple: (query_text, [(doc_name, score), ...]) per kueri, urutan sama dengan input.
+    """
+    if preprocess_batch is None:
+        from src.preprocess import preprocess_many as preprocess_batch
+
+    vectorizer, tfidf_matrix_docs = vsm_model
+    doc_matrix_t = tfidf_matrix_docs.T.tocsr()
+    chunk = []
+
+    def flush(chunk):
+        clean_queries = [' '.join(tokens) for tokens in preprocess_batch(chunk)]
+        with span('vsm.transform') as s:
+            query_matrix = vectorizer.transform(clean_queries)
+            s.count('queries', len(clean_queries))
+        ranked = rank_vsm_batch(query_matrix, tfidf_matrix_docs, k, chunk_size=len(chunk), doc_matrix_t=doc_matrix_t)
+        for query_text, (doc_ids, scores) in zip(chunk, ranked):
+            yield query_text, [(doc_names[doc_id], score) for doc_id, score in zip(doc_ids, scores)]
+
+    for query_text in query_texts:
+        chunk.append(query_text)
+        if len(chunk) >= chunk_size:
+            yield from flush(chunk)
+            chunk = []
+    if chunk:
+        yield from flush(chunk)
+
+
+# ---
+# SINYAL KEDEKATAN (PROXIMITY)
+# ---
+# Dokumen yang memuat term kueri berdekatan ("magang web" vs "web ... magang"
+# di paragraf lain) diberi skor lebih tinggi. Dari indeks posisional (lihat
+# InvertedIndex di src/boolean_ir.py), untuk setiap pasangan term kueri yang
+# berurutan dihitung jarak minimumnya di dokumen; proximity = rata-rata
+# 1/jarak (1.0 = bersebelahan, 0 = pasangan tidak muncul bersama).
+#
+# Rerank hanya menyentuh kandidat teratas cosine (k * PROXIMITY_CANDIDATE_FACTOR,
+# minimal PROXIMITY_MIN_CANDIDATES), lalu skor akhir = cosine * (1 + bobot * proximity).
+# Bobot 0 = VSM murni (default).
+
+DEFAULT_PROXIMITY_WEIGHT = 0.2
+PROXIMITY_CANDIDATE_FACTOR = 4
+PROXIMITY_MIN_CANDIDATES = 50
+
+def proximity_candidates(k):
+    """Jumlah kandidat cosine yang di-rerank dengan sinyal kedekatan."""
+    return max(k * PROXIMITY_CANDIDATE_FACTOR, PROXIMITY_MIN_CANDIDATES)
+
+def proximity_scores(query_terms, doc_ids, inverted_index):
+    """
+    Skor kedekatan term kueri di setiap dokumen doc_ids (0..1).
+
+    Args:
+        query_terms (list): Token kueri hasil preprocessing, urutan asli.
+        doc_ids (array): ID dokumen kandidat (urutan bebas).
+        inverted_index (InvertedIndex): Indeks posisional.
+
+    Returns:
+        np.ndarray: Skor per dokumen, urutan sama dengan doc_ids.
+    """
+    from src.boolean_ir import POSITION_BITS, nearest_distances
+
+    doc_ids = np.asarray(doc_ids, dtype=np.int64)
+    terms = list(dict.fromkeys(term for term in query_terms if term in inverted_index))
+    scores = np.zeros(len(doc_ids), dtype=np.float64)
+    if len(terms) < 2 or len(doc_ids) == 0:
+        return scores
+
+    order = np.argsort(doc_ids, kind='stable')
+    sorted_ids = doc_ids[order]
+    keys = {term: inverted_index.position_keys(term, sorted_ids) for term in terms}
+
+    total = np.zeros(len(doc_ids), dtype=np.float64)
+    for left, right in zip(terms, terms[1:]):
+        distances = nearest_distances(keys[left], keys[right])
+        found = distances > 0
+        best = np.full(len(doc_ids), np.inf)
+        rows = np.searchsorted(sorted_ids, keys[left][found] >> POSITION_BITS)
+        np.minimum.at(best, rows, distances[found])
+        total += np.where(np.isfinite(best), 1.0 / best, 0.0)
+
+    scores[order] = total / (len(terms) - 1)
+    return scores
+
+def rerank_by_proximity(doc_ids, scores, query_terms, inverted_index, k, weight=DEFAULT_PROXIMITY_WEIGHT):
+    """
+    Rerank kandidat cosine dengan sinyal kedekatan.
+
+    Returns:
+        tuple: (doc_ids, scores) top-k, skor menurun (skor sama: ID dokumen kecil dulu).
+    """
+    doc_ids = np.asarray(doc_ids)
+    order = np.argsort(doc_ids, kind='stable') # top_k_indices memutus skor sama dengan posisi
+    doc_ids, scores = doc_ids[order], np.asarray(scores, dtype=np.float64)[order]
+    with span('vsm.proximity') as s:
+        boosted = scores * (1.0 + weight * proximity_scores(query_terms, doc_ids, inverted_index))
+        s.count('candidates', len(doc_ids))
+    top = top_k_indices(boosted, k)
+    return doc_ids[top], boosted[top]
+
+
+def search_vsm(query_text, vsm_model, doc_names, preprocessed_docs, k=5, postings=None, upper_bounds=None,
+               inverted_index=None, proximity_weight=0.0):
     """
     Mencari kueri di model VSM.
     Parameter di sini HARUS sinkron dengan panggilan di app/main.py
+
+    postings (opsional): (indptr, doc_ids, weights) dari artefak indeks.
+    Jika tidak diberikan, dibangun dari matriks TF-IDF sekali saja per matriks (get_term_postings).
+    upper_bounds (opsional): batas atas per term dari artefak indeks (pruning MaxScore).
+    inverted_index, proximity_weight (opsional): indeks posisional + bobot sinyal
+    kedekatan term kueri (0 = cosine murni).
     """
     
     # 1. Unpack model
@@ -55,19 +507,23 @@ def search_vsm(query_text, vsm_model, doc_names, preprocessed_docs, k=5):
         return []
     
     # 3. Ubah kueri bersih menjadi Vektor TF-IDF
-    query_vector = vectorizer.transform([clean_query])
-    
-    # 4. Hitung Cosine Similarity
-    cosine_scores = cosine_similarity(query_vector, tfidf_matrix_docs).flatten()
+    with span('vsm.transform'):
+        query_vector = vectorizer.transform([clean_query])
     
-    # 5. Ambil Top-k
-    top_k_indices = cosine_scores.argsort()[-k:][::-1]
+    # 4. Skor cosine hanya dari postings term kueri, langsung Top-k (skor > 0)
+    if postings is None:
+        postings = get_term_postings(tfidf_matrix_docs)
+    if proximity_weight and inverted_index is not None:
+        top_ids, top_scores = rank_vsm(query_vector, postings, proximity_candidates(k), upper_bounds=upper_bounds)
+        top_ids, top_scores = rerank_by_proximity(
+            top_ids, top_scores, clean_tokens, inverted_index, k, weight=proximity_weight
+        )
+    else:
+        top_ids, top_scores = rank_vsm(query_vector, postings, k, upper_bounds=upper_bounds)
     
-    # 6. Format hasil
+    # 5. Format hasil
     results = []
-    for index in top_k_indices:
-        score = cosine_scores[index]
-        if score > 0.0: # Hanya tampilkan jika relevan
-            results.append((doc_names[index], score))
+    for index, score in zip(top_ids, top_scores):
+        results.append((doc_names[index], score))
             
     return results
\ No newline at end of file
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Pastikan folder root proyek ada di sys.path agar 'src' bisa diimpor (sama seperti skrip di src/)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
@@ -0,0 +1,63 @@
+import os
+from collections import Counter
+
+import numpy as np
+
+from src.bm25 import FIELDS, BM25Index, DEFAULT_B, DEFAULT_K1
+
+
+DOCS = [
+    {'posisi': ['barista'], 'lokasi': ['ungaran'], 'lainnya': ['kopi', 'kopi', 'shift']},
+    {'posisi': ['admin', 'gudang'], 'lokasi': ['ungaran', 'semarang'], 'kualifikasi': ['excel']},
+    {'posisi': ['web', 'develop'], 'lokasi': ['semarang'], 'lainnya': ['kopi']},
+    {},
+]
+
+
+def bm25_manual(query_tokens, k1=DEFAULT_K1, b=DEFAULT_B):
+    docs_tokens = [[token for field in FIELDS for token in doc.get(field, [])] for doc in DOCS]
+    avgdl = np.mean([len(tokens) for tokens in docs_tokens])
+    scores = np.zeros(len(docs_tokens))
+    for term, qtf in Counter(query_tokens).items():
+        df = sum(term in tokens for tokens in docs_tokens)
+        if df == 0:
+            continue
+        idf = np.log(1.0 + (len(docs_tokens) - df + 0.5) / (df + 0.5))
+        for d, tokens in enumerate(docs_tokens):
+            tf = tokens.count(term)
+            scores[d] += qtf * idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(tokens) / avgdl))
+    return scores
+
+
+def test_build_matches_field_counts():
+    index = BM25Index.from_field_tokens(['a', 'b', 'c', 'd'], DOCS)
+    kopi = index.term_to_id['kopi']
+    start, end = index.postings_indptr[kopi], index.postings_indptr[kopi + 1]
+    assert index.postings_docs[start:end].tolist() == [0, 2]
+    assert index.field_tfs[FIELDS.index('lainnya'), start:end].tolist() == [2, 1]
+    assert index.field_lengths[:, 3].tolist() == [0] * len(FIELDS)
+
+
+def test_score_matches_formula():
+    index = BM25Index.from_field_tokens(['a', 'b', 'c', 'd'], DOCS)
+    for query in (['kopi', 'ungaran'], ['semarang', 'semarang', 'web'], ['tidakada']):
+        doc_ids, scores = index.score(query)
+        expected = bm25_manual(query)
+        assert np.allclose(scores, expected[doc_ids])
+        assert np.allclose(np.delete(expected, doc_ids), 0.0)
+
+
+def test_save_swaps_generation_and_loads(tmp_path):
+    index = BM25Index.from_field_tokens(['a', 'b', 'c', 'd'], DOCS)
+    index.save(str(tmp_path), checksum='x')
+    loaded = BM25Index.load(str(tmp_path))
+    assert loaded.vocabulary == index.vocabulary
+    for query in (['kopi', 'ungaran'], ['admin']):
+        assert np.allclose(loaded.score(query)[1], index.score(query)[1])
+
+    # Simpan ulang: pembaca lama tetap konsisten dengan generasinya sendiri
+    smaller = BM25Index.from_field_tokens(['a', 'b'], DOCS[:2])
+    smaller.save(str(tmp_path), checksum='y')
+    assert BM25Index.load(str(tmp_path)).doc_names == ['a', 'b']
+    assert np.allclose(loaded.score(['kopi'])[1], index.score(['kopi'])[1])
+    assert len([name for name in os.listdir(tmp_path) if name.startswith('gen-')]) == 2
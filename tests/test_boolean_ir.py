@@ -0,0 +1,41 @@
+import pytest
+
+from src.preprocess import Preprocessor, get_preprocessor, set_preprocessor
+from src.boolean_ir import BooleanQueryError, build_inverted_index, compile_boolean_query, parse_boolean_query
+
+
+@pytest.fixture
+def restore_preprocessor():
+    original = get_preprocessor()
+    yield
+    set_preprocessor(original)
+
+
+def test_plan_cache_follows_pipeline(restore_preprocessor):
+    """Plan yang di-cache tidak boleh membawa stem dari pipeline sebelumnya."""
+    assert compile_boolean_query('lowongan AND magang') == ('AND', (('TERM', 'lowong'), ('TERM', 'magang')))
+
+    set_preprocessor(get_preprocessor().replace(stemmer='none'))
+    assert compile_boolean_query('lowongan AND magang') == ('AND', (('TERM', 'lowongan'), ('TERM', 'magang')))
+
+    set_preprocessor(Preprocessor())
+    assert compile_boolean_query('lowongan AND magang') == ('AND', (('TERM', 'lowong'), ('TERM', 'magang')))
+
+
+def test_phrase_and_near():
+    docs = {
+        'a': ['magang', 'web', 'develop', 'semarang'],
+        'b': ['develop', 'web', 'magang'],
+        'c': ['web', 'kopi', 'barista', 'develop'],
+    }
+    names = sorted(docs)
+    index = build_inverted_index(docs, names, positional=True)
+    assert parse_boolean_query('"web develop"', index) == {'a'}
+    assert parse_boolean_query('web NEAR/1 develop', index) == {'a', 'b'}
+    assert parse_boolean_query('web NEAR/3 develop', index) == {'a', 'b', 'c'}
+    assert parse_boolean_query('"web develop" OR barista NEAR/1 kopi', index) == {'a', 'c'}
+
+    with pytest.raises(BooleanQueryError):
+        compile_boolean_query('web NEAR/x develop')
+    with pytest.raises(BooleanQueryError):
+        compile_boolean_query('"web develop')
@@ -0,0 +1,133 @@
+import glob
+import json
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from src.boolean_ir import build_inverted_index
+from src.corpus_reader import read_text
+from src.incremental_index import IncrementalIndexer
+from src.preprocess import preprocess_corpus
+from src.snippets import build_sentence_index
+from src.vsm_ir import build_vsm_model, search_vsm
+
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+CORPUS_PATHS = sorted(glob.glob(os.path.join(PROJECT_ROOT, 'data', '*.txt')))
+QUERIES = ['magang web semarang', 'barista kopi ungaran', 'admin gudang', 'finance akuntansi']
+TERMS = ['magang', 'semarang', 'barista', 'admin']
+
+pytestmark = pytest.mark.skipif(len(CORPUS_PATHS) < 12, reason="korpus data/*.txt tidak lengkap")
+
+
+def full_rebuild(data_dir):
+    """Build ulang penuh: preprocess semua dokumen + TfidfVectorizer."""
+    paths = sorted(glob.glob(os.path.join(data_dir, '*.txt')))
+    names = [os.path.basename(p) for p in paths]
+    tokens = preprocess_corpus([read_text(p) for p in paths], workers=1)
+    vsm_model = build_vsm_model([' '.join(t) for t in tokens])
+    return names, vsm_model, build_inverted_index(dict(zip(names, tokens)), names, positional=True)
+
+
+def assert_matches_full_rebuild(indexer, data_dir):
+    index = indexer.refresh()
+    names, vsm_model, inverted_index = full_rebuild(data_dir)
+    assert index['doc_names'] == names
+    assert index['inverted_index'].to_dict() == inverted_index.to_dict()
+    doc_ids = np.arange(len(names))
+    for term in TERMS:
+        assert np.array_equal(index['inverted_index'].position_keys(term, doc_ids),
+                              inverted_index.position_keys(term, doc_ids)), term
+    for q in QUERIES:
+        got = search_vsm(q, index['vsm_model'], index['doc_names'], None, k=10)
+        expected = search_vsm(q, vsm_model, names, None, k=10)
+        assert [d for d, _ in got] == [d for d, _ in expected], q
+        assert np.allclose([s for _, s in got], [s for _, s in expected]), q
+    sentence_index = indexer.sentence_index()
+    assert sorted(sentence_index) == names
+    texts = [read_text(os.path.join(data_dir, name)) for name in names]
+    assert [sentence_index[name] for name in names] == build_sentence_index(texts)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    path = tmp_path / 'data'
+    path.mkdir()
+    for src in CORPUS_PATHS[:10]:
+        shutil.copy(src, path)
+    return str(path)
+
+
+def test_incremental_matches_full_rebuild(data_dir, tmp_path):
+    index_dir = str(tmp_path / 'index')
+    indexer = IncrementalIndexer(data_dir, index_dir, workers=1)
+    assert_matches_full_rebuild(indexer, data_dir)
+
+    # Tambah dokumen
+    for src in CORPUS_PATHS[10:]:
+        shutil.copy(src, data_dir)
+    assert_matches_full_rebuild(indexer, data_dir)
+
+    # Ubah dokumen
+    with open(os.path.join(data_dir, os.path.basename(CORPUS_PATHS[0])), 'a', encoding='utf-8') as f:
+        f.write("\nLokasi tambahan: Ungaran. Dibutuhkan barista dan admin gudang.")
+    assert_matches_full_rebuild(indexer, data_dir)
+
+    # Hapus dokumen (tombstone)
+    for src in CORPUS_PATHS[1:3]:
+        os.remove(os.path.join(data_dir, os.path.basename(src)))
+    assert_matches_full_rebuild(indexer, data_dir)
+
+    indexer.compact()
+    assert not indexer.tombstones
+    assert_matches_full_rebuild(indexer, data_dir)
+
+    # Muat ulang state dari disk
+    assert_matches_full_rebuild(IncrementalIndexer(data_dir, index_dir, workers=1), data_dir)
+
+
+def test_compaction_prunes_unused_terms(data_dir, tmp_path):
+    indexer = IncrementalIndexer(data_dir, str(tmp_path / 'index'), workers=1)
+    with open(os.path.join(data_dir, 'zz_extra.txt'), 'w', encoding='utf-8') as f:
+        f.write("Lowongan xylofonis profesional.")
+    indexer.refresh()
+    assert 'xylofonis' in indexer.term_to_id
+
+    os.remove(os.path.join(data_dir, 'zz_extra.txt'))
+    indexer.refresh()
+    indexer.compact()
+    assert 'xylofonis' not in indexer.term_to_id
+    assert sorted(indexer.terms) == indexer.materialize()[1]
+    assert_matches_full_rebuild(indexer, data_dir)
+
+
+def test_state_keeps_tokens_and_sentences_out_of_state_file(data_dir, tmp_path):
+    index_dir = tmp_path / 'index'
+    indexer = IncrementalIndexer(data_dir, str(index_dir), workers=1)
+    indexer.refresh()
+    with open(indexer.state_path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    assert 'terms' not in state
+    assert all(set(doc) == {'name', 'offset', 'length'} for doc in state['docs'])
+    assert len(list((index_dir / 'incremental_sentences').glob('*.json'))) == 10
+
+    # Ekor yatim dari refresh yang terputus tidak boleh mengacaukan offset berikutnya
+    with open(index_dir / 'incremental_term_ids.0.u32', 'ab') as f:
+        f.write(b'\xff' * 12)
+    with open(index_dir / 'incremental_terms.0.txt', 'ab') as f:
+        f.write('yatim\n'.encode('utf-8'))
+    reloaded = IncrementalIndexer(data_dir, str(index_dir), workers=1)
+    for src in CORPUS_PATHS[10:]:
+        shutil.copy(src, data_dir)
+    assert_matches_full_rebuild(reloaded, data_dir)
+
+    # Compaction pindah ke generasi log baru dan menghapus yang lama
+    os.remove(os.path.join(data_dir, os.path.basename(CORPUS_PATHS[0])))
+    reloaded.refresh()
+    reloaded.compact()
+    assert sorted(p.name for p in index_dir.glob('incremental_term*')) == \
+        ['incremental_term_ids.1.u32', 'incremental_terms.1.txt']
+    assert len(list((index_dir / 'incremental_sentences').glob('*.json'))) == len(CORPUS_PATHS) - 1
+    assert_matches_full_rebuild(IncrementalIndexer(data_dir, str(index_dir), workers=1), data_dir)
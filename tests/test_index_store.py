@@ -0,0 +1,33 @@
+import os
+
+import numpy as np
+
+from src.index_store import load_index, read_index_meta, save_index
+
+
+DOCS = ['lowong magang web semarang', 'barista kopi ungaran', 'admin gudang ungaran']
+
+
+def generations(index_dir):
+    return sorted(name for name in os.listdir(index_dir) if name.startswith('gen-'))
+
+
+def test_rewrite_swaps_generation_without_touching_old_arrays(tmp_path):
+    index_dir = str(tmp_path / 'index')
+    first = save_index(index_dir, ['a', 'b', 'c'], DOCS, checksum='v1')
+    first_meta = read_index_meta(index_dir)
+    first_weights = np.array(first['vsm_postings'][2])
+
+    second = save_index(index_dir, ['a', 'b'], DOCS[:2], checksum='v2')
+    second_meta = read_index_meta(index_dir)
+    assert second_meta['generation'] != first_meta['generation']
+    assert second['doc_names'] == ['a', 'b']
+    # Pembaca yang masih memegang meta lama tetap mendapat array generasi lamanya
+    assert np.array_equal(first['vsm_postings'][2], first_weights)
+    assert generations(index_dir) == sorted([first_meta['generation'], second_meta['generation']])
+
+    save_index(index_dir, ['a'], DOCS[:1], checksum='v3')
+    assert first_meta['generation'] not in generations(index_dir)
+    assert len(generations(index_dir)) == 2
+    assert load_index(index_dir)['doc_names'] == ['a']
+    assert not [name for name in os.listdir(index_dir) if name.endswith('.npy')]
@@ -0,0 +1,76 @@
+import pytest
+
+from src.corpus_reader import iter_corpus
+from src.preprocess import PROJECT_ROOT, StemCache, clean, fast_tokenize, nltk_tokenize
+
+# Kasus tepi tokenisasi: tanda baca, angka, unicode, spasi campuran, teks kosong
+EDGE_CASES = [
+    "",
+    "   \t\n ",
+    "Lowongan Magang Web Developer (Semarang)",
+    "Gaji Rp5.000.000/bulan; e-mail: HRD@PT-ABC.co.id",
+    "Jam kerja 08.00-17.00, shift 2x/minggu!!!",
+    "full-time/part-time & remote?",
+    "\"Kutip\" 'tunggal' [kurung] {kurawal} <tag>",
+    "Café Über  \t\nnaïve KOPI",
+    "Ärger straße İstanbul",
+    "Ｆｕｌｌｗｉｄｔｈ ｄｉｇｉｔ １２３ dan emoji ☕ kopi",
+    "tab\tbaris\r\nbaru nbsp",
+    "123 456 7890",
+]
+
+
+def corpus_texts():
+    return [text for _, _, text in iter_corpus(f"{PROJECT_ROOT}/data")]
+
+
+@pytest.mark.parametrize('text', EDGE_CASES)
+def test_fast_tokenize_matches_clean_split_edge_cases(text):
+    assert fast_tokenize(text) == clean(text).split()
+
+
+def test_fast_tokenize_matches_clean_split_corpus():
+    texts = corpus_texts()
+    assert texts
+    for text in texts:
+        assert fast_tokenize(text) == clean(text).split()
+
+
+def test_fast_tokenize_output_is_folded_letters_only():
+    for text in EDGE_CASES + corpus_texts():
+        for token in fast_tokenize(text):
+            assert token.isascii() and token.isalpha() and token == token.lower(), token
+
+
+@pytest.fixture(scope='module')
+def nltk_available():
+    try:
+        nltk_tokenize("uji")
+    except (LookupError, ImportError):
+        pytest.skip("Data punkt NLTK tidak tersedia (python -m nltk.downloader punkt punkt_tab).")
+
+
+def test_fast_tokenize_matches_nltk(nltk_available):
+    """Jalur NLTK opsional tidak boleh menyimpang dari jalur cepat pada korpus dan kasus tepi."""
+    for text in EDGE_CASES + corpus_texts():
+        assert fast_tokenize(text) == nltk_tokenize(text), text
+
+
+def test_known_nltk_difference_contractions(nltk_available):
+    """Satu-satunya beda yang diketahui: kontraksi Inggris dipecah Treebank."""
+    assert fast_tokenize("cannot") == ['cannot']
+    assert nltk_tokenize("cannot") == ['can', 'not']
+
+
+def test_stem_cache_records_new_entries_only_when_tracking():
+    cache = StemCache(str.upper, maxsize=2)
+    cache.stem('kopi')
+    cache.stem_many(['gula', 'susu', 'gula'])
+    assert cache.pop_new_entries() == [] # Proses utama: tidak ada daftar yang tumbuh tanpa batas
+    assert len(cache) == 2
+
+    cache.track_new_entries = True # Seperti di worker preprocessing
+    cache.stem('teh')
+    cache.stem_many(['air', 'teh'])
+    assert cache.pop_new_entries() == [('teh', 'TEH'), ('air', 'AIR')]
+    assert cache.pop_new_entries() == []
@@ -0,0 +1,19 @@
+import asyncio
+
+import pytest
+
+from src.server import QueryServer
+
+
+@pytest.mark.parametrize('message', [[1, 2], 'x', 3, None])
+def test_non_object_message_returns_error(message):
+    reply = asyncio.run(QueryServer().handle_message(message))
+    assert reply == {'error': "Pesan harus objek JSON."}
+
+
+def test_invalid_batch_requests_return_errors():
+    server = QueryServer()
+    reply = asyncio.run(server.handle_message({'requests': [1, 'x']}))
+    assert reply == {'responses': [{'error': "Setiap request harus objek JSON."}] * 2}
+    reply = asyncio.run(server.handle_message({'requests': 5}))
+    assert reply == {'error': "requests harus array JSON."}
@@ -0,0 +1,31 @@
+import gc
+
+from src import vsm_ir
+from src.vsm_ir import build_term_postings, build_vsm_model, get_term_postings, search_vsm
+
+
+DOCS = ['magang web semarang', 'barista kopi ungaran', 'admin gudang ungaran', 'magang data semarang']
+NAMES = ['a', 'b', 'c', 'd']
+
+
+def test_default_postings_built_once_per_matrix(monkeypatch):
+    vsm_model = build_vsm_model(DOCS)
+    calls = []
+    monkeypatch.setattr(vsm_ir, 'build_term_postings', lambda m: calls.append(m) or build_term_postings(m))
+
+    expected = search_vsm('magang semarang', vsm_model, NAMES, None, k=3,
+                          postings=build_term_postings(vsm_model[1]))
+    for _ in range(3):
+        assert search_vsm('magang semarang', vsm_model, NAMES, None, k=3) == expected
+    assert len(calls) == 1
+    assert get_term_postings(vsm_model[1]) is get_term_postings(vsm_model[1])
+
+
+def test_postings_cache_entry_dropped_with_matrix():
+    _, matrix = build_vsm_model(DOCS)
+    get_term_postings(matrix)
+    key = id(matrix)
+    assert key in vsm_ir._term_postings_cache
+    del matrix
+    gc.collect()
+    assert key not in vsm_ir._term_postings_cache